@@ -9,6 +9,9 @@ Module to interact with the DB for vIOSimulator
 
 Uses sqlalchemy. Uses any DB backend supported by SQLAlchemy.
 
+Besides MySQL, where the schema is made by vIOS_db.sql, it can run on SQLite: a file or in memory, with the URL sqlite:///:memory:
+The schema is then made from the DataModels by createSchema(), and the data of the SQL files is loaded by loadSQL()
+
 No method prints messages, no exceptions raised, no logging performed. These methods are silent.
 
 """
@@ -18,7 +21,11 @@ No method prints messages, no exceptions raised, no logging performed. These met
 For methods that take parameters; the parameters are expected to be Values, not complete objects. 
 This is to detach any change in the Model values of attributes from the DB operations (DB only cares about indexes and values)
 
-A single Session object is used internally, and it is renewed/recreated 
+A single Session object is used internally per thread, and it is renewed/recreated 
+
+The Engines, with their pools of DB connections, are shared by all the DBConnection objects of the same DB URL in the process
+
+The lists of the topologie tables, that change rarely, are kept in a cache of the process ..seealso:: CACHED_LISTS
 
 """
 
@@ -39,15 +46,318 @@ A single Session object is used internally, and it is renewed/recreated
 
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm import aliased
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import subqueryload
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.exc import MultipleResultsFound
 from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy import create_engine
 from sqlalchemy import or_
 from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import event
+from sqlalchemy import DateTime
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import StaticPool
+from datetime import timedelta
+from itertools import groupby
+import hashlib
+import re
+import threading
 
 from  DataModels import *
+import SettingsFile
+
+
+poolSize = 10
+""" Connections kept open in the pool of each Engine. From the option pool_size in the [database] section """
+
+maxOverflow = 20
+""" Connections that can be opened over poolSize when all of them are in use, such as by the Migration threads. From the option max_overflow in the [database] section """
+
+poolRecycle = 3600
+""" Seconds after which a pooled connection is opened again, before the DB server times it out. -1 to keep them. From the option pool_recycle in the [database] section """
+
+_engines = dict()
+""" The Engines of the process, keyed by DB URL """
+
+_enginesLock = threading.Lock()
+
+createSchemaOnConnect = False
+""" If the schema is made from the DataModels when connecting, for an empty DB such as SQLite. From the option create_schema in the [database] section """
+
+sqlFiles = []
+""" SQL files whose data is loaded when connecting, such as vIOS_db.sql or big_db.sql. From the option sql_files in the [database] section """
+
+_schemaStatements = ("USE","GRANT","CREATE","DROP","ALTER","SET")
+""" SQL statements of the DB server and the schema, that loadSQL() skips """
+
+_sqlStatements = _schemaStatements + ("INSERT","DELETE","UPDATE","REPLACE")
+""" SQL statements that loadSQL() recognizes at the start of a line, as some files do not end all of them with ';' """
+
+tableCache = True
+""" If the lists of CACHED_LISTS are kept in cache. From the option table_cache in the [database] section """
+
+_caches = dict()
+""" The TableCache of the process, keyed by DB URL """
+
+
+LOADING_PROFILES = {
+	Demand: {
+		# Optimizer.consumeDemands() and OptimizationModels.Model.consumeDemands()
+		"consume": ( joinedload("clientGroup").joinedload("location"), joinedload("pop").joinedload("location"), joinedload("vcdn") ),
+		# Optimizer.simulate()
+		"simulate": ( joinedload("clientGroup").joinedload("location"), joinedload("pop").joinedload("location"), joinedload("vcdn") ),
+	},
+	Instance: {
+		# Optimizer.simulate()
+		"simulate": ( joinedload("pop").joinedload("location"), joinedload("vcdn") ),
+	},
+	vCDN: {
+		# OptimizationModels.OMAC.setvCDNs() and Optimizer.createRandomDemands()
+		"instances": ( subqueryload("instances"), ),
+	},
+	POP: {
+		# OptimizationModels.Model.setPOPs()
+		"model": ( joinedload("location"), subqueryload("instances") ),
+	},
+	ClientGroup: {
+		# OptimizationModels.Model.setClientGroups()
+		"model": ( joinedload("location"), ),
+	},
+	NetworkLink: {
+		# OptimizationModels.Model() and OptimizationModels.OMAC.setTopologie()
+		"model": ( joinedload("locationA"), joinedload("locationB") ),
+	},
+	MigrationCostMultiplier: {
+		# WebAdmin /Topologie
+		"pops": ( joinedload("popA"), joinedload("popB") ),
+	},
+}
+""" 
+Loading profiles of the lists of Models: for a caller, the relationships it reads on every element.
+
+They are loaded in the same query (joined) or in one more query per relationship (collections), instead of one query per element when they are first read.
+"""
+
+CACHED_LISTS = {
+	(Location, None): (Location,),
+	(NetworkLink, None): (NetworkLink,),
+	(NetworkLink, "model"): (NetworkLink, Location),
+	(POP, None): (POP,),
+	(POP, "model"): (POP, Location, Instance),
+	(ClientGroup, None): (ClientGroup,),
+	(ClientGroup, "model"): (ClientGroup, Location),
+}
+""" 
+Lists of Models, with a loading profile, that are kept in the TableCache for the callers that only read them; with the tables they are read from.
+
+A list is read again from the DB when any of its tables changed: a row was added or deleted, or modified_at changed, or it was written through a DBConnection.
+vCDNs and MigrationCostMultipliers are not cached: they have no modified_at, so an update of a row out of a DBConnection would not be seen
+"""
+
+_stampedTables = sorted( set( ModelClass for tables in CACHED_LISTS.values() for ModelClass in tables ), key = lambda ModelClass: ModelClass.__tablename__ )
+""" The tables of CACHED_LISTS, in the order of the stamps probe """
+
+
+def _stampColumns(ModelClass):
+	"""
+		:returns: the COUNT(*), MAX(id) and MAX(modified_at) of the table
+		:rtype: scalar selects[]
+	"""
+	table = ModelClass.__table__
+	return [ select([func.count()]).select_from(table).as_scalar(), select([func.max(table.c.id)]).as_scalar(), select([func.max(table.c.modified_at)]).as_scalar() ]
+#enddef
+
+_stampColumnsOf = dict( (ModelClass, _stampColumns(ModelClass)) for ModelClass in _stampedTables )
+
+_stampsProbe = select( [ func.now(type_ = DateTime) ] + [ column for ModelClass in _stampedTables for column in _stampColumnsOf[ModelClass] ] )
+""" The time of the DB, then the stamps of each table of _stampedTables, in one query ..seealso:: _stampColumns() """
+
+_settleTime = timedelta(seconds = 2)
+""" 
+A list is only kept in the TableCache when its newest modified_at is older than this in the DB time.
+modified_at has a resolution of a second, so a newer update in the same second would not change the stamps
+"""
+
+
+def readSettingsFile():
+	"""
+		This function asks the INI file parser module, that must have read the INI file, to look for the options in the sections and variables that are of interest for this module.
+
+		If the options are not present in the INI file, the existing values are not modified
+
+		This is so that we add or remove options from the INI file just by mofiying this functions. Also, the same INI entry can be read by many modules
+
+		.. note:: Make sure that the SettingsFile module has been initialized and read a valid file. The options only apply to the Engines created afterwards
+
+		::Example::
+			SettingsFile.read(INI_file)
+			DBConnection.readSettingsFile()
+
+	"""
+	global poolSize
+	global maxOverflow
+	global poolRecycle
+	global createSchemaOnConnect
+	global sqlFiles
+	global tableCache
+
+	if SettingsFile.getOptionInt(SettingsFile.Database_Section,"pool_size") is not None:
+		poolSize = SettingsFile.getOptionInt(SettingsFile.Database_Section,"pool_size")
+	if SettingsFile.getOptionInt(SettingsFile.Database_Section,"max_overflow") is not None:
+		maxOverflow = SettingsFile.getOptionInt(SettingsFile.Database_Section,"max_overflow")
+	if SettingsFile.getOptionInt(SettingsFile.Database_Section,"pool_recycle") is not None:
+		poolRecycle = SettingsFile.getOptionInt(SettingsFile.Database_Section,"pool_recycle")
+	if SettingsFile.getOptionBoolean(SettingsFile.Database_Section,"create_schema") is not None:
+		createSchemaOnConnect = SettingsFile.getOptionBoolean(SettingsFile.Database_Section,"create_schema")
+	if SettingsFile.getOptionString(SettingsFile.Database_Section,"sql_files") is not None:
+		sqlFiles = [ f.strip() for f in SettingsFile.getOptionString(SettingsFile.Database_Section,"sql_files").split(",") if f.strip() ]
+	if SettingsFile.getOptionBoolean(SettingsFile.Database_Section,"table_cache") is not None:
+		tableCache = SettingsFile.getOptionBoolean(SettingsFile.Database_Section,"table_cache")
+#enddef
+
+
+def getEngine(connString):
+	"""
+		Gets the Engine of a DB URL, created at the first call. All the DBConnection of the same URL share its pool of connections
+
+		:param connString: Connection string to use, just like the ones in nova.conf for SqlAlchemy
+		:type connString: String
+
+		:returns: the Engine of the URL
+		:rtype: sqlalchemy.engine.Engine
+	"""
+	with _enginesLock:
+		engine = _engines.get(connString)
+		if engine is None:
+			options = dict()
+			if isInMemory(connString):
+				# A single connection for all the threads, otherwise each one would have its own empty DB
+				options = dict(poolclass = StaticPool, connect_args = {"check_same_thread": False})
+			# SQLite has no pool of connections to size
+			elif make_url(connString).get_backend_name() != "sqlite":
+				options = dict(pool_size = poolSize, max_overflow = maxOverflow, pool_recycle = poolRecycle)
+			engine = create_engine(connString, **options)
+			_engines[connString] = engine
+		return engine
+#enddef
+
+
+def getCache(connString):
+	"""
+		Gets the TableCache of a DB URL, created at the first call. All the DBConnection of the same URL share it
+
+		:param connString: Connection string to use, just like the ones in nova.conf for SqlAlchemy
+		:type connString: String
+
+		:returns: the TableCache of the URL
+		:rtype: TableCache
+	"""
+	with _enginesLock:
+		cache = _caches.get(connString)
+		if cache is None:
+			cache = TableCache()
+			_caches[connString] = cache
+		return cache
+#enddef
+
+
+def isInMemory(connString):
+	"""
+		:param connString: Connection string to use, just like the ones in nova.conf for SqlAlchemy
+		:type connString: String
+
+		:returns: True if the URL is of a SQLite DB in memory, which is empty at each start
+		:rtype: boolean
+	"""
+	url = make_url(connString)
+	return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+#enddef
+
+
+def _splitSQL(text):
+	"""
+		Splits a SQL file in statements. A statement ends with ';' at the end of a line, or when a line starts another statement
+
+		:returns: the statements, without comments
+		:rtype: String[]
+	"""
+	statements = []
+	lines = []
+	for line in text.splitlines():
+		if not line.strip() or line.strip().startswith("--"):
+			continue
+		words = line.split(None,1)
+		if lines and words[0].upper() in _sqlStatements:
+			statements.append("\n".join(lines))
+			lines = []
+		lines.append(line)
+		if line.rstrip().endswith(";"):
+			statements.append("\n".join(lines).rstrip().rstrip(";"))
+			lines = []
+	#endfor
+	if lines:
+		statements.append("\n".join(lines))
+	return statements
+#enddef
+
+
+class TableCache(object):
+	"""
+	
+	Detached, read-only copies of the lists of CACHED_LISTS, each with the stamps of its tables when it was read.
+	
+	They are given to the callers that only read them, and the relationships of their loading profile, such as the building of the Model or the Snapshot.
+	
+	"""
+	
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.entries = dict()
+		""" (stamps, objects) of the lists, keyed by (ModelClass, profile) """
+		self.hits = 0
+		""" Amount of lists given from the cache """
+		self.misses = 0
+		""" Amount of lists read from the DB """
+		self.compiled = dict()
+		""" Compiled statements of the stamps probe, by DB dialect """
+	#enddef
+	
+	def get(self, key, stamps):
+		"""
+			:returns: the objects of the list if its tables did not change, or None
+			:rtype: ModelClass[] or None
+		"""
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is not None and entry[0] == stamps:
+				self.hits = self.hits + 1
+				return entry[1]
+			self.misses = self.misses + 1
+			return None
+	#enddef
+	
+	def put(self, key, stamps, objects):
+		with self.lock:
+			self.entries[key] = (stamps, objects)
+	#enddef
+	
+	def invalidate(self, ModelClasses = None):
+		"""
+			Drops the lists read from any of the tables. All of them if None
+		"""
+		with self.lock:
+			for key in self.entries.keys():
+				if ModelClasses is None or set(CACHED_LISTS[key]) & set(ModelClasses):
+					del self.entries[key]
+	#enddef
+	
+#endclass
+
 
 class DBConnection(object):
 	"""
@@ -58,6 +368,8 @@ class DBConnection(object):
 	
 	This is done as a object so that different modules or packages can have its own independent connection to the DB.
 	
+	The same object can be used from many threads, such as the requests of WebAdmin: each thread has its own Session, and the blocks of the threads do not interfere.
+	
 	The interactions with the DB are thought to be performed in blocks delimited by
 	
 		DBConnection.start()
@@ -96,10 +408,17 @@ class DBConnection(object):
 		"""
 		self.DBString = connString
 		self.SessionClass = sessionmaker()
-		self.engine = create_engine(self.DBString)
+		self.engine = getEngine(self.DBString)
 		self.SessionClass.configure(bind=self.engine)
 		
-		self.DBSession = self.SessionClass()
+		# Each thread gets its own Session from DBSession
+		self.DBSession = scoped_session(self.SessionClass)
+		
+		# The writes to the cached tables, by any Session of this DBConnection, drop their cached lists
+		self.cache = getCache(self.DBString)
+		event.listen(self.SessionClass, "after_flush", self._flushed)
+		event.listen(self.SessionClass, "after_commit", self._ended)
+		event.listen(self.SessionClass, "after_soft_rollback", self._ended)
 			
 	#enddef
 	
@@ -112,13 +431,64 @@ class DBConnection(object):
 		"""
 		try:
 			conn = self.engine.connect()
-			conn.execute("SHOW TABLES;")
+			conn.execute("SELECT 1")
 			conn.close()
 			return True
 		except:
 			return False
 	#enddef
 	
+	def createSchema(self):
+		""" 
+			Creates the tables of the DataModels that are not in the DB. The existing tables are not altered
+			
+			This is the schema of vIOS_db.sql, without its Views, for DB backends other than MySQL
+			
+			:returns:  True if the schema was created, False if not
+			:rtype: boolean
+		"""
+		try:
+			Base.metadata.create_all(self.engine)
+			return True
+		except:
+			return False
+	#enddef
+	
+	def loadSQL(self,filename):
+		""" 
+			Runs the data statements of a SQL file, such as vIOS_db.sql, script.sql or big_db.sql, and applies them at the end
+			
+			The statements of the DB server and of the schema (USE, GRANT, CREATE, DROP, ALTER) are skipped, the schema is the one of createSchema()
+			The statements that fail are skipped, and the others are still run
+			
+			:param filename: Name of the SQL file
+			:type filename: String
+			
+			:returns:  the statements that failed, each with its error
+			:rtype: (String,String)[]
+			
+			:raises:  IOError if the file cannot be read
+		"""
+		with open(filename) as sqlFile:
+			statements = _splitSQL(sqlFile.read())
+		
+		failed = []
+		connection = self.DBSession.connection()
+		for statement in statements:
+			if statement.split(None,1)[0].upper() in _schemaStatements:
+				continue
+			# "DELETE * FROM" is accepted by no DB, but it is in the files
+			statement = re.sub(r"^(DELETE)\s+\*\s+(FROM)", r"\1 \2", statement, flags = re.IGNORECASE)
+			try:
+				connection.execute(statement)
+			except Exception as e:
+				failed.append( (statement, str(e).splitlines()[0]) )
+		#endfor
+		self.cache.invalidate()
+		self.DBSession.commit()
+		return failed
+	#enddef
+	
 	def toString(self):
 		""" 
 			:returns:  connection String + CONNECTED/NOT
@@ -132,42 +502,81 @@ class DBConnection(object):
 		return string
 	#enddef
 	
-	def getLocations(self):
+	def getLocations(self, readOnly = False):
 		"""  
 		Returns a list of all the available Locations.
 		
+			:param readOnly: True for the shared copies of the TableCache, that must not be changed ..seealso:: CACHED_LISTS
+			:type readOnly: boolean
+
 			:returns: list of Location class
 			:rtype: Location[] or None
 		"""
 		try:
-			return self._getArray(Location)
+			return self._getArray(Location, None, readOnly = readOnly)
 		except LookupError:
 			return None
 	#enddef
 	
-	def getNetworkLinks(self):
+	def getNetworkLinks(self, profile = None, readOnly = False):
 		"""  
 		Returns a list of all the Network Links. 
 		
+			:param profile: Name of the relationships to load with the list. None for loading them when they are read ..seealso:: LOADING_PROFILES
+			:type profile: String
+			:param readOnly: True for the shared copies of the TableCache, that must not be changed ..seealso:: CACHED_LISTS
+			:type readOnly: boolean
+
 			:returns: list of NetworkLink class
 			:rtype: NetworkLink[] or None
 		
 		"""
 		try:
-			return self._getArray(NetworkLink)
+			return self._getArray(NetworkLink, profile, readOnly = readOnly)
 		except LookupError:
 			return None
 	#enddef	
 
-	def getMigrationCostMultiplierList(self):
+	def getModelFingerprint(self):
+		"""  
+		Returns a digest of all the values an OMAC/HMAC Model is built from: Locations, NetworkLinks, POPs, ClientGroups and the amount of Instances per POP.
+		
+		Only the needed columns are queried, no object is loaded. If the fingerprint did not change, a Model built from the DB would be the same
+		
+			:returns: hex digest of the values
+			:rtype: String or None
+		
+		"""
+		try:
+			digest = hashlib.sha1()
+			queries = [
+				self.DBSession.query(Location.id, Location.name, Location.modified_at).order_by(Location.id),
+				self.DBSession.query(NetworkLink.id, NetworkLink.locationAId, NetworkLink.locationBId, NetworkLink.capacity, NetworkLink.modified_at).order_by(NetworkLink.id),
+				self.DBSession.query(POP.id, POP.locationId, POP.name, POP.maxNetBW, POP.maxDisk, POP.modified_at).order_by(POP.id),
+				self.DBSession.query(ClientGroup.id, ClientGroup.locationId, ClientGroup.name, ClientGroup.connectionBW, ClientGroup.modified_at).order_by(ClientGroup.id),
+				self.DBSession.query(Instance.popId, func.count(Instance.id)).group_by(Instance.popId).order_by(Instance.popId)
+				]
+			for query in queries:
+				for row in query:
+					digest.update(repr(tuple(row)))
+				digest.update("|")
+			return digest.hexdigest()
+		except:
+			return None
+	#enddef	
+
+	def getMigrationCostMultiplierList(self, profile = None):
 		""" 
 		 Get all the HmacResult Costs Multipliers 
 		 
+			:param profile: Name of the relationships to load with the list. None for loading them when they are read ..seealso:: LOADING_PROFILES
+			:type profile: String
+
 			:returns: list of MigrationCostMultiplier class
 			:rtype: MigrationCostMultiplier[] or None
 		"""
 		try:
-			return self._getArray(MigrationCostMultiplier)
+			return self._getArray(MigrationCostMultiplier, profile)
 		except LookupError:
 			return None
 	#enddef	
@@ -285,14 +694,19 @@ class DBConnection(object):
 			return None
 	#enddef	
 	
-	def getPOPList(self):
+	def getPOPList(self, profile = None, readOnly = False):
 		"""  Get a list of the POPs
+			:param profile: Name of the relationships to load with the list. None for loading them when they are read ..seealso:: LOADING_PROFILES
+			:type profile: String
+			:param readOnly: True for the shared copies of the TableCache, that must not be changed ..seealso:: CACHED_LISTS
+			:type readOnly: boolean
+
 			:returns: list of POP class, or None if not found
 			:rtype: POP[] or None if error
 			
 		"""
 		try:
-			return self._getArray(POP)
+			return self._getArray(POP, profile, readOnly = readOnly)
 		except LookupError:
 			return None
 	#enddef	
@@ -338,15 +752,18 @@ class DBConnection(object):
 			return None
 	#enddef	
 
-	def getInstanceList(self):
+	def getInstanceList(self, profile = None):
 		"""  
 		Get a list of the Instances.
 		
+		:param profile: Name of the relationships to load with the list. None for loading them when they are read ..seealso:: LOADING_PROFILES
+		:type profile: String
+
 		:returns: list of Instances class
 		:rtype: Instance[] or None
 		"""
 		try:
-			return self._getArray(Instance)
+			return self._getArray(Instance, profile)
 		except LookupError:
 			return None
 	#enddef	
@@ -415,15 +832,18 @@ class DBConnection(object):
 	
 	
 	
-	def getDemands(self):
+	def getDemands(self, profile = None):
 		"""  
 		Get a list of the current Demands
 		
+			:param profile: Name of the relationships to load with the list. None for loading them when they are read ..seealso:: LOADING_PROFILES
+			:type profile: String
+
 			:returns: list of Demand class, or None
 			:rtype: Demand[] or None
 		"""
 		try:
-			return self._getArray(Demand)
+			return self._getArray(Demand, profile)
 		except LookupError:
 			return None
 	#enddef	
@@ -526,28 +946,36 @@ class DBConnection(object):
 		return dataset 
 	#enddef	
 	
-	def getvCDNs(self):
+	def getvCDNs(self, profile = None):
 		""" 
 		Get a list of the vCDNs
 		
+			:param profile: Name of the relationships to load with the list. None for loading them when they are read ..seealso:: LOADING_PROFILES
+			:type profile: String
+
 			:returns: list of vCDN class
 			:rtype: vCDN[] or None
 		"""
 		try:
-			return self._getArray(vCDN)
+			return self._getArray(vCDN, profile)
 		except LookupError:
 			return None
 	#enddef	
 
-	def getClientGroups(self):
+	def getClientGroups(self, profile = None, readOnly = False):
 		"""  
 		Get a list of the ClientGroups. 
 		
+			:param profile: Name of the relationships to load with the list. None for loading them when they are read ..seealso:: LOADING_PROFILES
+			:type profile: String
+			:param readOnly: True for the shared copies of the TableCache, that must not be changed ..seealso:: CACHED_LISTS
+			:type readOnly: boolean
+
 			:returns: list of ClientGroup class
 			:rtype: ClientGroup[] or None
 		"""
 		try:
-			return self._getArray(ClientGroup)
+			return self._getArray(ClientGroup, profile, readOnly = readOnly)
 		except LookupError:
 			return None
 	#enddef	
@@ -555,11 +983,13 @@ class DBConnection(object):
 
 	### Internal Functions ###
 
-	def _getArray(self,ModelClass):
+	def _getArray(self,ModelClass,profile = None,readOnly = False):
 		"""  
 		Gets all the values in the DB of a model class
 		
 			:param ModelClass: is the Table/Class to lookup and get the values
+			:param profile: is the name of the relationships to load with the values, in LOADING_PROFILES[ModelClass]
+			:param readOnly: if the values can be the detached copies of the TableCache, for the lists of CACHED_LISTS
 			
 			:returns: list of elemenst of the ModelClass class
 			:rtype: ModelClass[]
@@ -568,13 +998,104 @@ class DBConnection(object):
 		"""
 		Array = []
 		try:
-			for element in self.DBSession.query(ModelClass).order_by(ModelClass.id):
+			if readOnly and tableCache and (ModelClass, profile) in CACHED_LISTS:
+				return self._getCached(ModelClass, profile)
+			for element in self._query(self.DBSession(), ModelClass, profile):
 				Array.append(element)
 		except:
 			raise LookupError
 		return Array
 	#enddef
 	
+	def _getCached(self,ModelClass,profile):
+		"""  
+		Gets the values of a list of CACHED_LISTS from the TableCache, reading them from the DB if their tables changed
+		
+		The values are shared by all the callers: they are detached, their relationships out of the profile cannot be read, and they must not be changed
+		
+			:returns: list of elements of the ModelClass class
+			:rtype: ModelClass[]
+		"""
+		key = (ModelClass, profile)
+		tables = CACHED_LISTS[key]
+		session = self.DBSession()
+		
+		# As a query, the pending changes are written first. The Session sees its own writes, that are not in the DB yet for the others
+		if session.new or session.dirty or session.deleted:
+			session.flush()
+		if set(tables) & session.info.get("written", set()):
+			return self._query(session, ModelClass, profile).all()
+		
+		# The stamps are read before the list: if the tables change in between, the list is newer than its stamps and it is only read again
+		now, stamps = self._stamps(session)
+		listStamps = tuple( stamps[t] for t in tables )
+		objects = self.cache.get(key, listStamps)
+		if objects is None:
+			# The detached copies are made by a Session without DB, merge(load = False) does not query
+			holder = Session()
+			objects = [ holder.merge(element, load = False) for element in self._query(session, ModelClass, profile) ]
+			holder.expunge_all()
+			if all( stamp[2] is None or now is None or now - stamp[2] >= _settleTime for stamp in listStamps ):
+				self.cache.put(key, listStamps, objects)
+		
+		return list(objects)
+	#enddef
+	
+	def _query(self,session,ModelClass,profile):
+		"""  
+			:returns: the query of all the values of a model class, sorted by id, with the relationships of the loading profile
+			:rtype: Query
+		"""
+		query = session.query(ModelClass)
+		if profile:
+			query = query.options(*LOADING_PROFILES[ModelClass][profile])
+		return query.order_by(ModelClass.id)
+	#enddef
+	
+	def _stamps(self,session):
+		"""  
+		Reads the time of the DB and the stamps of the cached tables, in one query ..seealso:: _stampColumns() It is done once per transaction of the Session
+		
+			:returns: the time of the DB and the stamps of each table
+			:rtype: (datetime, dict ModelClass:tuple)
+		"""
+		stamps = session.info.get("stamps")
+		if stamps is None:
+			# The probe is compiled once, not at each call
+			connection = session.connection().execution_options(compiled_cache = self.cache.compiled)
+			row = list(connection.execute(_stampsProbe).first())
+			now = row.pop(0)
+			stamps = dict()
+			for ModelClass in _stampedTables:
+				size = len(_stampColumnsOf[ModelClass])
+				stamps[ModelClass] = tuple(row[:size])
+				row = row[size:]
+			session.info["stamps"] = (now, stamps)
+		return session.info["stamps"]
+	#enddef
+	
+	def _written(self,session,ModelClasses):
+		"""  
+		Drops the cached lists of the tables written by the Session, and reads them from the Session until the end of its transaction
+		"""
+		ModelClasses = set(ModelClasses)
+		if ModelClasses:
+			session.info.setdefault("written", set()).update(ModelClasses)
+			session.info.pop("stamps", None)
+			self.cache.invalidate(ModelClasses)
+	#enddef
+	
+	def _flushed(self,session,flushContext):
+		""" Session event, after the changes of the objects are written """
+		self._written(session, [ type(element) for element in list(session.new) + list(session.dirty) + list(session.deleted) ])
+	#enddef
+	
+	def _ended(self,session,previousTransaction = None):
+		""" Session event, after a commit or rollback: a new transaction sees the DB as the others """
+		session.info.pop("written", None)
+		session.info.pop("stamps", None)
+	#enddef
+	
 	def _getArraySorted(self,ModelClass,ModelField):
 		"""  
 		Gets all the values in the DB of a model class
@@ -643,7 +1164,129 @@ class DBConnection(object):
 		self.DBSession.delete(ModelClass)
 		self.DBSession.commit()
 	#enddef
-	
+
+	### Bulk Operations ###
+
+	def bulkAdd(self,ModelClass,rows):
+		"""
+		Inserts many elements of a Model in a single INSERT statement, instead of one add() and commit each.
+		Consecutive rows with different columns are inserted by different statements, in the same order
+
+		It is done in the current transaction, and written with applyChanges(). The rows are not attached to the session, so their id is not known.
+
+			:param ModelClass: is the Table/Class to insert into
+			:param rows: the elements to insert, as ModelClass objects or as dictionaries of column values. The columns that are None in an object, 
+			 or not in a dictionary, take their default
+			:type rows: ModelClass[] or dict[]
+
+			:returns: the amount of rows inserted
+			:rtype: int
+
+			:raises:  internal errors
+
+		"""
+		values = self._columnValues(ModelClass,rows)
+		if values:
+			self.DBSession.flush()
+			for keys,group in groupby(values, lambda v: sorted(v)):
+				self.DBSession.execute(ModelClass.__table__.insert(), list(group))
+			self._written(self.DBSession(), [ModelClass])
+		return len(values)
+	#enddef
+
+	def bulkDeleteWhere(self,ModelClass,*criteria):
+		"""
+		Deletes all the elements of a Model that match the criteria, in a single DELETE statement, instead of loading them and one drop() and commit each.
+
+		It is done in the current transaction, and written with applyChanges(). The relationships are left to the ON DELETE of the DB, as none of the SQLAlchemy cascades is run.
+		SQLite does not enforce the foreign keys, so the references to the deleted elements are to be cleared first ..seealso:: bulkUpdateWhere()
+
+			:param ModelClass: is the Table/Class to delete from
+			:param criteria: conditions over the ModelClass columns, as in a query filter. Without criteria, all the elements are deleted
+
+			:returns: the amount of rows deleted
+			:rtype: int
+
+			:raises:  internal errors
+
+		"""
+		statement = ModelClass.__table__.delete()
+		if criteria:
+			statement = statement.where(and_(*criteria))
+		self.DBSession.flush()
+		deleted = self.DBSession.execute(statement).rowcount
+		self._expire(ModelClass)
+		self._written(self.DBSession(), [ModelClass])
+		return deleted
+	#enddef
+
+	def bulkUpdateWhere(self,ModelClass,values,*criteria):
+		"""
+		Sets the values of all the elements of a Model that match the criteria, in a single UPDATE statement, instead of loading them and setting each one.
+
+		It is done in the current transaction, and written with applyChanges()
+
+			:param ModelClass: is the Table/Class to update
+			:param values: the new value of each column, by column name
+			:type values: dict
+			:param criteria: conditions over the ModelClass columns, as in a query filter. Without criteria, all the elements are updated
+
+			:returns: the amount of rows updated
+			:rtype: int
+
+			:raises:  internal errors
+
+		"""
+		statement = ModelClass.__table__.update().values(**values)
+		if criteria:
+			statement = statement.where(and_(*criteria))
+		self.DBSession.flush()
+		updated = self.DBSession.execute(statement).rowcount
+		self._expire(ModelClass)
+		self._written(self.DBSession(), [ModelClass])
+		return updated
+	#enddef
+
+	def replaceAll(self,ModelClass,rows):
+		"""
+		Replaces all the elements of a Model by the rows, with one DELETE and one INSERT in the current transaction, written with applyChanges()
+
+		..seealso:: bulkDeleteWhere() bulkAdd()
+
+			:param ModelClass: is the Table/Class to replace
+			:param rows: the new elements, as ModelClass objects or as dictionaries of column values
+			:type rows: ModelClass[] or dict[]
+
+			:returns: the amount of rows inserted
+			:rtype: int
+
+			:raises:  internal errors
+
+		"""
+		self.bulkDeleteWhere(ModelClass)
+		return self.bulkAdd(ModelClass,rows)
+	#enddef
+
+	def _columnValues(self,ModelClass,rows):
+		"""
+		The column values of the rows. The None values of the objects are left out, so that the columns take their default
+
+			:returns: list of dictionaries column:value
+			:rtype: dict[]
+		"""
+		columns = ModelClass.__table__.columns
+		return [ dict(row) if isinstance(row,dict) else dict( (c.key, getattr(row,c.key)) for c in columns if getattr(row,c.key) is not None ) for row in rows ]
+	#enddef
+
+	def _expire(self,ModelClass):
+		"""
+		Expires the elements of a Model loaded in the session, after they were changed by a statement outside the session
+		"""
+		for element in list(self.DBSession.identity_map.values()):
+			if isinstance(element,ModelClass):
+				self.DBSession.expire(element)
+	#enddef
+
 	### DB Connnection cleanness Operations ###
 	
 			
@@ -676,13 +1319,12 @@ class DBConnection(object):
 			All pending changes not applied are undone.
 		"""
 		self.DBSession.rollback()
-		self.DBSession.close()
-		self.DBSession = self.SessionClass()
+		self.DBSession.remove()
 		
 	def end(self):
 		""" 
-			Ends the transaction block
+			Ends the transaction block. The Session of the thread is released, and its connection given back to the pool
 		"""
-		self.DBSession.close()
+		self.DBSession.remove()
 		
 	#enddef
@@ -0,0 +1,86 @@
+"""
+
+Distances between the POPs
+==========================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+Matrix of the hops between the Locations of the POPs, on the topologie Graph: the amount of links of the shortest path.
+
+The hops of all the pairs are calculated with one `shortest_paths()` call, that runs a BFS from each POP Location.
+
+The matrix depends only on the Locations and the Links, so it is kept with the Model and shared by its copies:
+they are calculated once for each topologie fingerprint. ..seealso:: ModelCache
+
+.. note:: This module does not interact with the DB, it only works over igraph Graphs
+
+:Example:
+
+	distances = Distances(capacityGraph, ["Paris","Lyon"])
+	hops = distances.getHops("Paris","Lyon")
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+_name_attr = "name"
+""" In the Graph; this vertex attribute contains the location name
+"""
+
+
+class Distances(object):
+	"""
+		Hops between the Locations of the POPs
+
+		> names = the Locations, in the order of the rows and columns of the matrix
+		> hops[a][b] = amount of links of the shortest path from `a` to `b`; infinite if there is no path
+	"""
+
+	def __init__(self, graph, names):
+		"""
+			:param graph: A Graph with a `name` vertex attribute
+			:type graph: Graph
+			:param names: Names of the Locations of the POPs. Repeated or unknown names are ignored
+			:type names: String[]
+		"""
+		position = dict( (name,i) for i,name in enumerate(graph.vs[_name_attr]) )
+
+		self.names = []
+		self.index = dict()
+		for name in names:
+			if name in position and name not in self.index:
+				self.index[name] = len(self.names)
+				self.names.append(name)
+
+		vertices = [ position[name] for name in self.names ]
+
+		self.hops = graph.shortest_paths(source=vertices, target=vertices) if vertices else []
+	#enddef
+
+	def getHops(self, nameA, nameB):
+		"""
+			:returns: the amount of links of the shortest path between the Locations; infinite if there is no path
+			:rtype: int or float
+
+			:raises: KeyError if a Location is not the one of a POP
+		"""
+		return self.hops[self.index[nameA]][self.index[nameB]]
+	#enddef
+
+#endclass
@@ -0,0 +1,824 @@
+"""
+
+Gomory-Hu Tree construction
+===========================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+Builds and maintains the Gomory-Hu Tree (cut tree) of the Model's capacity Graph, used by HMAC
+
+The tree is kept in a CutTree object, as a plain list of edges between the vertex indexes of the capacity Graph.
+The Model turns it into an igraph Graph with the `flow`, `capacity` and `label` edge attributes.
+
+Minimum cuts are only needed inside the cycles of the topologie: the tree is built per biconnected block, and the bridges
+(all the links, in a tree topologie) are directly tree edges.
+
+When the Topologie changes a little (a NetworkLink capacity is edited, a link or a location is added or removed),
+the previous tree can be repaired instead of recomputed: only the tree edges whose cut might not be minimal anymore are removed,
+and the resulting supernodes are split again with the original Gomory-Hu procedure, on contracted graphs.
+
+.. note:: Install python-igraph
+
+.. note:: This module does not interact with the DB, it only works over igraph Graphs
+
+:Example:
+
+	tree = GomoryHuTree.build(capacityGraph, "capacity")
+
+	# The capacity Graph changed, only the affected part of the tree is recomputed
+	tree = GomoryHuTree.repair(tree, newCapacityGraph, "capacity")
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+from  igraph import Graph
+from multiprocessing import Pool
+import hashlib
+import logging
+
+import Messages
+
+logger = logging.getLogger(__name__)
+
+
+_name_attr = "name"
+""" In the capacity Graph; this vertex attribute contains the location name, used to match the vertex between 2 Graphs
+"""
+
+_cut_capacity_attr = "capacity"
+""" In the Graphs made by capacityGraph(); this edge attribute contains the link capacity
+"""
+
+class CutTree(object):
+	"""
+		A Gomory-Hu Tree of a capacity Graph
+
+		The tree has the same vertex as the capacity Graph, in the same order.
+		Each tree edge is a list [a, b, flow] where `a` and `b` are vertex indexes and `flow` is the minimum cut value between them
+
+		The capacities of the Graph the tree was built on are kept, so that a later Graph can be compared against them
+
+		The trees of its biconnected blocks are kept too, so that a later build() can reuse the blocks that did not change
+
+		..seealso:: gusfield(), build(), repair()
+	"""
+
+	blocks = None
+
+	def __init__(self, names, edges, capacities, blocks=None):
+		"""
+			:param names: Name of each vertex of the capacity Graph; the position in the list is the vertex index
+			:type names: String[]
+			:param edges: Tree edges, as [a, b, flow]
+			:type edges: list[]
+			:param capacities: Capacity between each pair of vertex names of the capacity Graph. ..seealso:: graphCapacities()
+			:type capacities: dict
+			:param blocks: The tree edges of each block, as [nameA, nameB, flow], keyed by the blockSignature() of the block
+			:type blocks: dict
+		"""
+		self.names = names
+		self.edges = edges
+		self.capacities = capacities
+		self.blocks = blocks
+	#enddef
+
+#endclass
+
+
+def graphCapacities(graph, capacity):
+	"""
+		Gets the capacity of the links of a Graph, keyed by the pair of vertex names
+
+		The pair is sorted, so that (A,B) and (B,A) are the same link. Parallel links are summed, as they are for a minimum cut
+
+		:param graph: An undirected Graph with a `name` vertex attribute
+		:type graph: Graph
+		:param capacity: Name of the Edge attribute having the link capacity
+		:type capacity: String
+
+		:returns: {(nameA,nameB): capacity}
+		:rtype: dict
+	"""
+	names = graph.vs[_name_attr]
+	capacities = dict()
+	for e in graph.es:
+		a = names[e.source]
+		b = names[e.target]
+		if a == b:
+			continue
+		if b < a:
+			a, b = b, a
+		capacities[(a,b)] = capacities.get((a,b), 0.0) + e[capacity]
+	#endfor
+	return capacities
+#enddef
+
+
+def gusfield(graph, capacity):
+	"""
+		Calculates the Gomory-Hu tree of the given graph, assuming that the edge capacities are given in `capacity` property.
+
+		This implementation uses Gusfield's algorithm, making n-1 minimum cut calculations on the full Graph.
+		The tree is a cut tree: removing one of its edges splits the vertex as a minimum cut of the Graph does
+
+		:param graph: An undirected Graph with a `name` vertex attribute
+		:type graph: Graph
+		:param capacity: Name of the Edge attribute having the link capacity
+		:type capacity: String
+
+		:returns: The Gomory-Hu Tree of the Graph
+		:rtype: CutTree
+	"""
+	edges = _gusfieldEdges(graph, capacity)
+
+	logger.debug(Messages.GomoryTree_built_D_maxflows % len(edges))
+
+	return CutTree(graph.vs[_name_attr], edges, graphCapacities(graph, capacity))
+#enddef
+
+
+def _gusfieldEdges(graph, capacity):
+	"""
+		The loop of gusfield()
+
+		:returns: The edges [a, b, flow] of the Gomory-Hu Tree of the Graph
+		:rtype: list[]
+	"""
+	n = graph.vcount()
+	if not graph.ecount():
+		# igraph has no capacity attribute on a Graph without edges
+		capacity = None
+
+	# Initialize the tree: every edge points to node 0
+	neighbors = [0] * n
+	flows = [0.0] * n
+
+	# For each source vertex except vertex zero...
+	for s in xrange(1, n):
+		# Find its neighbor.
+		t = neighbors[s]
+
+		# Find the minimum cut between s and t
+		cut = graph.mincut(s, t, capacity)
+		flows[s] = cut.value
+		side_of_s = cut[cut.membership[s]]
+
+		# Update the tree
+		for u in side_of_s:
+			if u != s and neighbors[u] == t:
+				neighbors[u] = s
+
+		# If the parent of t is on the side of s, s takes the place of t in the tree.
+		# This keeps every tree edge as a minimum cut, not only as the right flow value
+		if t != 0 and neighbors[t] in side_of_s:
+			neighbors[s] = neighbors[t]
+			neighbors[t] = s
+			flows[s] = flows[t]
+			flows[t] = cut.value
+	#endfor
+
+	return [ [i, neighbors[i], flows[i]] for i in xrange(1, n)]
+#enddef
+
+
+def build(graph, capacity, processes=1, previous=None):
+	"""
+		Calculates the Gomory-Hu tree of the given graph, using `processes` worker processes
+
+		The minimum cuts are only calculated where there are cycles. The Graph is split in its biconnected blocks:
+		the Gomory-Hu tree of the Graph is the union of the Gomory-Hu trees of its blocks, joined at the articulation vertex.
+		The cut between vertex of different blocks is the minimum of the cuts inside each block on the way.
+
+		> A block of 2 vertex is a bridge, its tree is the link itself. So if the topologie is a tree or a forest, the Gomory-Hu tree is the topologie
+		> A bigger block that is also in the previous tree is reused
+		> The other blocks are calculated independently, in the worker processes. ..seealso:: buildBlocks()
+		> Disconnected components are joined by 0 flow edges, as their minimum cut is 0
+
+		:param graph: An undirected Graph with a `name` vertex attribute
+		:type graph: Graph
+		:param capacity: Name of the Edge attribute having the link capacity
+		:type capacity: String
+		:param processes: Amount of worker processes
+		:type processes: int
+		:param previous: The Gomory-Hu tree of a previous capacity Graph, to reuse its blocks. It is not modified
+		:type previous: CutTree
+
+		:returns: The Gomory-Hu Tree of the Graph
+		:rtype: CutTree
+	"""
+	n = graph.vcount()
+	capacities = graphCapacities(graph, capacity)
+	names = graph.vs[_name_attr]
+	index = dict( (name,i) for i,name in enumerate(names) )
+	caps = dict( ((index[a],index[b]), c) for (a,b),c in capacities.items() )
+
+	#The parallel links are summed and the loops removed
+	simple = capacityGraph(n, caps)
+	components = simple.clusters()
+
+	edges = []
+	blockTrees = dict()
+	blocks = 0
+	pending = []
+
+	if simple.ecount() == n - len(components):
+		#A forest: every link is a bridge
+		edges = [ [a, b, c] for (a,b),c in caps.items() ]
+	else:
+		cached = previous.blocks if previous is not None and previous.blocks else dict()
+		for block in simple.biconnected_components():
+			block = sorted(block)
+			blocks = blocks + 1
+			if len(block) == 2:
+				edges.append( [block[0], block[1], simple.es[simple.get_eid(block[0], block[1])][_cut_capacity_attr]] )
+				continue
+			subgraph = simple.induced_subgraph(block)
+			signature = blockSignature(subgraph, [ names[v] for v in block ])
+			if signature in cached:
+				blockTrees[signature] = cached[signature]
+				edges.extend( [ [index[a], index[b], flow] for a,b,flow in cached[signature] ] )
+			else:
+				pending.append( (signature, block, subgraph) )
+		#endfor
+	#endif
+
+	results = buildBlocks( [ subgraph for signature,block,subgraph in pending ], processes )
+	for (signature, block, subgraph), blockEdges in zip(pending, results):
+		blockTrees[signature] = [ [names[block[a]], names[block[b]], flow] for a,b,flow in blockEdges ]
+		edges.extend( [ [block[a], block[b], flow] for a,b,flow in blockEdges ] )
+	#endfor
+
+	#The components are joined to the one of vertex 0
+	for component in components:
+		if 0 not in component:
+			edges.append( [0, component[0], 0.0] )
+
+	logger.debug(Messages.GomoryTree_built_D_blocks_D_reused_D_maxflows % (blocks, len(blockTrees) - len(pending), sum( len(r) for r in results )))
+
+	return CutTree(names, edges, capacities, blockTrees)
+#enddef
+
+
+def blockSignature(graph, names):
+	"""
+		Identifies a block by its links and capacities, whatever the vertex indexes are in the capacity Graph
+
+		:param graph: A Graph made by capacityGraph()
+		:type graph: Graph
+		:param names: The name of each vertex of the Graph
+		:type names: String[]
+
+		:returns: A digest of the sorted list of (nameA, nameB, capacity)
+		:rtype: String
+	"""
+	links = []
+	for e in graph.es:
+		a = names[e.source]
+		b = names[e.target]
+		if b < a:
+			a, b = b, a
+		links.append( (a, b, e[_cut_capacity_attr]) )
+	links.sort()
+	return hashlib.sha1(repr(links)).hexdigest()
+#enddef
+
+
+def buildBlocks(graphs, processes=1):
+	"""
+		Calculates the Gomory-Hu trees of many independent Graphs made by capacityGraph(), using `processes` worker processes
+
+		The Graphs are sent to a Pool, the biggest first, and each worker runs gusfield() on one of them.
+		If one Graph has most of the vertex, it is calculated alone with all the processes, ..seealso:: buildBlock()
+
+		:param graphs: Graphs made by capacityGraph()
+		:type graphs: Graph[]
+		:param processes: Amount of worker processes
+		:type processes: int
+
+		:returns: The edges [a, b, flow] of the Gomory-Hu Tree of each Graph
+		:rtype: list[]
+	"""
+	results = [None] * len(graphs)
+	order = sorted( range(len(graphs)), key=lambda i: -graphs[i].vcount() )
+
+	if processes > 1 and order and graphs[order[0]].vcount() * 2 > sum( g.vcount() for g in graphs ):
+		results[order[0]] = buildBlock(graphs[order[0]], processes)
+		order = order[1:]
+
+	if processes <= 1 or len(order) < 2:
+		for i in order:
+			results[i] = buildBlock(graphs[i])
+		return results
+
+	pool = Pool(min(processes, len(order)))
+	try:
+		for i, edges in pool.imap_unordered(_workerBlock, [ (i, graphs[i]) for i in order ]):
+			results[i] = edges
+	finally:
+		pool.close()
+		pool.join()
+
+	return results
+#enddef
+
+
+def buildBlock(graph, processes=1):
+	"""
+		Calculates the Gomory-Hu tree of a Graph made by capacityGraph(), using `processes` worker processes
+
+		With a single process, this is gusfield().
+
+		With more, the tree is built as in the original Gomory-Hu algorithm: all the vertex start in a single supernode,
+		and in each round every supernode is split by minimum cuts on its contracted Graph.
+		The cuts of a round are independent, so they are dispatched to a multiprocessing Pool.
+		The workers are forked with the capacity Graph, and only receive the contraction of each cut
+
+		:param graph: A Graph made by capacityGraph()
+		:type graph: Graph
+		:param processes: Amount of worker processes
+		:type processes: int
+
+		:returns: The edges [a, b, flow] of the Gomory-Hu Tree of the Graph
+		:rtype: list[]
+	"""
+	n = graph.vcount()
+	if processes <= 1 or n < 3:
+		return _gusfieldEdges(graph, _cut_capacity_attr)
+
+	#A single supernode having all the vertex
+	partial = _PartialTree(n, [], [ [0, i, 0.0] for i in xrange(1, n) ])
+
+	pool = Pool(processes, _initWorker, (graph,))
+	try:
+		maxflows = partial.complete(graph, pool, processes)
+	finally:
+		pool.close()
+		pool.join()
+
+	logger.debug(Messages.GomoryTree_built_D_maxflows_D_processes % (maxflows,processes))
+
+	return partial.edges
+#enddef
+
+
+_workerGraph = None
+""" In a worker process of build(); the Graph made by capacityGraph()
+"""
+
+def _initWorker(graph):
+	"""
+		Initializer of the worker processes of build().
+		The processes are forked, so the Graph is shared with the parent and not copied through a pipe
+	"""
+	global _workerGraph
+	_workerGraph = graph
+#enddef
+
+def _workerBlock(task):
+	"""
+		Runs gusfield() on a block in a worker process of buildBlocks()
+
+		:param task: index, Graph made by capacityGraph()
+		:type task: tuple
+	"""
+	i, graph = task
+	return i, _gusfieldEdges(graph, _cut_capacity_attr)
+#enddef
+
+def _workerMinCut(task):
+	"""
+		Runs contractedMinCut() in a worker process of build()
+
+		:param task: mapping, size, s, t
+		:type task: tuple
+	"""
+	mapping, size, s, t = task
+	return contractedMinCut(_workerGraph, mapping, size, s, t)
+#enddef
+
+
+def repair(previous, graph, capacity, processes=1):
+	"""
+		From the Gomory-Hu tree of a previous capacity Graph, gets the Gomory-Hu tree of the given Graph
+
+		The links whose capacity changed (including added or removed links and locations) are applied one by one. For each of them:
+
+		> If the capacity increases, only the tree edges on the tree path between both ends of the link can stop being minimum cuts
+		> If the capacity decreases, the tree edges on that path remain minimum cuts (with less flow), and only the tree edges
+		  having more flow than the new path bottleneck can stop being minimum cuts
+
+		Those tree edges are removed and the vertex they joined are split again as Gomory-Hu supernodes.
+		A single link edit costs as many minimum cut calculations as vertex are in the supernode, usually a handful.
+
+		If there are so many changes that the repair would not be cheaper, the tree is fully rebuilt with build()
+
+		:param previous: Gomory-Hu tree of the previous capacity Graph. It is not modified
+		:type previous: CutTree
+		:param graph: The new capacity Graph, with a `name` vertex attribute
+		:type graph: Graph
+		:param capacity: Name of the Edge attribute having the link capacity
+		:type capacity: String
+		:param processes: Amount of worker processes used if the tree is fully rebuilt
+		:type processes: int
+
+		:returns: The Gomory-Hu Tree of the new Graph
+		:rtype: CutTree
+	"""
+	newNames = graph.vs[_name_attr]
+	newCapacities = graphCapacities(graph, capacity)
+
+	changes = [ pair for pair in set(previous.capacities.keys()) | set(newCapacities.keys())
+					if previous.capacities.get(pair, 0.0) != newCapacities.get(pair, 0.0) ]
+
+	if not previous.names or len(changes) >= len(newNames) - 1:
+		return build(graph, capacity, processes, previous)
+
+	#The working set of vertex is the union of the previous and the new ones; the new vertex have no links yet
+	universe = list(previous.names)
+	known = set(universe)
+	for name in newNames:
+		if name not in known:
+			universe.append(name)
+	index = dict( (name,i) for i,name in enumerate(universe) )
+
+	edges = [ [a, b, float(flow)] for a,b,flow in previous.edges ]
+	for i in xrange(len(previous.names), len(universe)):
+		#An isolated vertex has a 0 minimum cut to any other vertex
+		edges.append( [0, i, 0.0] )
+
+	caps = dict( ((index[a],index[b]), c) for (a,b),c in previous.capacities.items() )
+
+	maxflows = 0
+	for (a,b) in changes:
+		old = previous.capacities.get((a,b), 0.0)
+		new = newCapacities.get((a,b), 0.0)
+		pair = (index[a],index[b])
+		if new:
+			caps[pair] = new
+		else:
+			caps.pop(pair, None)
+		maxflows = maxflows + _repairLink(len(universe), edges, caps, pair[0], pair[1], new - old)
+	#endfor
+
+	#Removed vertex have no links now, so all their tree edges have 0 flow. They are spliced out of the tree
+	removed = [ index[name] for name in universe if name not in set(newNames) ]
+	for v in removed:
+		incident = [ e for e in edges if v in (e[0],e[1]) ]
+		neighbors = [ (e[1] if e[0] == v else e[0]) for e in incident ]
+		for e in incident:
+			edges.remove(e)
+		for u in neighbors[1:]:
+			edges.append( [neighbors[0], u, 0.0] )
+	#endfor
+
+	#The tree vertex indexes are moved to the order of the new Graph
+	position = dict( (name,i) for i,name in enumerate(newNames) )
+	edges = [ [ position[universe[a]], position[universe[b]], flow ] for a,b,flow in edges ]
+
+	logger.debug(Messages.GomoryTree_repaired_D_changes_D_maxflows % (len(changes),maxflows))
+
+	return CutTree(newNames, edges, newCapacities, previous.blocks)
+#enddef
+
+
+def _repairLink(n, edges, caps, u, v, delta):
+	"""
+		Repairs, in place, the tree edges after the capacity of the link (u,v) changed by delta.
+		The capacities in `caps` already have the new value
+
+		:param n: amount of vertex
+		:type n: int
+		:param edges: The tree edges, as [a, b, flow]. Updated in place
+		:type edges: list[]
+		:param caps: The capacities of the Graph keyed by vertex index pairs
+		:type caps: dict
+		:param u: One end of the changed link
+		:type u: int
+		:param v: The other end of the changed link
+		:type v: int
+		:param delta: The change in capacity
+		:type delta: float
+
+		:returns: the amount of minimum cut calculations done
+		:rtype: int
+	"""
+	path = _treePath(n, edges, u, v)
+
+	if delta > 0:
+		# Cuts separating u and v got more expensive, those might not be minimum anymore.
+		invalid = set(path)
+	else:
+		# Cuts separating u and v are cheaper by the same amount, so those on the path are still minimum.
+		# Any other cut of the tree is still minimum if it is not bigger than the new bottleneck between u and v
+		for e in path:
+			edges[e][2] = edges[e][2] + delta
+		bottleneck = min( edges[e][2] for e in path )
+		onPath = set(path)
+		invalid = set( e for e in xrange(len(edges)) if e not in onPath and edges[e][2] > bottleneck )
+	#endif
+
+	if not invalid:
+		return 0
+
+	#The vertex joined by the invalid edges become supernodes of a partial tree, that is completed as in Gomory-Hu's algorithm
+	partial = _PartialTree(n,
+					[ e for i,e in enumerate(edges) if i not in invalid ],
+					[ e for i,e in enumerate(edges) if i in invalid ])
+	maxflows = partial.complete(capacityGraph(n, caps))
+
+	del edges[:]
+	edges.extend(partial.edges)
+	return maxflows
+#enddef
+
+
+def _treePath(n, edges, u, v):
+	"""
+		:returns: The indexes of the tree edges in the path from u to v
+		:rtype: int[]
+	"""
+	adjacency = [ [] for i in xrange(n) ]
+	for i,(a,b,flow) in enumerate(edges):
+		adjacency[a].append( (b,i) )
+		adjacency[b].append( (a,i) )
+
+	parentEdge = {u: None}
+	queue = [u]
+	for x in queue:
+		if x == v:
+			break
+		for y,i in adjacency[x]:
+			if y not in parentEdge:
+				parentEdge[y] = (x,i)
+				queue.append(y)
+	#endfor
+
+	path = []
+	x = v
+	while parentEdge.get(x) is not None:
+		x, i = parentEdge[x]
+		path.append(i)
+	return path
+#enddef
+
+
+def capacityGraph(n, caps):
+	"""
+		Builds the Graph used to calculate minimum cuts, from the capacities keyed by vertex index pairs
+
+		:param n: amount of vertex
+		:type n: int
+		:param caps: The capacities of the Graph keyed by vertex index pairs
+		:type caps: dict
+
+		:returns: An undirected Graph with the capacities in the `_cut_capacity_attr` Edge attribute
+		:rtype: Graph
+	"""
+	links = caps.keys()
+	return Graph(n, links, directed=False, edge_attrs={_cut_capacity_attr: [ caps[l] for l in links ]})
+#enddef
+
+
+def contractedMinCut(graph, mapping, size, s, t):
+	"""
+		Minimum cut between s and t on the Graph obtained by merging the vertex with the same mapping value
+
+		The contraction is done by igraph on a copy of the Graph; the links inside a merged vertex are dropped and the parallel links are summed
+
+		:param graph: The Graph made by capacityGraph()
+		:type graph: Graph
+		:param mapping: For each vertex of the Graph, its vertex in the contracted Graph
+		:type mapping: int[]
+		:param size: The amount of vertex in the contracted Graph
+		:type size: int
+		:param s: source, as vertex of the contracted Graph
+		:type s: int
+		:param t: target, as vertex of the contracted Graph
+		:type t: int
+
+		:returns: The cut value, and for each contracted vertex True if it is on the side of s
+		:rtype: float, boolean[]
+	"""
+	g = graph.copy()
+	g.contract_vertices(mapping)
+	g.simplify(multiple=True, loops=True, combine_edges={_cut_capacity_attr: "sum"})
+	if g.vcount() < size:
+		g.add_vertices(size - g.vcount())
+
+	if g.ecount():
+		cut = g.mincut(s, t, _cut_capacity_attr)
+	else:
+		cut = g.mincut(s, t)
+
+	sideS = cut.membership[s]
+	return cut.value, [ m == sideS for m in cut.membership ]
+#enddef
+
+
+class _PartialTree(object):
+	"""
+		A tree whose nodes are sets of vertex (supernodes), as in the original Gomory-Hu algorithm
+
+		Each edge is a minimum cut between a vertex on each of its ends. The tree is completed by splitting the supernodes
+		until all of them have a single vertex
+	"""
+
+	def __init__(self, n, valid, invalid):
+		"""
+			Contracting the invalid edges of a Gomory-Hu tree gives a tree of supernodes, joined by the valid edges
+
+			:param n: amount of vertex
+			:type n: int
+			:param valid: The tree edges that are still minimum cuts, as [a, b, flow] between vertex indexes
+			:type valid: list[]
+			:param invalid: The tree edges to recompute, as [a, b, flow] between vertex indexes
+			:type invalid: list[]
+		"""
+		#Each supernode is identified by one of its vertex
+		self.part = range(n)
+		for a,b,flow in invalid:
+			ra = self._find(a)
+			rb = self._find(b)
+			if ra != rb:
+				self.part[rb] = ra
+		#endfor
+		self.part = [ self._find(v) for v in xrange(n) ]
+
+		self.members = dict()
+		for v in xrange(n):
+			self.members.setdefault(self.part[v], []).append(v)
+
+		self.edges = [ [self.part[a], self.part[b], flow] for a,b,flow in valid ]
+		self.incident = dict( (X,[]) for X in self.members )
+		for i,(X,Y,flow) in enumerate(self.edges):
+			self.incident[X].append(i)
+			self.incident[Y].append(i)
+	#enddef
+
+	def _find(self, v):
+		while self.part[v] != v:
+			self.part[v] = self.part[self.part[v]]
+			v = self.part[v]
+		return v
+	#enddef
+
+	def splitTask(self, X):
+		"""
+			Prepares the split of the supernode X
+
+			Each subtree hanging from X is contracted into a single vertex, the vertex of X are kept
+
+			:returns: mapping of each vertex into the contracted Graph, size of the contracted Graph,
+					and for each edge incident to X the contracted vertex of its subtree
+			:rtype: int[], int, dict
+		"""
+		members = self.members[X]
+		size = len(members)
+
+		groupOf = dict()
+		neighborOf = dict()
+		for i in self.incident[X]:
+			A,B,flow = self.edges[i]
+			neighborOf[i] = size
+			#All supernodes reached from the neighbor without crossing X are in the same subtree
+			Y = B if A == X else A
+			groupOf[Y] = size
+			stack = [Y]
+			while stack:
+				Y = stack.pop()
+				for j in self.incident[Y]:
+					A,B,flow = self.edges[j]
+					Z = B if A == Y else A
+					if Z != X and Z not in groupOf:
+						groupOf[Z] = size
+						stack.append(Z)
+			#endwhile
+			size = size + 1
+		#endfor
+
+		mapping = [ groupOf.get(Y) for Y in self.part ]
+		for k,v in enumerate(members):
+			mapping[v] = k
+
+		return mapping, size, neighborOf
+	#enddef
+
+	def applySplit(self, X, t, contraction, result):
+		"""
+			Splits the supernode X in 2 by the minimum cut found between X and t, moving the edges of the subtrees that are on the side of t
+
+			The cut may have been calculated on the contraction of X made before other cuts of X were applied (same pivot, other target).
+			It is still a minimum cut if the subtrees split off by those cuts are moved to the side where their target is.
+			The edges to those subtrees are the ones not in the contraction, and their other end is the target of their cut
+
+			:param X: The supernode, also the vertex used as source of the cut
+			:type X: int
+			:param t: The target of the cut, a vertex of X
+			:type t: int
+			:param contraction: The result of splitTask(X)
+			:type contraction: tuple
+			:param result: The result of contractedMinCut()
+			:type result: tuple
+		"""
+		mapping, size, neighborOf = contraction
+		value, sideS = result
+
+		#The supernode is identified by one of its vertex, that is the source of the cut. The side of t gets t as identifier
+		kept = [ v for v in self.members[X] if sideS[mapping[v]] ]
+		moved = [ v for v in self.members[X] if not sideS[mapping[v]] ]
+		Xt = t
+		self.members[X] = kept
+		self.members[Xt] = moved
+		self.incident[Xt] = []
+		for v in moved:
+			self.part[v] = Xt
+
+		for i in list(self.incident[X]):
+			e = self.edges[i]
+			if i in neighborOf:
+				side = sideS[neighborOf[i]]
+			else:
+				side = sideS[mapping[e[1] if e[0] == X else e[0]]]
+			if not side:
+				if e[0] == X:
+					e[0] = Xt
+				else:
+					e[1] = Xt
+				self.incident[X].remove(i)
+				self.incident[Xt].append(i)
+		#endfor
+
+		self.edges.append( [X, Xt, value] )
+		self.incident[X].append(len(self.edges) - 1)
+		self.incident[Xt].append(len(self.edges) - 1)
+	#enddef
+
+	def complete(self, graph, pool=None, processes=1):
+		"""
+			Splits all the supernodes until the tree has single vertex nodes.
+			Afterwards, self.edges are the edges of the Gomory-Hu Tree as [a, b, flow] between vertex indexes
+
+			In each round, every supernode is split. The supernodes of a round are split from the same tree, the contracted Graph of one
+			does not depend on the split of the others.
+			As most minimum cuts split a single vertex off a big supernode, when there are less supernodes than processes
+			each supernode is split by several cuts from the same source to different targets, calculated together
+
+			:param graph: The Graph made by capacityGraph()
+			:type graph: Graph
+			:param pool: If given, the minimum cuts of a round are calculated by these worker processes. It must have been created with _initWorker(graph)
+			:type pool: multiprocessing.Pool
+			:param processes: the amount of processes in the pool
+			:type processes: int
+
+			:returns: the amount of minimum cut calculations done
+			:rtype: int
+		"""
+		maxflows = 0
+		pending = [ X for X in self.members if len(self.members[X]) > 1 ]
+		while pending:
+			batch = 1
+			if pool:
+				batch = max(1, processes // len(pending))
+
+			tasks = []
+			for X in pending:
+				contraction = self.splitTask(X)
+				targets = [ v for v in self.members[X] if v != X ][:batch]
+				for t in targets:
+					tasks.append( (X, t, contraction) )
+			#endfor
+
+			cuts = [ (contraction[0], contraction[1], contraction[0][X], contraction[0][t]) for X,t,contraction in tasks ]
+			if pool and len(cuts) > 1:
+				results = pool.map(_workerMinCut, cuts)
+			else:
+				results = [ contractedMinCut(graph, *cut) for cut in cuts ]
+
+			for (X,t,contraction),result in zip(tasks,results):
+				#A cut is discarded if an earlier cut of the same supernode already separated its target from the source
+				if self.part[t] == X:
+					self.applySplit(X, t, contraction, result)
+			maxflows = maxflows + len(tasks)
+			pending = [ X for X in self.members if len(self.members[X]) > 1 ]
+		#endwhile
+		return maxflows
+	#enddef
+
+#endclass
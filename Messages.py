@@ -46,6 +46,8 @@ Updated_Graph = "Updated graph"
 Created_Demands = "Demands generated randomly"
 Updated_POPs = "Information updated from OpenStack Controllers"
 Optimized = "Optimal migrations calculated"
+OMAC_Result_D_F_F_F = "OMAC found %d migrations with cost %.2f; lower bound %.2f, gap %.1f%%"
+OMAC_Result_D_F = "OMAC found %d migrations with cost %.2f"
 
 Missing_Elements_to_Build_Model =  "Missing elements to build an OMAC/HMAC Model (Locations and Network Links)"
 
@@ -94,7 +96,7 @@ Deleted_Demands = "Demands deleted from the DB"
 Deleted_Migrations = "Migrations deleted from the DB"
 Updated_Demands_QosBW = "Updated the demanded QoSBW based on vCDN information"
 HMAC_optimized = "Finished running HMAC"
-OMAC_optimized = "Created OMAC CPLEX data file"
+OMAC_optimized = "Finished OMAC optimization"
 Optimized_F = "Optimization executed in %f seconds"
 
 Exception_Building_Model =  "Exception ocurred while building the OMAC/HMAC Model"
@@ -159,6 +161,11 @@ NoMigrationsSelected = "No Migrations selected"
 NoInstantiationsSelected = "No Instantiations selected"
 
 ConnectDB_S = "Connecting to DB with url '%s' "
+Created_Schema = "Created the tables of the DB schema"
+Exception_Creating_Schema = "Unable to create the tables of the DB schema"
+Unable_Read_SQL_File_S = "Unable to read the SQL file '%s'"
+SQL_Statement_Failed_S_S = "Skipped SQL statement '%s': %s"
+Loaded_SQL_File_S_failed_D = "Loaded the SQL file '%s', %d statements failed"
 
 Simulate_Migration_vCDN_S_from_POP_S_to_POP_S = "Simulate Migration of vcdn '%s' from POP '%s' to POP '%s'"
 Simulate_Redirection_vCDN_S_from_POP_S_to_POP_S = "Simulate Redirection of vcdn '%s' from POP '%s' to POP '%s'"
@@ -277,7 +284,63 @@ Added_Fake_Instace_POP_S_vCDN_S = "Adding Fake Instance in POP '%s' of vCDN '%s'
 Update_Fake_Demand_fromPOP_S_toPOP_S = "Update of Demand from POP '%s' to POP '%s'"
 
 Unable_Write_File_S = "Unable to write the file '%s'"
-OMAC_DAT_S = "OMAC .dat file was created in '%s'"
+No_Vectorized_Consume = "numpy and scipy are needed to consume the Demands all at once; they will be consumed one by one"
+OMAC_File_S_S = "OMAC .%s file was created in '%s'"
+Unknown_OMAC_Format_S = "Unknown OMAC export format '%s'; use dat, mps, lp or mst"
+OMAC_No_Solution_S = "The OMAC in-process solver found no solution: %s"
+OMAC_Solved_S_objective_F_D_migrations = "OMAC solved in-process (%s), objective %.2f, %d migrations"
+OMAC_Start_F_cost_F_excess = "OMAC start from the HMAC result: cost %.2f, excess over the capacities %.2f"
+OMAC_Polished_D_moves_F_cost_F_excess = "OMAC start polished with %d moves: cost %.2f, excess over the capacities %.2f"
+OMAC_No_Start = "No HMAC result was given to OMAC, the .mst file is not written"
+
+###
+### OMACSolver.py
+###
+
+OMAC_Solver_Not_Available_S = "The OMAC solver '%s' is not available; install scipy >= 1.9 for 'highs' or PuLP for 'cbc'. Only the CPLEX .dat file is written"
+OMAC_Solving_D_variables_D_constraints_S = "Solving OMAC: %d variables, %d constraints with %s"
+Unknown_OMAC_Formulation_S = "Unknown OMAC formulation '%s'; use full or compact"
+OMAC_Invalid_Solution_S_F = "The OMAC solver %s returned values that violate the constraints by %f; they are discarded"
+OMAC_Using_Start_S_F = "The OMAC solver ended with %s; the HMAC solution is kept, with cost %f"
+
+###
+### OMACDecomposition.py
+###
+
+OMAC_Decomposed_D_subproblems_D_coupling_D_priced = "OMAC decomposed in %d vCDN subproblems; %d coupling constraints, %d of them not slack"
+OMAC_Lagrangian_D_value_F_D_violated = "OMAC subgradient iteration %d: Lagrangian %.2f, %d coupling constraints not met"
+
+###
+### OMACRounding.py
+###
+
+OMAC_Rounded_F_bound_F_D_rounds = "OMAC rounded from its LP relaxation: cost %.2f, LP bound %.2f, best of %d roundings"
+OMAC_Rounding_Not_Repaired_D = "None of the %d roundings of the OMAC LP relaxation could be repaired to meet the capacities"
+
+###
+### GomoryHuTree.py
+###
+
+GomoryTree_built_D_maxflows = "Gomory-Hu Tree built from scratch with %d max-flow computations"
+GomoryTree_built_D_maxflows_D_processes = "Gomory-Hu Tree built from scratch with %d max-flow computations in %d processes"
+GomoryTree_built_D_blocks_D_reused_D_maxflows = "Gomory-Hu Tree built on %d biconnected blocks (%d reused from the previous tree) with %d max-flow computations"
+GomoryTree_repaired_D_changes_D_maxflows = "Gomory-Hu Tree repaired after %d link changes with %d max-flow computations"
+
+###
+### ModelCache.py
+###
+
+ModelCache_hit_S = "Found a cached Model for the topologie fingerprint '%s'"
+ModelCache_miss_S = "There is no cached Model for the topologie fingerprint '%s'"
+ModelCache_loaded_D_S = "Loaded %d cached Models from the file '%s'"
+ModelCache_unable_load_S = "Unable to load the cached Models from the file '%s'"
+
+###
+### Snapshot.py
+###
+
+Snapshot_D_POPs_D_vCDNs_D_Instances = "Loaded a snapshot of the Infrastructure with %d POPs, %d vCDNs and %d Instances"
+Unknown_Hosting_Resource_S = "Unknown hosting resource '%s'; use disk, ram, cpu or netbw"
 
 ###
 ### OpenStackConnection.py
@@ -0,0 +1,205 @@
+"""
+
+Cache of built OMAC/HMAC Models
+===============================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+Building a Model reads the whole topologie from the DB, builds its Graphs and calculates the Gomory-Hu Tree.
+When the topologie did not change since the last time, the same Model would be built again.
+
+This module keeps the built Models, keyed by the fingerprint of the DB values they were built from (..seealso:: DBConnection.getModelFingerprint() ).
+A Model taken from the cache is a copy, so that it can be consumed by Demands without altering the cached one.
+
+The cache is kept in memory, and optionally in a file so that it survives a restart of the simulator.
+
+:Example:
+
+	fingerprint = DBConn.getModelFingerprint()
+	model = ModelCache.get(fingerprint)
+	if not model:
+		model = Model(...)
+		...
+		ModelCache.put(fingerprint, model)
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+from collections import OrderedDict
+import cPickle
+import logging
+
+import SettingsFile
+import Messages
+
+logger = logging.getLogger(__name__)
+
+
+cacheSize = 4
+"""	Amount of Models kept in the cache. The least recently used is discarded first
+"""
+
+cacheFile = None
+"""	File where the cache is saved. If None, the cache is kept in memory only
+"""
+
+hits = 0
+""" Amount of times a Model was found in the cache """
+
+misses = 0
+""" Amount of times a Model was not found in the cache """
+
+_models = None
+""" The cached Models, keyed by fingerprint, from the least to the most recently used. Loaded from the cacheFile at first use """
+
+
+def readSettingsFile():
+	"""
+		This function asks the INI file parser module, that must have read the INI file, to look for the options in the sections and variables that are of interest for this module.
+
+		If the options are not present in the INI file, the existing values are not modified
+
+		This is so that we add or remove options from the INI file just by mofiying this functions. Also, the same INI entry can be read by many modules
+
+		.. note:: Make sure that the SettingsFile module has been initialized and read a valid file
+
+		::Example::
+			SettingsFile.read(INI_file)
+			ModelCache.readSettingsFile()
+
+	"""
+	global cacheSize
+	global cacheFile
+
+	if SettingsFile.getOptionInt("DEFAULT","model_cache_size") is not None:
+		cacheSize = SettingsFile.getOptionInt("DEFAULT","model_cache_size")
+	if SettingsFile.getOptionString("DEFAULT","model_cache_file"):
+		cacheFile = SettingsFile.getOptionString("DEFAULT","model_cache_file")
+#enddef
+
+
+def get(fingerprint):
+	"""
+		Looks for a Model built from the DB values having this fingerprint
+
+		:param fingerprint: ..seealso:: DBConnection.getModelFingerprint()
+		:type fingerprint: String
+
+		:returns: A copy of the cached Model, or None if not found
+		:rtype: Model or None
+	"""
+	global hits
+	global misses
+
+	models = _load()
+	if fingerprint and fingerprint in models:
+		model = models.pop(fingerprint)
+		models[fingerprint] = model
+		hits = hits + 1
+		logger.info(Messages.ModelCache_hit_S % fingerprint)
+		return model.copy()
+
+	misses = misses + 1
+	logger.info(Messages.ModelCache_miss_S % fingerprint)
+	return None
+#enddef
+
+
+def put(fingerprint, model):
+	"""
+		Keeps a copy of the Model, as it is now. Call it before the Model is consumed by Demands
+
+		:param fingerprint: ..seealso:: DBConnection.getModelFingerprint()
+		:type fingerprint: String
+		:param model: The Model just built
+		:type model: Model
+	"""
+	if not fingerprint or cacheSize <= 0:
+		return
+
+	models = _load()
+	models.pop(fingerprint, None)
+	models[fingerprint] = model.copy()
+	while len(models) > cacheSize:
+		models.popitem(last=False)
+
+	_save()
+#enddef
+
+
+def clear():
+	"""
+		Empties the cache and resets the counters
+	"""
+	global _models
+	global hits
+	global misses
+
+	_models = OrderedDict()
+	hits = 0
+	misses = 0
+	_save()
+#enddef
+
+
+def getCounters():
+	"""
+		:returns: the amount of hits, misses and the Models in the cache
+		:rtype: dict
+	"""
+	return {"hits": hits, "misses": misses, "models": len(_load())}
+#enddef
+
+
+def _load():
+	"""
+		:returns: The cached models, reading them from the cacheFile the first time
+		:rtype: OrderedDict
+	"""
+	global _models
+
+	if _models is None:
+		_models = OrderedDict()
+		if cacheFile:
+			try:
+				with open(cacheFile, "rb") as f:
+					_models = cPickle.load(f)
+				logger.info(Messages.ModelCache_loaded_D_S % (len(_models), cacheFile))
+			except IOError:
+				# There is no cache saved yet
+				pass
+			except:
+				logger.exception(Messages.ModelCache_unable_load_S % cacheFile)
+	return _models
+#enddef
+
+
+def _save():
+	"""
+		Writes the cached models to the cacheFile, if there is one
+	"""
+	if not cacheFile:
+		return
+	try:
+		with open(cacheFile, "wb") as f:
+			cPickle.dump(_models, f, cPickle.HIGHEST_PROTOCOL)
+	except:
+		logger.exception(Messages.Unable_Write_File_S % cacheFile)
+#enddef
@@ -47,6 +47,7 @@ float migrationCostK[servers][servers] = ...;		// Migration cost Multipliers def
 
 int size_of[vcdns] = ... ;							// Size requiered in a POP to host a vCDN
 int volume[servers] = ... ;							// Total storage capacity for a POP
+int canHost[servers][vcdns] = ... ;					// 1 if the POP has the resources to host the vCDN, or already has it
 
 
 float c[servers][vcdns] ; 							//cost of migrating f to servers, calculated
@@ -194,6 +195,10 @@ subject to
 	forall(i in locations, j in locations)
 		const08:
 			sum(v in clients, f in vcdns) z[v][f][i][j] * d[v][f] <= C[i][j];
+
+	forall(s in servers, f in vcdns)
+		const09:
+			x[s][f] <= canHost[s][f];
 }
 
  
@@ -0,0 +1,445 @@
+"""
+
+OMAC Decomposition by vCDN
+==========================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+Solves OMAC as one subproblem per vCDN, so the time grows with the amount of vCDNs instead of with the size of the whole MILP.
+
+The vCDNs only share the coupling rows of OMAC: the streaming capacity of the POPs (const05), their storage (const06) and the capacity of the links (const08). ..seealso:: OMACSolver.OMACProblem
+Each subproblem has the variables of one vCDN and its own terms of those rows, so the sum of their optima is a lower bound of OMAC.
+Only the optima proven by the solver are summed ..seealso:: OMACSolver.OMACSolution.bound; when a subproblem stops on the MIP gap or the time limit without
+a proven bound, the iteration gives no lower bound.
+
+> A coupling row is slack if it holds whatever the vCDNs do: the BW of all the Demands fits in D or C, or all the vCDNs fit in the volume. These rows are left out.
+> The subproblems are first solved as they are. If their solutions together meet the coupling rows, they are the optimum of OMAC.
+> Otherwise each coupling row gets a price (Lagrangian multiplier), added to the cost of the variables in the row, and the prices are updated with a subgradient method
+  until the solutions meet the rows, the lower bound reaches the best solution found, or the iterations or the time are over.
+> The solutions of the subproblems seldom meet the rows by themselves, so every few iterations they are repaired: the vCDNs of the rows that are not met
+  are solved again one after the other, each with the capacity left by the others.
+
+The subproblems of an iteration are independent, so they are solved in parallel by a multiprocessing Pool. The workers are forked with the subproblems and only receive their costs.
+The time left is shared by the subproblems that are left to solve, so that an iteration does not take the whole time limit of the decomposition.
+Each of them gets its share less a margin for what the solver does out of its time limit. The margin grows to the longest overtime of the calls,
+and an iteration or a repair that no longer fits in the time left is not started.
+
+.. note:: This module does not interact with the DB, it only works over the arrays of an OptimizationModels.OMAC
+
+:Example:
+
+	solution = solve(omac, "cbc", timeLimit=60, processes=4)
+	if solution.feasible:
+		for s,f in solution.placements(): ...
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import copy
+import logging
+import time
+from multiprocessing import Pool
+
+import Messages
+import OMACSolver
+
+logger = logging.getLogger(__name__)
+
+
+_tolerance = 1e-6
+""" Relative violation of the coupling rows accepted in a solution """
+
+_stallIterations = 5
+""" Iterations without a better lower bound after which the subgradient step is halved """
+
+_repairIterations = 5
+""" Iterations between two repairs of the solutions of the subproblems """
+
+_minimumShare = 0.01
+""" Least time limit of a subproblem, in seconds. With less time left, the iteration is not started. A time limit of 0 is no limit for the solvers """
+
+_callMargin = 0.5
+""" Seconds first held back from the time of each subproblem, for what the solver does out of its time limit: building the problem, writing it and starting CBC,
+then reading the solution. It grows to the longest overtime of the calls of solve() """
+
+
+class DecomposedSolution(object):
+	"""
+		The result of solve(), made of the solutions of the subproblems. It has the interface of OMACSolver.OMACSolution
+
+		> status = "optimal", "feasible", "limit", "infeasible" or "error" ..seealso:: OMACSolver.OMACSolution
+		> objective = cost of the solution, None without a solution
+		> bound = lower bound of the optimum given by the subproblems, None if the solver did not prove the optimum of all of them in any iteration
+		> iterations = amount of subgradient iterations
+	"""
+
+	def __init__(self, status, problems=None, solutions=None, objective=None, bound=None, iterations=0):
+		self.status = status
+		self.objective = objective
+		self.bound = bound
+		self.iterations = iterations
+		self.feasible = solutions is not None
+		self._problems = problems or []
+		self._solutions = solutions or []
+	#enddef
+
+	def placements(self):
+		"""
+			:returns: the (s,f) pairs with x[s][f] = 1
+			:rtype: list[]
+		"""
+		placements = []
+		for solution in self._solutions:
+			placements.extend( solution.placements() )
+		return sorted(placements)
+	#enddef
+
+	def servers(self):
+		"""
+			:returns: the POP `s` that serves each Demand pair (v,f), as a dictionary
+			:rtype: dict
+		"""
+		servers = dict()
+		for solution in self._solutions:
+			servers.update( solution.servers() )
+		return servers
+	#enddef
+
+	def cost(self, s, f):
+		"""
+			:returns: the cost of placing the vCDN `f` in the POP `s`
+			:rtype: float
+		"""
+		for problem in self._problems:
+			if (s,f) in problem.xColumn:
+				return problem.c[ problem.xColumn[(s,f)] ]
+		return 0
+	#enddef
+
+#endclass
+
+
+def solve(omac, solver, timeLimit=None, mipGap=None, formulation="full", processes=1, iterations=50, start=None):
+	"""
+		:param omac: An OMAC with its Topologie, POPs, vCDNs, ClientGroups, Demands and Migration Costs set
+		:type omac: OMAC
+		:param solver: Name of the solver of the subproblems. ..seealso:: OMACSolver.SOLVERS
+		:type solver: String
+		:param timeLimit: Maximum time of the whole decomposition, in seconds. None for no limit
+		:type timeLimit: float
+		:param mipGap: Relative MIP gap of the subproblems, and of the best solution to the lower bound. None for the solver's default
+		:type mipGap: float
+		:param formulation: Formulation of the subproblems. ..seealso:: OMACSolver.FORMULATIONS
+		:type formulation: String
+		:param processes: Amount of worker processes solving the subproblems
+		:type processes: int
+		:param iterations: Maximum amount of subgradient iterations
+		:type iterations: int
+		:param start: A known solution of OMAC, such as the one of HMAC, kept if nothing better is found
+		:type start: OMACSolver.Assignment
+
+		:returns: the solution
+		:rtype: DecomposedSolution, or OMACSolver.OMACSolution for the start
+
+		:raises: ValueError if the solver is unknown or not available
+	"""
+	if not OMACSolver.available(solver):
+		raise ValueError(Messages.OMAC_Solver_Not_Available_S % solver)
+
+	deadline = time.time() + timeLimit if timeLimit else None
+
+	# Without Demands, a vCDN has no constraints and places nothing
+	vcdns = sorted( set( f for (v,f),bw in omac.DemandsBW.items() if bw ) )
+	problems = [ OMACSolver.OMACProblem(omac, formulation, [f]) for f in vcdns ]
+
+	# The coupling rows, by name: their upper bound and the (problem, column, value) of their terms
+	# And for each problem, the (row, name, terms) of its coupling rows
+	upper = dict()
+	load = dict()
+	terms = dict()
+	rowsOf = [ [] for problem in problems ]
+	for i,problem in enumerate(problems):
+		coupling = problem.coupling
+		for row,rowTerms in enumerate(problem.iterRows()):
+			if row in coupling:
+				name = problem.rowNames[row]
+				upper[name] = problem.rowUpper[row]
+				load[name] = load.get(name, 0) + coupling[row]
+				terms.setdefault(name, []).extend( (i, col, val) for col,val in rowTerms )
+				rowsOf[i].append( (row, name, rowTerms) )
+	#endfor
+
+	priced = sorted( name for name in terms if load[name] > upper[name] )
+	logger.info(Messages.OMAC_Decomposed_D_subproblems_D_coupling_D_priced % (len(problems), len(terms), len(priced)))
+
+	best = None
+	if start is not None and start.excess <= _tolerance:
+		best = start.solution()
+
+	prices = dict( (name, 0.0) for name in priced )
+	priceTerms = [ [] for problem in problems ]
+	for name in priced:
+		for i,col,val in terms[name]:
+			priceTerms[i].append( (col, name, val) )
+
+	bound = None
+	# The best value of the Lagrangian, with the objectives of the subproblems even if they are not proven optima. It only guides the subgradient step
+	top = None
+	theta = 2.0
+	stall = 0
+	status = "limit"
+	iteration = 0
+
+	margin = _callMargin
+	pool = None
+	workers = 1
+	if processes > 1 and len(problems) > 1:
+		workers = min(processes, len(problems))
+		pool = Pool(workers, _initWorker, (problems,))
+	try:
+		while True:
+			remaining = None
+			if deadline is not None:
+				remaining = deadline - time.time()
+				if remaining <= 0:
+					break
+
+			costs = []
+			for i,problem in enumerate(problems):
+				c = list(problem.c)
+				for col,name,val in priceTerms[i]:
+					c[col] = c[col] + prices[name] * val
+				costs.append(c)
+
+			if pool is not None:
+				# Each worker solves its share of the subproblems one after the other. They are handed one by one to the free workers,
+				# so a worker may solve one more than the even share
+				rounds = (len(problems) + workers - 1) // workers + 1
+				share = _share(remaining, rounds, margin) if remaining is not None else None
+				if remaining is not None and share is None:
+					break
+				results = pool.map(_workerSolve, [ ((i, costs[i], None, solver, share, mipGap), deadline, margin) for i in range(len(problems)) ], 1)
+			else:
+				results = []
+				for i,problem in enumerate(problems):
+					share = None
+					if deadline is not None:
+						share = _share(deadline - time.time(), len(problems) - i, margin)
+						if share is None:
+							break
+					results.append( _solveProblem(problem, (i, costs[i], None, solver, share, mipGap)) )
+				# The time is over in the middle of the iteration: it gives neither a bound nor a solution
+				if len(results) < len(problems):
+					break
+
+			margin = max( [margin] + [ overtime for i,result,objective,values,solved,overtime in results ] )
+			solutions = [ OMACSolver.OMACSolution(problems[i], result, objective, values, solved) for i,result,objective,values,solved,overtime in results ]
+			failed = [ solution.status for solution in solutions if not solution.feasible ]
+			if failed:
+				# A subproblem is a relaxation for its vCDN: if it is infeasible, so is OMAC
+				status = "infeasible" if "infeasible" in failed else failed[0]
+				break
+
+			priceSum = sum( prices[name] * upper[name] for name in priced )
+			lagrangian = sum( solution.objective for solution in solutions ) - priceSum
+			if None not in [ solution.bound for solution in solutions ]:
+				proven = sum( solution.bound for solution in solutions ) - priceSum
+				if bound is None or proven > bound:
+					bound = proven
+			if top is None or lagrangian > top + _tolerance:
+				top = lagrangian
+				stall = 0
+			else:
+				stall = stall + 1
+				if stall >= _stallIterations:
+					theta = theta / 2
+					stall = 0
+
+			loads = dict( (name, sum( val * solutions[i].values[col] for i,col,val in terms[name] )) for name in terms )
+			violated = [ name for name in terms if loads[name] - upper[name] > _tolerance * max(1.0, abs(upper[name])) ]
+
+			logger.debug(Messages.OMAC_Lagrangian_D_value_F_D_violated % (iteration, lagrangian, len(violated)))
+
+			if violated and iteration % _repairIterations == 0 and (deadline is None or time.time() < deadline):
+				repaired = _repair(problems, solutions, costs, rowsOf, terms, upper, loads, violated, (solver, deadline, mipGap, margin))
+				if repaired is not None:
+					solutions = repaired
+					violated = []
+
+			if not violated:
+				objective = sum( problem.c[col] * solution.values[col] for problem,solution in zip(problems, solutions) for col in problem.xColumn.values() )
+				if best is None or objective < best.objective - _tolerance:
+					best = DecomposedSolution("feasible", problems, solutions, objective, bound, iteration)
+
+			if best is not None and bound is not None and best.objective - bound <= max(mipGap or 0, _tolerance) * max(1.0, abs(best.objective)):
+				status = "optimal"
+				break
+			if iteration >= iterations:
+				break
+
+			# Projected subgradient: the load of each row over its bound, not lowering the prices that are 0
+			gradient = dict( (name, loads[name] - upper[name]) for name in priced )
+			for name in priced:
+				if prices[name] <= 0 and gradient[name] < 0:
+					gradient[name] = 0
+			norm = sum( g * g for g in gradient.values() )
+			if not norm:
+				break
+
+			target = best.objective if best is not None else top + max(1.0, abs(top)) * 0.1
+			step = theta * max(target - lagrangian, _tolerance) / norm
+			for name in priced:
+				prices[name] = max(0.0, prices[name] + step * gradient[name])
+
+			iteration = iteration + 1
+		#endwhile
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+
+	if best is None:
+		return DecomposedSolution(status, bound=bound, iterations=iteration)
+
+	if isinstance(best, DecomposedSolution):
+		best.status = status if status == "optimal" else "feasible"
+		best.bound = bound
+		best.iterations = iteration
+	return best
+#enddef
+
+
+def _repair(problems, solutions, costs, rowsOf, terms, upper, loads, violated, options):
+	"""
+		Solves again, one after the other, the subproblems with terms in the violated coupling rows. Each of them gets as bound of its coupling rows
+		what the other subproblems leave, so the rows are met if all of them have a solution
+
+		:returns: the solutions of all the subproblems, or None if a subproblem has no solution
+		:rtype: OMACSolver.OMACSolution[]
+	"""
+	solver, deadline, mipGap, margin = options
+
+	contribution = [ dict( (name, sum( val * solution.values[col] for col,val in rowTerms )) for row,name,rowTerms in rows ) for rows,solution in zip(rowsOf, solutions) ]
+	involved = set( i for name in violated for i,col,val in terms[name] if contribution[i].get(name) )
+
+	# The biggest contributions to the violated rows go first, while there is more capacity left
+	order = sorted( involved, key=lambda i: -sum( contribution[i].get(name, 0) / max(1.0, abs(upper[name])) for name in violated ) )
+
+	residual = dict(loads)
+	for i in involved:
+		for name,value in contribution[i].items():
+			residual[name] = residual[name] - value
+
+	repaired = list(solutions)
+	for k,i in enumerate(order):
+		remaining = None
+		if deadline is not None:
+			remaining = _share(deadline - time.time(), len(order) - k, margin)
+			if remaining is None:
+				return None
+
+		rowUpper = list(problems[i].rowUpper)
+		for row,name,rowTerms in rowsOf[i]:
+			rowUpper[row] = upper[name] - residual[name]
+
+		i, status, objective, values, solved, overtime = _solveProblem(problems[i], (i, costs[i], rowUpper, solver, remaining, mipGap))
+		if values is None:
+			return None
+
+		# With less capacity, its optimum is no longer a bound of the subproblem
+		repaired[i] = OMACSolver.OMACSolution(problems[i], status, objective, values)
+		for row,name,rowTerms in rowsOf[i]:
+			residual[name] = residual[name] + sum( val * values[col] for col,val in rowTerms )
+	#endfor
+
+	return repaired
+#enddef
+
+
+def _share(left, calls, margin):
+	"""
+		:param left: Seconds left
+		:type left: float
+		:param calls: Amount of calls to the solver, one after the other, in the time left
+		:type calls: int
+		:param margin: Seconds that a call takes over its time limit
+		:type margin: float
+
+		:returns: the time limit of each of the calls, so that all of them end in the time left. None if there is not enough time for them
+		:rtype: float
+	"""
+	share = float(left) / calls - margin
+	if share < _minimumShare:
+		return None
+	return share
+#enddef
+
+
+def _solveProblem(problem, task):
+	"""
+		Solves a subproblem with the costs and row bounds of the task
+
+		:param task: index, costs, upper bounds of the rows (None to keep them), solver, timeLimit, mipGap
+		:type task: tuple
+
+		:returns: index, status, objective, values and proven lower bound of the solution, and the seconds that the call took over the time limit
+		:rtype: tuple
+	"""
+	i, c, rowUpper, solver, timeLimit, mipGap = task
+	started = time.time()
+	problem = copy.copy(problem)
+	problem.c = c
+	if rowUpper is not None:
+		problem.rowUpper = rowUpper
+	solution = OMACSolver.solve(problem, solver, timeLimit, mipGap)
+	overtime = time.time() - started - timeLimit if timeLimit else 0
+	return i, solution.status, solution.objective, solution.values, solution.bound, overtime
+#enddef
+
+
+_workerProblems = None
+""" In a worker process of solve(); the subproblems
+"""
+
+def _initWorker(problems):
+	"""
+		Initializer of the worker processes of solve().
+		The processes are forked, so the subproblems are shared with the parent and not copied through a pipe
+	"""
+	global _workerProblems
+	_workerProblems = problems
+#enddef
+
+def _workerSolve(job):
+	"""
+		Runs _solveProblem() in a worker process of solve(). The time limit of the task is cut to what is left until the deadline,
+		and the subproblem is not started if there is no time left
+
+		:param job: the task of _solveProblem(), the deadline of solve() and the margin of the calls
+		:type job: tuple
+	"""
+	task, deadline, margin = job
+	if deadline is not None:
+		timeLimit = min(task[4], deadline - time.time() - margin)
+		if timeLimit < _minimumShare:
+			return task[0], "limit", None, None, None, 0
+		task = task[:4] + (timeLimit,) + task[5:]
+	return _solveProblem(_workerProblems[task[0]], task)
+#enddef
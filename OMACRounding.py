@@ -0,0 +1,206 @@
+"""
+
+OMAC by LP Rounding
+===================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+Fast mode of OMAC, for answers in seconds instead of an exact MILP: it solves the LP relaxation of OMAC and rounds its x and y to a placement of the vCDNs.
+
+> The LP relaxation is the OMAC problem with continuous variables. ..seealso:: OMACSolver.OMACProblem.relaxation() Its optimum is a lower bound of OMAC.
+> The x of each vCDN are rounded together (dependent rounding): one random threshold U is drawn for the vCDN, and it is placed in every POP
+  where x[s][f] is at least U times its biggest x. So the POP with the biggest x is always kept, and POPs with a similar x are kept or dropped together.
+> Each Demand pair is then served by one of the kept POPs, drawn with a probability proportional to its y.
+> The rounded placement is routed on the shortest paths, which may exceed D, the volume or C. So it is repaired ..seealso:: OMACSolver.Assignment.repair()
+  and then polished ..seealso:: OMACSolver.Assignment.polish()
+> Other servers and paths may fit where the ones of a rounding do not. So the cheapest rounded placements that do not fit are also solved with x fixed,
+  a much smaller problem than OMAC ..seealso:: OMACSolver.OMACProblem.fixed(), while they are cheaper than the best solution and there is time left
+
+The rounding is repeated a few times, and the HMAC result is also repaired and polished if it is given. The feasible placement with the lowest cost is kept,
+and its gap to the LP bound is an upper bound of its gap to the optimum.
+
+.. note:: This module does not interact with the DB, it only works over an OMACSolver.OMACProblem
+
+:Example:
+
+	solution = solve(omac, problem, "highs", timeLimit=10)
+	if solution.feasible:
+		gap = (solution.objective - solution.bound) / solution.objective
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import logging
+import random
+import time
+
+import Messages
+import OMACSolver
+
+logger = logging.getLogger(__name__)
+
+
+_tolerance = 1e-6
+""" Values of x and y under this are taken as 0 """
+
+_infinite = float("inf")
+
+_searchShare = 0.5
+""" Share of the time left that is given to the repair and polish of the roundings; the rest is for the placements solved with x fixed """
+
+
+def solve(omac, problem, solver, timeLimit=None, rounds=10, start=None, seed=0):
+	"""
+		:param omac: The OMAC of the problem
+		:type omac: OptimizationModels.OMAC
+		:param problem: The MILP of OMAC
+		:type problem: OMACSolver.OMACProblem
+		:param solver: Name of the solver of the LP relaxation. ..seealso:: OMACSolver.SOLVERS
+		:type solver: String
+		:param timeLimit: Maximum time of the LP and the roundings, in seconds. None for no limit. At least one rounding is done
+		:type timeLimit: float
+		:param rounds: Amount of roundings of the LP solution
+		:type rounds: int
+		:param start: A known solution, such as the one of HMAC, that is repaired and polished as one more rounding
+		:type start: OMACSolver.Assignment
+		:param seed: Seed of the random thresholds, so the same problem gives the same solution
+		:type seed: int
+
+		:returns: the best solution found, "optimal" if its cost is the LP optimum and "rounded" otherwise, with the LP optimum in its `bound`.
+		 Without solution, its status is the one of the LP, or "limit" if no rounding could be repaired
+		:rtype: OMACSolver.OMACSolution
+
+		:raises: ValueError if the solver is unknown or not available
+	"""
+	deadline = time.time() + timeLimit if timeLimit else None
+
+	relaxation = OMACSolver.solve(problem.relaxation(), solver, timeLimit)
+	if not relaxation.feasible:
+		return OMACSolver.OMACSolution(problem, relaxation.status)
+
+	bound = relaxation.objective
+	values = relaxation.values
+	generator = random.Random(seed)
+
+	candidates = []
+	if start is not None:
+		candidates.append( (start.placements, dict( (pair, start.servers[k]) for k,pair in enumerate(problem.demands) )) )
+	candidates.extend( _round(problem, values, generator) for r in range(max(rounds, 1)) )
+
+	best = None
+	seen = set()
+	# The placements of the roundings that do not fit on the shortest paths, with their cost
+	rounded = dict()
+	for i,(placements, servers) in enumerate(candidates):
+		left = deadline - time.time() if deadline else None
+		if left is not None and left <= 0 and best is not None:
+			break
+		# Part of the time left is shared by the candidates that are left, for their repair and polish
+		share = max(left, 0) * _searchShare / (len(candidates) - i) if left is not None else _infinite
+
+		assignment = OMACSolver.Assignment(omac, problem, placements, servers)
+		# The same rounding is often drawn again
+		key = (frozenset(assignment.placements), tuple(assignment.servers))
+		if key in seen:
+			continue
+		seen.add(key)
+
+		if assignment.excess > OMACSolver._tolerance:
+			rounded.setdefault(key[0], assignment.cost)
+			assignment.repair(share / 2)
+			if assignment.excess > OMACSolver._tolerance:
+				rounded.setdefault(frozenset(assignment.placements), assignment.cost)
+		if assignment.excess <= OMACSolver._tolerance:
+			assignment.polish(share / 2)
+			if best is None or assignment.cost < best.objective:
+				best = assignment.solution()
+	#endfor
+
+	# Other servers and paths may fit where the ones of the roundings do not: the cheapest placements are solved with x fixed, while they can improve
+	for placements,cost in sorted(rounded.items(), key=lambda item: item[1]):
+		left = deadline - time.time() if deadline else None
+		if (left is not None and left <= 0) or (best is not None and cost >= best.objective):
+			break
+		best = _route(problem, placements, solver, left, best)
+	#endfor
+
+	if best is None:
+		logger.warning(Messages.OMAC_Rounding_Not_Repaired_D % len(candidates))
+		return OMACSolver.OMACSolution(problem, "limit", bound=bound)
+
+	best.status = "optimal" if best.objective <= bound + _tolerance else "rounded"
+	best.bound = bound
+	logger.info(Messages.OMAC_Rounded_F_bound_F_D_rounds % (best.objective, bound, len(candidates)))
+	return best
+#enddef
+
+
+def _route(problem, placements, solver, timeLimit, best):
+	"""
+		:returns: the best servers and flows for the placements, if they fit and are cheaper than `best`; otherwise `best`
+		:rtype: OMACSolver.OMACSolution
+	"""
+	values = dict( (col, 1 if key in placements else 0) for key,col in problem.xColumn.items() )
+	routed = OMACSolver.solve(problem.fixed(values), solver, timeLimit)
+	if not routed.feasible or (best is not None and routed.objective >= best.objective):
+		return best
+	return OMACSolver.OMACSolution(problem, "rounded", routed.objective, routed.values)
+#enddef
+
+
+def _round(problem, values, generator):
+	"""
+		:returns: a placement of the vCDNs and a server of each Demand pair, rounded from the values of the LP
+		:rtype: (set, dict)
+	"""
+	x = dict()
+	for (s,f),col in problem.xColumn.items():
+		x.setdefault(f, []).append( (values[col], s) )
+
+	placements = set()
+	for f,pops in sorted(x.items()):
+		biggest, first = max(pops)
+		threshold = generator.random() * biggest
+		placements.add( (first,f) )
+		placements.update( (s,f) for value,s in pops if value >= threshold and value > _tolerance )
+	#endfor
+
+	y = dict()
+	for (s,k),col in problem.yColumn.items():
+		y.setdefault(k, []).append( (values[col], s) )
+
+	servers = dict()
+	for k,pair in enumerate(problem.demands):
+		f = pair[1]
+		weights = [ (max(value, 0), s) for value,s in y.get(k, []) if (s,f) in placements ]
+		total = sum( value for value,s in weights )
+		if total <= _tolerance:
+			# The LP serves the pair from POPs that were not kept: the Assignment gives it to its first placement
+			continue
+		draw = generator.random() * total
+		for value,s in weights:
+			draw = draw - value
+			if draw <= 0:
+				break
+		servers[pair] = s
+	#endfor
+
+	return placements, servers
+#enddef
@@ -0,0 +1,1127 @@
+"""
+
+In-process OMAC Solver
+======================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+Builds the OMAC formulation of `OMAC.mod` as a sparse MILP and solves it with an open-source solver, without the CPLEX `oplrun`.
+
+The variables are the ones of the .mod file:
+> x[s][f] = 1 if the vCDN `f` is placed in the POP `s`; binary
+> y[s][v][f] = 1 if the POP `s` serves the Demand of the client `v` for the vCDN `f`; binary
+> z[v][f][i][j] = fraction of that Demand that goes through the link from `i` to `j`; continuous in [0,1]
+
+The objective is to minimize the sum of x[s][f]*c[s][f], with c[s][f] = hopcount[serverOf[f]][s] * size_of[f] * migrationCostK[serverOf[f]][s]
+
+The constraints (const01 to const08) are:
+> const01, const02: x and y are 0 or 1 (the bounds of the variables)
+> const03: y[s][v][f] <= x[s][f]
+> const04: the sum over s of y[s][v][f] is 1, if d[v][f] != 0
+> const05: the sum over v,f of y[s][v][f] * d[v][f] is at most D[s]
+> const06: the sum over f of x[s][f] * size_of[f] is at most volume[s]
+> const07: the flow conservation of z at each Location `i`: what goes out minus what comes in is y[s][v][f] at the Location of the POP `s`, -1 at the Location of the client, 0 elsewhere
+> const08: the sum over v,f of z[v][f][i][j] * d[v][f] is at most C[i][j]
+
+Only the pairs (v,f) with a Demand have y and z variables, and only the links with C[i][j] != 0 have z variables: the others are 0 in any solution of the .mod file.
+In const07, the .mod file asks for the conservation once per POP, which only holds if all the y are 0. Here there is one conservation per Location, with all the POPs of that Location.
+
+Solvers:
+> highs: HiGHS with `scipy.optimize.milp` (scipy >= 1.9)
+> cbc: CBC with PuLP
+
+Both accept a time limit (in seconds) and a relative MIP gap. If the time limit is reached, the best solution found is returned.
+
+With the `compact` formulation, the flows are added by client Location, which makes the problem much smaller with the same optimum ..seealso:: OMACProblem
+
+The problem can also be written as a CPLEX LP file or a free MPS file, to be solved outside of vIOS. ..seealso:: writeLP(), writeMPS()
+
+A known solution, such as the one of HMAC, can be given as an Assignment: it is improved by a local search, given to CBC as MIP start, written as a CPLEX .mst file,
+and returned if the solver finds nothing better. ..seealso:: Assignment, writeMST()
+
+.. note:: This module does not interact with the DB, it only works over the arrays of an OptimizationModels.OMAC
+
+:Example:
+
+	problem = OMACProblem(omac)
+	solution = solve(problem, "cbc", timeLimit=60, mipGap=0.01)
+	if solution.feasible:
+		for s,f in solution.placements(): ...
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import copy
+import logging
+import os
+import tempfile
+import time
+from array import array
+
+import Messages
+
+try:
+	import numpy
+	from scipy import sparse
+	from scipy.optimize import milp, LinearConstraint, Bounds
+except ImportError:
+	# scipy < 1.9 has no milp
+	milp = None
+
+try:
+	import pulp
+except ImportError:
+	pulp = None
+
+logger = logging.getLogger(__name__)
+
+
+_infinite = float("inf")
+
+_tolerance = 1e-6
+""" Excess allowed by the local search, for the rounding of the loads """
+
+_provenShare = 0.9
+""" Share of its time limit under which CBC is taken as having ended by itself, and not on the limit """
+
+SOLVERS = ("highs", "cbc")
+""" Names of the solvers accepted by solve() """
+
+FORMULATIONS = ("full", "compact")
+""" Formulations of the OMACProblem """
+
+
+def available(solver):
+	"""
+		:param solver: Name of the solver. ..seealso:: SOLVERS
+		:type solver: String
+
+		:returns: True if the solver can be used
+		:rtype: bool
+	"""
+	if solver == "highs":
+		return milp is not None
+	if solver == "cbc":
+		return pulp is not None and bool(pulp.PULP_CBC_CMD().available())
+	return False
+#enddef
+
+
+class OMACProblem(object):
+	"""
+		The OMAC MILP in sparse form: minimize c.x subject to rowLower <= A.x <= rowUpper and lower <= x <= upper
+
+		The columns are the variables, numbered in this order: all the x, then the y of each Demand pair, then the flows (z or g).
+		The matrix A is kept by coordinates (rows, cols, vals), so it can be given to any solver. The entries of a row are consecutive.
+
+		> demands = list of (v,f) pairs with d[v][f] != 0
+		> arcs = list of (i,j) Location pairs with C[i][j] != 0
+		> sinks = list of the Locations of the clients with Demands
+		> xColumn[(s,f)], yColumn[(s,k)], zColumn[(k,a)], gColumn[(t,a)] = column of each variable, `k`, `a` and `t` being indexes of `demands`, `arcs` and `sinks`
+		> vcdns = the vCDNs of the problem
+		> coupling[row] = for the rows that join different vCDNs (const05, const06 and const08), the biggest value of their terms. For const08, in a flow without cycles
+
+		The problem can be restricted to some vCDNs: it then has only their variables, and the coupling rows only have their terms, with the same bounds.
+		This is a relaxation of OMAC for those vCDNs ..seealso:: OMACDecomposition
+
+		Formulations:
+		> full: the one of the .mod file, with a z flow for each Demand pair
+		> compact: the flows of all the Demand pairs that go to the same Location are added in one flow g[t][i][j], in BW units.
+		  const07 becomes the conservation of g, with the BW served by each POP as source, and const08 bounds the sum of the g over each link.
+		  Any such flow can be split back into a path flow for each Demand pair, so both formulations have the same optimum. The flow variables go from Demand pairs x links to client Locations x links.
+	"""
+
+	def __init__(self, omac, formulation="full", vcdns=None):
+		"""
+			:param omac: An OMAC with its Topologie, POPs, vCDNs, ClientGroups, Demands and Migration Costs set
+			:type omac: OMAC
+			:param formulation: "full" or "compact"
+			:type formulation: String
+			:param vcdns: Indexes of the vCDNs of the problem. By default, all of them
+			:type vcdns: int[]
+
+			:raises: ValueError if the formulation is unknown
+		"""
+		if formulation not in FORMULATIONS:
+			raise ValueError(Messages.Unknown_OMAC_Formulation_S % formulation)
+		self.formulation = formulation
+
+		S = omac.POPs
+		L = omac.Locations
+		d = omac.DemandsBW
+
+		self.vcdns = sorted(vcdns) if vcdns is not None else range(omac.vCDNs)
+		selected = set(self.vcdns)
+
+		self.demands = sorted( pair for pair,bw in d.items() if bw and pair[1] in selected )
+		self.arcs = sorted( arc for arc,capacity in omac.Capacity.items() if capacity )
+		self.sinks = sorted( set( omac.Client_location[v] for v,f in self.demands ) )
+
+		self.c = []
+		self.lower = []
+		self.upper = []
+		self.integer = []
+		self.names = []
+
+		self.rows = []
+		self.cols = []
+		self.vals = []
+		self.rowLower = []
+		self.rowUpper = []
+		self.rowNames = []
+		self.coupling = dict()
+
+		# Variables
+
+		self.xColumn = dict()
+		for s in range(S):
+			for f in self.vcdns:
+				origin = omac.vCDN_pop[f]
+				cost = omac.hops[origin][s] * (omac.vCDN_size[f] or 0) * omac.MigCosts[origin][s]
+				# const09: the vCDN can only be placed in the POPs that can host it
+				self.xColumn[(s,f)] = self._addColumn("x_%d_%d" % (s+1, f+1), cost, 0, omac.getHosting(s, f), True)
+
+		self.yColumn = dict()
+		for k,(v,f) in enumerate(self.demands):
+			for s in range(S):
+				self.yColumn[(s,k)] = self._addColumn("y_%d_%d_%d" % (s+1, v+1, f+1), 0, 0, 1, True)
+
+		self.zColumn = dict()
+		self.gColumn = dict()
+		if formulation == "full":
+			for k,(v,f) in enumerate(self.demands):
+				for a,(i,j) in enumerate(self.arcs):
+					self.zColumn[(k,a)] = self._addColumn("z_%d_%d_%d_%d" % (v+1, f+1, i+1, j+1), 0, 0, 1, False)
+		else:
+			for t,sink in enumerate(self.sinks):
+				for a,(i,j) in enumerate(self.arcs):
+					self.gColumn[(t,a)] = self._addColumn("g_%d_%d_%d" % (sink+1, i+1, j+1), 0, 0, _infinite, False)
+
+		# Constraints
+
+		for k,(v,f) in enumerate(self.demands):
+			for s in range(S):
+				self._addRow("const03_%d_%d_%d" % (s+1, v+1, f+1), [ (self.yColumn[(s,k)], 1), (self.xColumn[(s,f)], -1) ], -_infinite, 0)
+
+		for k,(v,f) in enumerate(self.demands):
+			self._addRow("const04_%d_%d" % (v+1, f+1), [ (self.yColumn[(s,k)], 1) for s in range(S) ], 1, 1)
+
+		bw = sum( d[pair] for pair in self.demands )
+		storage = sum( omac.vCDN_size[f] or 0 for f in self.vcdns )
+
+		for s in range(S):
+			if omac.POP_netBW[s] is not None:
+				self._addRow("const05_%d" % (s+1), [ (self.yColumn[(s,k)], d[pair]) for k,pair in enumerate(self.demands) ], -_infinite, omac.POP_netBW[s], bw)
+
+		for s in range(S):
+			if omac.POP_storage[s] is not None:
+				self._addRow("const06_%d" % (s+1), [ (self.xColumn[(s,f)], omac.vCDN_size[f] or 0) for f in self.vcdns ], -_infinite, omac.POP_storage[s], storage)
+
+		popsAt = [ [] for i in range(L) ]
+		for s in range(S):
+			popsAt[omac.POP_location[s]].append(s)
+		arcsOut = [ [] for i in range(L) ]
+		arcsIn = [ [] for i in range(L) ]
+		for a,(i,j) in enumerate(self.arcs):
+			arcsOut[i].append(a)
+			arcsIn[j].append(a)
+
+		if formulation == "full":
+			for k,(v,f) in enumerate(self.demands):
+				client = omac.Client_location[v]
+				for i in range(L):
+					terms = [ (self.zColumn[(k,a)], 1) for a in arcsOut[i] ]
+					terms.extend( (self.zColumn[(k,a)], -1) for a in arcsIn[i] )
+					terms.extend( (self.yColumn[(s,k)], -1) for s in popsAt[i] )
+					rhs = -1 if i == client else 0
+					self._addRow("const07_%d_%d_%d" % (v+1, f+1, i+1), terms, rhs, rhs)
+
+			for a,(i,j) in enumerate(self.arcs):
+				self._addRow("const08_%d_%d" % (i+1, j+1), [ (self.zColumn[(k,a)], d[pair]) for k,pair in enumerate(self.demands) ], -_infinite, omac.Capacity[(i,j)], bw)
+		else:
+			demandsTo = [ [] for t in self.sinks ]
+			sinkIndex = dict( (sink,t) for t,sink in enumerate(self.sinks) )
+			for k,(v,f) in enumerate(self.demands):
+				demandsTo[ sinkIndex[omac.Client_location[v]] ].append(k)
+
+			for t,sink in enumerate(self.sinks):
+				for i in range(L):
+					terms = [ (self.gColumn[(t,a)], 1) for a in arcsOut[i] ]
+					terms.extend( (self.gColumn[(t,a)], -1) for a in arcsIn[i] )
+					terms.extend( (self.yColumn[(s,k)], -d[self.demands[k]]) for s in popsAt[i] for k in demandsTo[t] )
+					rhs = -sum( d[self.demands[k]] for k in demandsTo[t] ) if i == sink else 0
+					self._addRow("const07_%d_%d" % (sink+1, i+1), terms, rhs, rhs)
+
+			for a,(i,j) in enumerate(self.arcs):
+				self._addRow("const08_%d_%d" % (i+1, j+1), [ (self.gColumn[(t,a)], 1) for t in range(len(self.sinks)) ], -_infinite, omac.Capacity[(i,j)], bw)
+	#enddef
+
+	def _addColumn(self, name, cost, lower, upper, integer):
+		self.c.append(cost)
+		self.lower.append(lower)
+		self.upper.append(upper)
+		self.integer.append(integer)
+		self.names.append(name)
+		return len(self.c) - 1
+	#enddef
+
+	def _addRow(self, name, terms, lower, upper, load=None):
+		# `load` is given for the coupling rows
+		if not terms and lower <= 0 <= upper:
+			return
+		row = len(self.rowLower)
+		if load is not None:
+			self.coupling[row] = load
+		for col,val in terms:
+			self.rows.append(row)
+			self.cols.append(col)
+			self.vals.append(val)
+		self.rowLower.append(lower)
+		self.rowUpper.append(upper)
+		self.rowNames.append(name)
+	#enddef
+
+	def columns(self):
+		"""
+			:returns: the amount of variables
+			:rtype: int
+		"""
+		return len(self.c)
+	#enddef
+
+	def constraints(self):
+		"""
+			:returns: the amount of constraints
+			:rtype: int
+		"""
+		return len(self.rowLower)
+	#enddef
+
+	def relaxation(self):
+		"""
+			:returns: a copy of the problem where all the variables are continuous. Its optimum is a lower bound of OMAC
+			:rtype: OMACProblem
+		"""
+		relaxed = copy.copy(self)
+		relaxed.integer = [ False ] * self.columns()
+		return relaxed
+	#enddef
+
+	def fixed(self, values):
+		"""
+			:param values: Value of some columns, such as the x of an Assignment ..seealso:: Assignment.start()
+			:type values: dict
+
+			:returns: a copy of the problem where these columns are fixed to their value. With all the x fixed, only the servers of the Demand pairs and the flows are left
+			:rtype: OMACProblem
+		"""
+		fixed = copy.copy(self)
+		fixed.lower = list(self.lower)
+		fixed.upper = list(self.upper)
+		for col,value in values.items():
+			fixed.lower[col] = value
+			fixed.upper[col] = value
+		return fixed
+	#enddef
+
+	def violation(self, values):
+		"""
+			:param values: Value of each column
+			:type values: float[]
+
+			:returns: the biggest amount by which a row or a bound is not met by the values, relative to the bound if it is bigger than 1
+			:rtype: float
+		"""
+		activity = [ 0 ] * self.constraints()
+		for row,col,val in zip(self.rows, self.cols, self.vals):
+			activity[row] = activity[row] + val * values[col]
+
+		worst = 0
+		for value,lower,upper in zip(activity + list(values), self.rowLower + self.lower, self.rowUpper + self.upper):
+			if value < lower:
+				worst = max(worst, (lower - value) / max(1.0, abs(lower)))
+			elif value > upper:
+				worst = max(worst, (value - upper) / max(1.0, abs(upper)))
+		return worst
+	#enddef
+
+	def iterRows(self):
+		"""
+			Iterates over the rows of A, in order
+
+			:returns: the (column, value) terms of each row, one row at a time
+			:rtype: iterator
+		"""
+		e = 0
+		entries = len(self.rows)
+		for r in range(self.constraints()):
+			terms = []
+			while e < entries and self.rows[e] == r:
+				terms.append( (self.cols[e], self.vals[e]) )
+				e = e + 1
+			yield terms
+	#enddef
+
+	def constraintsOf(self, r):
+		"""
+			A row with both bounds is split in 2 constraints, as LP and MPS files and PuLP have no ranges. The second one is named <name>_low
+
+			:returns: the (name, sense, rhs) of the constraints of the row `r`; sense is "E", "L" or "G"
+			:rtype: list[]
+		"""
+		name = self.rowNames[r]
+		lower = self.rowLower[r]
+		upper = self.rowUpper[r]
+		if lower == upper:
+			return [ (name, "E", lower) ]
+		constraints = []
+		if upper != _infinite:
+			constraints.append( (name, "L", upper) )
+		if lower != -_infinite:
+			constraints.append( (name + "_low" if constraints else name, "G", lower) )
+		return constraints
+	#enddef
+
+#endclass
+
+
+class OMACSolution(object):
+	"""
+		The result of solve()
+
+		> status = "optimal", "feasible" (a limit was reached with a solution), "limit" (a limit was reached without a solution), "infeasible", "error" or "rounded" (a rounding of the LP relaxation ..seealso:: OMACRounding). PuLP reports the solutions of CBC as "optimal" even if a limit was reached
+		> objective = value of the objective, None without a solution
+		> values = value of each column, None without a solution
+		> bound = lower bound of the optimum, if it is known. The solvers give it when it is proven: the dual bound of HiGHS, and the objective of CBC
+		  if it stopped before the time limit without a MIP gap
+	"""
+
+	def __init__(self, problem, status, objective=None, values=None, bound=None):
+		self.problem = problem
+		self.status = status
+		self.objective = objective
+		self.values = values
+		self.bound = bound
+		self.feasible = values is not None
+	#enddef
+
+	def placements(self):
+		"""
+			:returns: the (s,f) pairs with x[s][f] = 1
+			:rtype: list[]
+		"""
+		if not self.feasible:
+			return []
+		return sorted( key for key,col in self.problem.xColumn.items() if self.values[col] > 0.5 )
+	#enddef
+
+	def servers(self):
+		"""
+			:returns: the POP `s` that serves each Demand pair (v,f), as a dictionary
+			:rtype: dict
+		"""
+		if not self.feasible:
+			return dict()
+		return dict( (self.problem.demands[k], s) for (s,k),col in self.problem.yColumn.items() if self.values[col] > 0.5 )
+	#enddef
+
+	def cost(self, s, f):
+		"""
+			:returns: the cost of placing the vCDN `f` in the POP `s`
+			:rtype: float
+		"""
+		return self.problem.c[ self.problem.xColumn[(s,f)] ]
+	#enddef
+
+#endclass
+
+
+class Assignment(object):
+	"""
+		A solution of OMAC given by its binary variables: the POPs where each vCDN is placed (x) and the POP that serves each Demand pair (y)
+
+		Each Demand pair is routed on the shortest path of the Topologie from its POP to its client, which gives the flows.
+		This routing is only one of the possible ones: an Assignment without excess is feasible for OMAC, but a feasible placement may have an excess with these paths.
+
+		> placements = set of the (s,f) pairs with x[s][f] = 1
+		> servers = POP `s` that serves each Demand pair, in the order of problem.demands
+		> cost = value of the objective
+		> excess = amount by which D, volume and C are exceeded, plus the BW of the Demand pairs without a path and the size of the placements in POPs that cannot host them. 0 if the Assignment is feasible
+
+		It is used as MIP start of the solvers and can be improved by a local search. ..seealso:: polish()
+	"""
+
+	def __init__(self, omac, problem, placements, servers):
+		"""
+			The Demand pairs without a server in `servers` are served by their first placement
+
+			:param omac: The OMAC of the problem
+			:type omac: OMAC
+			:param problem: The problem
+			:type problem: OMACProblem
+			:param placements: The (s,f) pairs with x[s][f] = 1
+			:type placements: set
+			:param servers: The POP `s` that serves each Demand pair (v,f)
+			:type servers: dict
+		"""
+		self.problem = problem
+
+		d = omac.DemandsBW
+		self._bw = [ d[pair] for pair in problem.demands ]
+		self._D = omac.POP_netBW
+		self._volume = omac.POP_storage
+		self._size = [ size or 0 for size in omac.vCDN_size ]
+		self._capacity = [ omac.Capacity[arc] for arc in problem.arcs ]
+
+		self._cost = dict( (key, problem.c[col]) for key,col in problem.xColumn.items() )
+		self._forbidden = set( key for key,col in problem.xColumn.items() if problem.upper[col] < 1 )
+
+		# The routes are the arcs of the shortest path from the Location of the POP to the one of the client; None without a path
+		self._omac = omac
+		self._arcIndex = dict( (arc,a) for a,arc in enumerate(problem.arcs) )
+		self._routes = dict()
+
+		self.placements = set()
+		self.servers = [ None ] * len(problem.demands)
+		self.cost = 0
+		self.excess = 0
+
+		self._popLoad = [ 0 ] * omac.POPs
+		self._storage = [ 0 ] * omac.POPs
+		self._arcLoad = [ 0 ] * len(problem.arcs)
+		self._served = dict()
+
+		self._demandsOf = [ [] for f in range(omac.vCDNs) ]
+		for k,(v,f) in enumerate(problem.demands):
+			self._demandsOf[f].append(k)
+
+		for s,f in sorted(placements):
+			self._place(s, f, 1)
+
+		for k,pair in enumerate(problem.demands):
+			s = servers.get(pair)
+			if s is None:
+				s = min( [ t for t,g in self.placements if g == pair[1] ] or [ omac.vCDN_pop[pair[1]] ] )
+			if (s,pair[1]) not in self.placements:
+				self._place(s, pair[1], 1)
+			self._serve(k, s, 1)
+		#endfor
+	#enddef
+
+	def _route(self, s, k):
+		omac = self._omac
+		v = self.problem.demands[k][0]
+		key = (omac.POP_location[s], omac.Client_location[v])
+		if key not in self._routes:
+			names = omac.topologieGraph.vs['name']
+			path = omac.paths.path(omac.Location_name[key[1]], omac.Location_name[key[0]])
+			locations = [ omac.Location_nameIndex[names[vertex]] for vertex in reversed(path) ]
+			if key[0] != key[1] and not locations:
+				self._routes[key] = None
+			else:
+				arcs = [ self._arcIndex.get( (locations[m], locations[m+1]) ) for m in range(len(locations) - 1) ]
+				self._routes[key] = None if None in arcs else arcs
+		return self._routes[key]
+	#enddef
+
+	def _over(self, load, limit):
+		if limit is None or load <= limit:
+			return 0
+		return load - limit
+	#enddef
+
+	def _place(self, s, f, sign):
+		self.excess = self.excess - self._over(self._storage[s], self._volume[s])
+		self._storage[s] = self._storage[s] + sign * self._size[f]
+		self.excess = self.excess + self._over(self._storage[s], self._volume[s])
+		if (s,f) in self._forbidden:
+			self.excess = self.excess + sign * max(self._size[f], 1)
+		self.cost = self.cost + sign * self._cost[(s,f)]
+		if sign > 0:
+			self.placements.add( (s,f) )
+		else:
+			self.placements.discard( (s,f) )
+	#enddef
+
+	def _serve(self, k, s, sign):
+		bw = self._bw[k]
+		self.excess = self.excess - self._over(self._popLoad[s], self._D[s])
+		self._popLoad[s] = self._popLoad[s] + sign * bw
+		self.excess = self.excess + self._over(self._popLoad[s], self._D[s])
+
+		route = self._route(s, k)
+		if route is None:
+			self.excess = self.excess + sign * bw
+		else:
+			for a in route:
+				self.excess = self.excess - self._over(self._arcLoad[a], self._capacity[a])
+				self._arcLoad[a] = self._arcLoad[a] + sign * bw
+				self.excess = self.excess + self._over(self._arcLoad[a], self._capacity[a])
+		self.servers[k] = s if sign > 0 else None
+		key = (s, self.problem.demands[k][1])
+		self._served[key] = self._served.get(key, 0) + sign
+	#enddef
+
+	def _moveAll(self, demands, targets):
+		# Moves each Demand pair to the target that adds the least excess. Returns the (k, previous server) moved
+		moved = []
+		for k in demands:
+			previous = self.servers[k]
+			self._serve(k, previous, -1)
+			best = None
+			for t in targets:
+				before = self.excess
+				self._serve(k, t, 1)
+				if best is None or self.excess - before < best[0]:
+					best = (self.excess - before, t)
+				self._serve(k, t, -1)
+			self._serve(k, best[1], 1)
+			moved.append( (k, previous) )
+		return moved
+	#enddef
+
+	def _undo(self, moved):
+		for k,previous in reversed(moved):
+			self._serve(k, self.servers[k], -1)
+			self._serve(k, previous, 1)
+	#enddef
+
+	def polish(self, timeLimit):
+		"""
+			Local search that lowers the cost without raising the excess. For each placement with a cost, the most expensive first, it tries:
+			> to close it, moving its Demand pairs to the other placements of the vCDN
+			> to move it, with its Demand pairs, to a POP where its cost is lower
+
+			The first move that improves is applied, until none does or the time is over
+
+			:param timeLimit: Maximum time of the search, in seconds
+			:type timeLimit: float
+
+			:returns: the amount of moves applied
+			:rtype: int
+		"""
+		deadline = time.time() + timeLimit
+		moves = 0
+		improved = True
+		while improved:
+			improved = False
+			for s,f in sorted(self.placements, key=lambda p: (-self._cost[p], p)):
+				if time.time() > deadline:
+					return moves
+				if self._cost[(s,f)] <= 0 or (s,f) not in self.placements:
+					continue
+				if self._close(s, f) or self._relocate(s, f, deadline):
+					moves = moves + 1
+					improved = True
+			#endfor
+		#endwhile
+		return moves
+	#enddef
+
+	def repair(self, timeLimit):
+		"""
+			Local search that lowers the excess. It moves, to the POP that lowers the excess the most and then the cost:
+			> the Demand pairs served by a POP over its D, or routed through a link over its C or without a path
+			> the vCDNs in a POP over its volume or in a POP that cannot host them, with their Demand pairs
+
+			A placement is opened when a Demand pair moves to a POP without its vCDN, and closed when its last Demand pair leaves it.
+			The moves are applied until none lowers the excess or the time is over
+
+			:param timeLimit: Maximum time of the search, in seconds
+			:type timeLimit: float
+
+			:returns: the amount of moves applied
+			:rtype: int
+		"""
+		deadline = time.time() + timeLimit
+		moves = 0
+		improved = True
+		while improved and self.excess > _tolerance:
+			improved = False
+			for k in self._overloaded():
+				if time.time() > deadline:
+					return moves
+				if self._moveDemand(k):
+					moves = moves + 1
+					improved = True
+			#endfor
+			for s,f in sorted(self.placements):
+				if time.time() > deadline:
+					return moves
+				overStored = self._volume[s] is not None and self._storage[s] > self._volume[s]
+				if (overStored or (s,f) in self._forbidden) and self._moveVCDN(s, f):
+					moves = moves + 1
+					improved = True
+			#endfor
+		#endwhile
+		return moves
+	#enddef
+
+	def _overloaded(self):
+		# The Demand pairs in a POP over its D or on a link over its C
+		overloaded = []
+		for k,s in enumerate(self.servers):
+			if self._D[s] is not None and self._popLoad[s] > self._D[s]:
+				overloaded.append(k)
+				continue
+			route = self._route(s, k)
+			if route is None or [ a for a in route if self._arcLoad[a] > self._capacity[a] ]:
+				overloaded.append(k)
+		return overloaded
+	#enddef
+
+	def _reassign(self, k, t):
+		f = self.problem.demands[k][1]
+		s = self.servers[k]
+		opened = (t,f) not in self.placements
+		if opened:
+			self._place(t, f, 1)
+		self._serve(k, s, -1)
+		self._serve(k, t, 1)
+		closed = not self._served.get((s,f)) and self._cost[(s,f)] > 0
+		if closed:
+			self._place(s, f, -1)
+		return (k, s, t, opened, closed)
+	#enddef
+
+	def _unassign(self, move):
+		k, s, t, opened, closed = move
+		f = self.problem.demands[k][1]
+		if closed:
+			self._place(s, f, 1)
+		self._serve(k, t, -1)
+		self._serve(k, s, 1)
+		if opened:
+			self._place(t, f, -1)
+	#enddef
+
+	def _moveDemand(self, k):
+		before = self.excess
+		best = None
+		for t in range(len(self._D)):
+			if t == self.servers[k]:
+				continue
+			move = self._reassign(k, t)
+			if best is None or (self.excess, self.cost) < best[0]:
+				best = ( (self.excess, self.cost), t )
+			self._unassign(move)
+		#endfor
+		if best is not None and best[0][0] < before - _tolerance:
+			self._reassign(k, best[1])
+			return True
+		return False
+	#enddef
+
+	def _moveVCDN(self, s, f):
+		before = self.excess
+		demands = [ k for k in self._demandsOf[f] if self.servers[k] == s ]
+		best = None
+		for t in range(len(self._D)):
+			if (t,f) in self.placements:
+				continue
+			self._place(t, f, 1)
+			moved = self._moveAll(demands, [t])
+			self._place(s, f, -1)
+			if best is None or (self.excess, self.cost) < best[0]:
+				best = ( (self.excess, self.cost), t )
+			self._place(s, f, 1)
+			self._undo(moved)
+			self._place(t, f, -1)
+		#endfor
+		if best is not None and best[0][0] < before - _tolerance:
+			self._place(best[1], f, 1)
+			self._moveAll(demands, [best[1]])
+			self._place(s, f, -1)
+			return True
+		return False
+	#enddef
+
+	def _close(self, s, f):
+		targets = [ t for t,g in self.placements if g == f and t != s ]
+		demands = [ k for k in self._demandsOf[f] if self.servers[k] == s ]
+		if demands and not targets:
+			return False
+
+		before = self.excess
+		moved = self._moveAll(demands, targets)
+		self._place(s, f, -1)
+		if self.excess <= before + _tolerance:
+			return True
+		self._place(s, f, 1)
+		self._undo(moved)
+		return False
+	#enddef
+
+	def _relocate(self, s, f, deadline):
+		cost = self._cost[(s,f)]
+		candidates = sorted( (self._cost[(t,f)], t) for t in range(len(self._D)) if (t,f) not in self.placements and self._cost[(t,f)] < cost )
+		demands = [ k for k in self._demandsOf[f] if self.servers[k] == s ]
+
+		for c,t in candidates:
+			if time.time() > deadline:
+				break
+			before = self.excess
+			self._place(t, f, 1)
+			moved = self._moveAll(demands, [t])
+			self._place(s, f, -1)
+			if self.excess <= before + _tolerance:
+				return True
+			self._place(s, f, 1)
+			self._undo(moved)
+			self._place(t, f, -1)
+		#endfor
+		return False
+	#enddef
+
+	def start(self):
+		"""
+			:returns: the values of the x and y columns, as a MIP start
+			:rtype: dict
+		"""
+		problem = self.problem
+		values = dict( (col, 1 if key in self.placements else 0) for key,col in problem.xColumn.items() )
+		values.update( (col, 1 if self.servers[k] == s else 0) for (s,k),col in problem.yColumn.items() )
+		return values
+	#enddef
+
+	def solution(self):
+		"""
+			:returns: this Assignment as a solution, with the flows on the shortest paths
+			:rtype: OMACSolution
+		"""
+		problem = self.problem
+		values = [ 0 ] * problem.columns()
+		for col,value in self.start().items():
+			values[col] = value
+
+		sinkIndex = dict( (sink,t) for t,sink in enumerate(problem.sinks) )
+		for k,(v,f) in enumerate(problem.demands):
+			for a in (self._route(self.servers[k], k) or []):
+				if problem.formulation == "full":
+					values[ problem.zColumn[(k,a)] ] = 1
+				else:
+					col = problem.gColumn[ (sinkIndex[self._omac.Client_location[v]], a) ]
+					values[col] = values[col] + self._bw[k]
+		#endfor
+
+		return OMACSolution(problem, "feasible", self.cost, values)
+	#enddef
+
+#endclass
+
+
+def solve(problem, solver, timeLimit=None, mipGap=None, start=None):
+	"""
+		With a start, CBC begins the search from it (mipstart). `scipy.optimize.milp` has no MIP start, so HiGHS does not use it.
+		With both, if the start has no excess and the solver returns no solution or a worse one, the start is returned.
+
+		:param problem: The problem to solve
+		:type problem: OMACProblem
+		:param solver: Name of the solver. ..seealso:: SOLVERS
+		:type solver: String
+		:param timeLimit: Maximum time for the solver, in seconds. None for no limit
+		:type timeLimit: float
+		:param mipGap: Relative MIP gap at which the solver stops. None for the solver's default
+		:type mipGap: float
+		:param start: A known solution, such as the one of HMAC
+		:type start: Assignment
+
+		:returns: the solution
+		:rtype: OMACSolution
+
+		:raises: ValueError if the solver is unknown or not available
+	"""
+	if not available(solver):
+		raise ValueError(Messages.OMAC_Solver_Not_Available_S % solver)
+
+	logger.debug(Messages.OMAC_Solving_D_variables_D_constraints_S % (problem.columns(), problem.constraints(), solver))
+
+	if solver == "highs":
+		solution = _solveHighs(problem, timeLimit, mipGap)
+	else:
+		solution = _solveCBC(problem, timeLimit, mipGap, start)
+
+	# When the mipstart is already optimal, some CBC versions prune the whole tree and report "optimal" with the values of no solution
+	if start is not None and solution.feasible:
+		violation = problem.violation(solution.values)
+		if violation > _tolerance:
+			logger.warning(Messages.OMAC_Invalid_Solution_S_F % (solver, violation))
+			solution = OMACSolution(problem, "error")
+
+	if start is not None and start.excess <= _tolerance and (not solution.feasible or solution.objective > start.cost + _tolerance):
+		logger.info(Messages.OMAC_Using_Start_S_F % (solution.status, start.cost))
+		return start.solution()
+	return solution
+#enddef
+
+
+def _solveHighs(problem, timeLimit, mipGap):
+	A = sparse.csr_matrix( (problem.vals, (problem.rows, problem.cols)), shape=(problem.constraints(), problem.columns()) )
+
+	options = dict(disp=False)
+	if timeLimit:
+		options["time_limit"] = timeLimit
+	if mipGap is not None:
+		options["mip_rel_gap"] = mipGap
+
+	result = milp( numpy.array(problem.c, dtype=float),
+					constraints=LinearConstraint(A, problem.rowLower, problem.rowUpper),
+					integrality=numpy.array(problem.integer, dtype=int),
+					bounds=Bounds(problem.lower, problem.upper),
+					options=options )
+
+	# 0: optimal, 1: time or iteration limit, 2: infeasible, 3: unbounded
+	if result.x is not None:
+		# The optimum is proven to be over the dual bound, also when the solver stops on the gap or the time limit
+		bound = getattr(result, "mip_dual_bound", None)
+		if bound is not None and bound != bound:
+			bound = None
+		return OMACSolution(problem, "optimal" if result.status == 0 else "feasible", result.fun, result.x.tolist(), bound)
+	return OMACSolution(problem, { 1: "limit", 2: "infeasible" }.get(result.status, "error"))
+#enddef
+
+
+def _solveCBC(problem, timeLimit, mipGap, start=None):
+	lp = pulp.LpProblem("OMAC", pulp.LpMinimize)
+
+	# PuLP has no infinite bounds, None is used instead
+	variables = [ pulp.LpVariable(name, lower if lower != -_infinite else None, upper if upper != _infinite else None, pulp.LpInteger if integer else pulp.LpContinuous)
+					for name,lower,upper,integer in zip(problem.names, problem.lower, problem.upper, problem.integer) ]
+
+	lp += pulp.LpAffineExpression( [ (variables[col],cost) for col,cost in enumerate(problem.c) if cost ] )
+
+	senses = { "E": pulp.LpConstraintEQ, "L": pulp.LpConstraintLE, "G": pulp.LpConstraintGE }
+	for r,terms in enumerate(problem.iterRows()):
+		for name,sense,rhs in problem.constraintsOf(r):
+			expression = pulp.LpAffineExpression( [ (variables[col],val) for col,val in terms ] )
+			lp += pulp.LpConstraint(expression, senses[sense], name, rhs)
+	#endfor
+
+	options = []
+	startPath = None
+	if start is not None:
+		# PuLP gives CBC a copy of the problem with the variables renamed, so the mipstart file uses those names
+		constraintsNames, variablesNames, objectiveName = lp.normalisedNames()
+		values = start.start()
+		handle, startPath = tempfile.mkstemp(suffix=".sol")
+		with os.fdopen(handle, "w") as f:
+			f.write("Feasible - objective value %s\n" % _number(start.cost))
+			for col,value in sorted(values.items()):
+				name = problem.names[col]
+				if name in variablesNames:
+					f.write("%d %s %d\n" % (col, variablesNames[name], value))
+		options = [ "mips", startPath ]
+	#endif
+
+	try:
+		started = time.time()
+		status = lp.solve( pulp.PULP_CBC_CMD(msg=0, maxSeconds=timeLimit, fracGap=mipGap, options=options) )
+		elapsed = time.time() - started
+	finally:
+		if startPath:
+			os.remove(startPath)
+
+	if status == pulp.LpStatusOptimal:
+		values = [ v.varValue or 0 for v in variables ]
+		objective = pulp.value(lp.objective) or 0
+		# PuLP does not tell if CBC stopped on a limit, nor its dual bound. The objective is only the optimum if CBC had no gap and ended before the time limit
+		bound = None
+		if not mipGap and (not timeLimit or elapsed < timeLimit * _provenShare):
+			bound = objective
+		return OMACSolution(problem, "optimal", objective, values, bound)
+	if status == pulp.LpStatusInfeasible:
+		return OMACSolution(problem, "infeasible")
+	if status == pulp.LpStatusNotSolved:
+		return OMACSolution(problem, "limit")
+	return OMACSolution(problem, "error")
+#enddef
+
+
+def _number(value):
+	if value == _infinite:
+		return "+inf"
+	if value == -_infinite:
+		return "-inf"
+	if value == int(value):
+		return "%d" % value
+	return repr(float(value))
+#enddef
+
+
+def _lpTerms(terms, names):
+	# LP files limit the length of the lines, so a new line is started every few terms
+	parts = []
+	written = 0
+	for col,val in terms:
+		if written and written % 8 == 0:
+			parts.append("\n  ")
+		written = written + 1
+		if val < 0:
+			sign = " - "
+			val = -val
+		else:
+			sign = " + "
+		parts.append(sign + names[col] if val == 1 else sign + _number(val) + " " + names[col])
+	if not parts:
+		return " 0 " + names[0]
+	return "".join(parts)
+#enddef
+
+
+def writeLP(problem, f):
+	"""
+		Writes the problem in CPLEX LP format, one constraint at a time
+
+		:param problem: The problem
+		:type problem: OMACProblem
+		:param f: An open file
+		:type f: file
+	"""
+	names = problem.names
+	senses = { "E": "=", "L": "<=", "G": ">=" }
+
+	f.write("\\ OMAC\n")
+	f.write("Minimize\n obj:")
+	f.write(_lpTerms( ( (col,cost) for col,cost in enumerate(problem.c) if cost ), names ))
+	f.write("\nSubject To\n")
+
+	for r,terms in enumerate(problem.iterRows()):
+		expression = _lpTerms(terms, names)
+		for name,sense,rhs in problem.constraintsOf(r):
+			f.write(" " + name + ":" + expression + " " + senses[sense] + " " + _number(rhs) + "\n")
+
+	f.write("Bounds\n")
+	for col,name in enumerate(names):
+		lower = problem.lower[col]
+		upper = problem.upper[col]
+		if problem.integer[col] and lower == 0 and upper == 1:
+			continue
+		if lower != 0 or upper != _infinite:
+			f.write(" " + _number(lower) + " <= " + name + " <= " + _number(upper) + "\n")
+
+	f.write("Binaries\n")
+	for col,name in enumerate(names):
+		if problem.integer[col] and problem.lower[col] == 0 and problem.upper[col] == 1:
+			f.write(" " + name + "\n")
+
+	f.write("Generals\n")
+	for col,name in enumerate(names):
+		if problem.integer[col] and not (problem.lower[col] == 0 and problem.upper[col] == 1):
+			f.write(" " + name + "\n")
+
+	f.write("End\n")
+#enddef
+
+
+def writeMST(problem, start, f):
+	"""
+		Writes a start of the problem as a CPLEX MIP start file, to be read with the LP or MPS file
+
+		:param problem: The problem
+		:type problem: OMACProblem
+		:param start: The start
+		:type start: Assignment
+		:param f: An open file
+		:type f: file
+	"""
+	f.write('<?xml version = "1.0" standalone="yes"?>\n')
+	f.write('<CPLEXSolutions version="1.2">\n')
+	f.write(' <CPLEXSolution version="1.2">\n')
+	f.write('  <header problemName="OMAC" solutionName="HMAC" solutionIndex="0" objectiveValue="%s" MIPStartEffortLevel="0" writeLevel="1"/>\n' % _number(start.cost))
+	f.write('  <variables>\n')
+	for col,value in sorted(start.start().items()):
+		f.write('   <variable name="%s" index="%d" value="%d"/>\n' % (problem.names[col], col, value))
+	f.write('  </variables>\n')
+	f.write(' </CPLEXSolution>\n')
+	f.write('</CPLEXSolutions>\n')
+#enddef
+
+
+def writeMPS(problem, f):
+	"""
+		Writes the problem in free MPS format
+
+		MPS lists the matrix by columns, so the entries are first ordered by column. This index of the entries (2 integers per entry) is the only copy made of the problem
+
+		:param problem: The problem
+		:type problem: OMACProblem
+		:param f: An open file
+		:type f: file
+	"""
+	names = problem.names
+
+	f.write("NAME OMAC\n")
+	f.write("ROWS\n")
+	f.write(" N obj\n")
+	for r in range(problem.constraints()):
+		for name,sense,rhs in problem.constraintsOf(r):
+			f.write(" " + sense + " " + name + "\n")
+
+	# Counting sort of the entries by column
+	start = array("l", [0]) * (problem.columns() + 1)
+	for col in problem.cols:
+		start[col+1] = start[col+1] + 1
+	for col in range(problem.columns()):
+		start[col+1] = start[col+1] + start[col]
+	position = array("l", start)
+	order = array("l", [0]) * len(problem.cols)
+	for e,col in enumerate(problem.cols):
+		order[position[col]] = e
+		position[col] = position[col] + 1
+
+	f.write("COLUMNS\n")
+	integer = False
+	for col,name in enumerate(names):
+		if problem.integer[col] != integer:
+			integer = problem.integer[col]
+			f.write(" MARKER 'MARKER' " + ("'INTORG'" if integer else "'INTEND'") + "\n")
+		if problem.c[col]:
+			f.write(" " + name + " obj " + _number(problem.c[col]) + "\n")
+		for i in range(start[col], start[col+1]):
+			e = order[i]
+			value = " " + _number(problem.vals[e]) + "\n"
+			for row,sense,rhs in problem.constraintsOf(problem.rows[e]):
+				f.write(" " + name + " " + row + value)
+	if integer:
+		f.write(" MARKER 'MARKER' 'INTEND'\n")
+
+	f.write("RHS\n")
+	for r in range(problem.constraints()):
+		for row,sense,rhs in problem.constraintsOf(r):
+			if rhs:
+				f.write(" RHS " + row + " " + _number(rhs) + "\n")
+
+	f.write("BOUNDS\n")
+	for col,name in enumerate(names):
+		lower = problem.lower[col]
+		upper = problem.upper[col]
+		if problem.integer[col] and lower == 0 and upper == 1:
+			f.write(" BV BND " + name + "\n")
+			continue
+		if lower == -_infinite and upper == _infinite:
+			f.write(" FR BND " + name + "\n")
+			continue
+		if lower != 0:
+			f.write( (" MI BND " + name if lower == -_infinite else " LO BND " + name + " " + _number(lower)) + "\n" )
+		if upper != _infinite:
+			f.write(" UP BND " + name + " " + _number(upper) + "\n")
+
+	f.write("ENDATA\n")
+#enddef
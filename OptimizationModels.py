@@ -56,12 +56,27 @@ from  math import exp, log
 #Exponential function
 import sys
 import os
+import copy
 import logging
 
 from DataModels import HmacResult,  NetworkLink, Demand, AlteredDemand
 import SettingsFile
 import Messages
 import Optimizer
+import GomoryHuTree
+import Snapshot
+import OMACSolver
+import OMACDecomposition
+import OMACRounding
+from ShortestPaths import PathCache
+from Distances import Distances
+from TreeIndex import TreeIndex, SubtreeSums
+try:
+	import numpy
+	from RoutingMatrix import RoutingMatrix
+except ImportError:
+	# numpy/scipy are not installed; the Demands are consumed one by one
+	RoutingMatrix = None
 
 logger = logging.getLogger(__name__)
 
@@ -82,13 +97,18 @@ _capacityUnits = "Mbps"
 """
 
 
-_CPLEX_DAT_FILENAME = "../CPLEX/OMAC.dat"
-""" Relative route to the CPLEX data file, from the vIOSLib folder """
+_OMAC_FILENAME = "OMAC"
+""" Name of the OMAC files, without the extension """
+
+_exportBuffer = 1 << 20
+""" Size of the write buffer of the OMAC files, in bytes """
 
 _location_attr = "name"
 """ In the Topology graph; this vertex attribute contains the location name
 """
 
+_infinite = float("inf")
+
 _saturatedLinkDelay = 9999
 """	In a migration Gomory-Hu Tree, if the migration path has 0 o Negative Flow/Capacity, this delay is informed, meaning "A very high delay"
 """
@@ -118,6 +138,62 @@ networkMaxCapacity = 100
 """	In the TREE Random Graph; the maximum random Capacity given to a Link
 """
 
+gomoryTreeProcesses = 1
+"""	Amount of worker processes used to build the Gomory-Hu Tree; with 1 it is built sequentially with Gusfield's algorithm
+"""
+
+vectorizedConsume = False
+"""	If True, the Demands are consumed all at once with a sparse Routing Matrix of the Graphs, instead of one by one. Needs numpy and scipy
+"""
+
+omacSolver = "cplex"
+""" Solver for OMAC: "cplex" only writes the .dat file for CPLEX; "highs" or "cbc" also solve it in-process ..seealso:: OMACSolver
+"""
+
+omacTimeLimit = None
+""" Maximum time for the OMAC in-process solver, in seconds. None for no limit
+"""
+
+omacMipGap = None
+""" Relative MIP gap at which the OMAC in-process solver stops. None for the solver's default
+"""
+
+omacFormulation = "full"
+""" Formulation of the OMAC problem for the in-process solver and the MPS and LP files: "full" or "compact" ..seealso:: OMACSolver.OMACProblem
+"""
+
+omacOutputDir = "../CPLEX"
+""" Folder where the OMAC files are written. Relative paths are from the vIOSLib folder
+"""
+
+omacExportFormats = ["dat"]
+""" Formats of the OMAC files written by OMAC.optimize(): "dat", "mps", "lp" or "mst"
+"""
+
+omacDecomposition = False
+""" If True, the OMAC in-process solver solves one subproblem per vCDN, with a Lagrangian relaxation of the constraints that join them ..seealso:: OMACDecomposition
+"""
+
+omacProcesses = 1
+""" Amount of worker processes solving the OMAC subproblems of the vCDNs
+"""
+
+omacLagrangianIterations = 50
+""" Maximum amount of subgradient iterations of the OMAC decomposition
+"""
+
+omacRounding = False
+""" If True, the OMAC in-process solver only solves the LP relaxation and rounds it, for an answer in seconds with its gap to the LP bound. It takes precedence over `omacDecomposition` ..seealso:: OMACRounding
+"""
+
+omacRoundingRounds = 10
+""" Amount of roundings of the LP relaxation of OMAC; the best one is kept
+"""
+
+omacPolishTime = 0
+""" Time given to the local search that improves the HMAC result before OMAC is solved, in seconds. 0 to use the HMAC result as it is ..seealso:: OMACSolver.Assignment.polish()
+"""
+
 NCUPM_alpha = 1.25
 """ Coefficient for the NCUPM model """
 NCUPM_beta = 6.8
@@ -151,6 +227,20 @@ def readSettingsFile():
 	global LAYOUT
 	global networkTreeChildren 
 	global networkMaxCapacity 
+	global gomoryTreeProcesses
+	global vectorizedConsume
+	global omacSolver
+	global omacTimeLimit
+	global omacMipGap
+	global omacFormulation
+	global omacOutputDir
+	global omacExportFormats
+	global omacDecomposition
+	global omacProcesses
+	global omacLagrangianIterations
+	global omacRounding
+	global omacRoundingRounds
+	global omacPolishTime
 	global NCUPM_alpha
 	global NCUPM_beta
 	global NCUPM_gamma
@@ -180,6 +270,49 @@ def readSettingsFile():
 		networkTreeChildren = SettingsFile.getOptionFloat("DEFAULT","network_tree_branches")
 	if SettingsFile.getOptionFloat("DEFAULT","network_link_capacity"):
 		networkMaxCapacity = SettingsFile.getOptionFloat("DEFAULT","network_link_capacity")
+	if SettingsFile.getOptionInt("DEFAULT","gomory_tree_processes"):
+		gomoryTreeProcesses = SettingsFile.getOptionInt("DEFAULT","gomory_tree_processes")
+	if SettingsFile.getOptionBoolean("DEFAULT","vectorized_consume") is not None:
+		vectorizedConsume = SettingsFile.getOptionBoolean("DEFAULT","vectorized_consume")
+		if vectorizedConsume and not RoutingMatrix:
+			logger.warning(Messages.No_Vectorized_Consume)
+	
+	if SettingsFile.getOptionString("DEFAULT","omac_solver"):
+		omacSolver = SettingsFile.getOptionString("DEFAULT","omac_solver").lower()
+		if omacSolver != "cplex" and not OMACSolver.available(omacSolver):
+			logger.warning(Messages.OMAC_Solver_Not_Available_S % omacSolver)
+			omacSolver = "cplex"
+	if SettingsFile.getOptionFloat("DEFAULT","omac_time_limit"):
+		omacTimeLimit = SettingsFile.getOptionFloat("DEFAULT","omac_time_limit")
+	if SettingsFile.getOptionFloat("DEFAULT","omac_mip_gap") is not None:
+		omacMipGap = SettingsFile.getOptionFloat("DEFAULT","omac_mip_gap")
+	if SettingsFile.getOptionString("DEFAULT","omac_formulation"):
+		omacFormulation = SettingsFile.getOptionString("DEFAULT","omac_formulation").lower()
+		if omacFormulation not in OMACSolver.FORMULATIONS:
+			logger.warning(Messages.Unknown_OMAC_Formulation_S % omacFormulation)
+			omacFormulation = "full"
+	if SettingsFile.getOptionString("DEFAULT","omac_output_dir"):
+		omacOutputDir = SettingsFile.getOptionString("DEFAULT","omac_output_dir")
+	if SettingsFile.getOptionString("DEFAULT","omac_export_formats"):
+		omacExportFormats = []
+		for format in SettingsFile.getOptionString("DEFAULT","omac_export_formats").split(","):
+			format = format.strip().lower()
+			if format in ("dat","mps","lp","mst"):
+				omacExportFormats.append(format)
+			elif format:
+				logger.warning(Messages.Unknown_OMAC_Format_S % format)
+	if SettingsFile.getOptionBoolean("DEFAULT","omac_decomposition") is not None:
+		omacDecomposition = SettingsFile.getOptionBoolean("DEFAULT","omac_decomposition")
+	if SettingsFile.getOptionInt("DEFAULT","omac_processes"):
+		omacProcesses = SettingsFile.getOptionInt("DEFAULT","omac_processes")
+	if SettingsFile.getOptionInt("DEFAULT","omac_lagrangian_iterations") is not None:
+		omacLagrangianIterations = SettingsFile.getOptionInt("DEFAULT","omac_lagrangian_iterations")
+	if SettingsFile.getOptionBoolean("DEFAULT","omac_rounding") is not None:
+		omacRounding = SettingsFile.getOptionBoolean("DEFAULT","omac_rounding")
+	if SettingsFile.getOptionInt("DEFAULT","omac_rounding_rounds"):
+		omacRoundingRounds = SettingsFile.getOptionInt("DEFAULT","omac_rounding_rounds")
+	if SettingsFile.getOptionFloat("DEFAULT","omac_polish_time"):
+		omacPolishTime = SettingsFile.getOptionFloat("DEFAULT","omac_polish_time")
 	
 	if SettingsFile.getOptionFloat("DEFAULT","NCUPM_alpha"):
 		NCUPM_alpha = SettingsFile.getOptionFloat("DEFAULT","NCUPM_alpha")
@@ -193,7 +326,7 @@ def readSettingsFile():
 	
 
 
-def graphConsumeBW(graph, node_src_name, node_dst_name, capacity , bw):
+def graphConsumeBW(graph, node_src_name, node_dst_name, capacity , bw, paths=None):
 	"""
 		Given any graph and 2 nodes (Node's name to find them), the bw value is substracted from the SPT path between the nodes
 		The attribute `capacity` is expected to be in the graph's edges and it is here where `bw` is substracted
@@ -208,20 +341,21 @@ def graphConsumeBW(graph, node_src_name, node_dst_name, capacity , bw):
 		:type capacity: String
 		:param bw: value to be substracted from all the edges in the SPT path
 		:type bw: float
+		:param paths: The PathCache of the graph; if given the SPT is taken from it instead of being searched again
+		:type paths: PathCache
 	"""
-	try:		
-		#First we get the location node of the POP of the client demanding.
-		node_src = graph.vs.find(name = node_src_name)
-		
-		# We need to know the POP node of the demanded instance
-		node_dst = graph.vs.find(name = node_dst_name)
-				
-		#Initial SPT lenght = all nodes, so it is big as initial value and the minimal path lenght is found
-		#SPT is a set of nodes, to the biggest is the total number of nodes. This is to have an absolute max
-		SPT_len = graph.vcount()    
-			
-		#We get the Shortest path from client to server, and we check each link in the path
-		SPT = graph.get_shortest_paths(node_src,to = node_dst, output="epath" )[0];
+	try:
+		if paths is not None:
+			SPT = paths.path(node_src_name, node_dst_name, output="epath")
+		else:
+			#First we get the location node of the POP of the client demanding.
+			node_src = graph.vs.find(name = node_src_name)
+
+			# We need to know the POP node of the demanded instance
+			node_dst = graph.vs.find(name = node_dst_name)
+
+			#We get the Shortest path from client to server, and we check each link in the path
+			SPT = graph.get_shortest_paths(node_src,to = node_dst, output="epath" )[0];
 
 		#logger.debug( Messages.ShortestPath_S % str(SPT))
 			
@@ -336,6 +470,13 @@ class Model(object):
 	capacityGraph = Graph()
 	topologieGraph = Graph()
 	gomoryTree = Graph()
+	cutTree = None
+	treeIndex = None
+	capacityPaths = None
+	gomoryPaths = None
+	capacityRouting = None
+	gomoryRouting = None
+	distances = None
 	
 	def __init__(self, Locations, Links):
 		"""
@@ -391,12 +532,33 @@ class Model(object):
 			
 		#endfor
 		
+		self.capacityPaths = PathCache(self.capacityGraph)
+		self.omac.paths = self.capacityPaths
+		# The OMAC topologie has the same Locations and Links, in the same order, so the paths are the same ones
+		
 		logger.info(Messages.Built_Model_D_locations_D_links % (len(Locations),len(Links)))
 		
 		
 		
 	#enddef
 	
+	def copy(self):
+		"""
+			Gets a copy of the Model that can be consumed by Demands, simulated or optimized without altering this one
+			
+			The Graphs are copied. The Gomory-Hu cut tree and its index, the OMAC topologie values, the shortest paths and the POP distances are shared, as they do not change while the topologie is the same
+			
+			:returns: a copy of the Model
+			:rtype: Model
+		"""
+		other = copy.copy(self)
+		other.topologieGraph = self.topologieGraph.copy()
+		other.capacityGraph = self.capacityGraph.copy()
+		other.gomoryTree = self.gomoryTree.copy()
+		other.omac = copy.copy(self.omac)
+		return other
+	#enddef
+	
 	def setPOPs(self,pops):
 		"""
 			:param pops: List of POPs to be placed in the nodes. According to the model, they can be placed in any layer of the topology
@@ -430,6 +592,13 @@ class Model(object):
 			logger.debug( Messages.Added_Pop_S_in_S % (p.name, p.location.name) )
 		#endfor
 		
+		self.capacityPaths.setTargets( [p.location.name for p in pops] )
+		# The Demands go to the POPs, so the paths to all of them are calculated at once from each source
+		
+		self.distances = Distances(self.capacityGraph, [p.location.name for p in pops])
+		self.omac.distances = self.distances
+		# The hops between the POPs
+		
 		self.omac.setPOPs(pops)
 		# Add this information to the OMAC model too
 		
@@ -480,55 +649,52 @@ class Model(object):
 		
 	#enddef
 	
-	def buildGomoryTree(self):
+	def buildGomoryTree(self, previous=None):
 		"""
 			From the Capacity Graph of the Model, make a Gomory-Hu Tree
 			
-		
-			Calculates the Gomory-Hu tree of the given graph, assuming that the edge capacities are given in `capacity` property.
-
-			This implementation uses Gusfield's algorithm.
+			Without a previous tree, it is calculated per biconnected block with Gusfield's algorithm,
+			the blocks in parallel in `gomoryTreeProcesses` processes if more than 1 is configured.
+			Having the tree of a previous Model, only the part of the tree affected by the links that changed is recomputed,
+			or if too many links changed, the blocks that did not change are reused
 			
 			Copy the graph and vertex attributes of the original graph into the returned one
 			
 			The label property of the Gomuri Tree edges is set to the same value as the Gomuri Flow  
 			
+			:param previous: the cutTree of a previous Model; it is not modified
+			:type previous: GomoryHuTree.CutTree
+			
 			.. note:: If the Capacity has been affected by consumeDemands(), the Gomory-Hu Tree will be calculated on the new capacity values
 			
 			.. note:: Call this before drawGomoryTree()  
+			
+			..seealso:: GomoryHuTree.build(), GomoryHuTree.repair()
     
 		"""
+		if previous is None:
+			self.cutTree = GomoryHuTree.build(self.capacityGraph, _capacity_attr, gomoryTreeProcesses)
+		else:
+			self.cutTree = GomoryHuTree.repair(previous, self.capacityGraph, _capacity_attr, gomoryTreeProcesses)
+		
 		n = self.capacityGraph.vcount()
 		
-		# Initialize the tree: every edge points to node 0
-		neighbors = [0] * n
-		flows = [0.0] * n
-
-		# For each source vertex except vertex zero...
-		for s in xrange(1, n):
-		# Find its neighbor.
-			t = neighbors[s]
-
-		# Find the minimum cut between s and t
-			cut = self.capacityGraph.mincut(s, t, _capacity_attr)
-			flows[s] = cut.value
-			side_of_s = cut[cut.membership[s]]
-
-			# Update the tree
-			for u in side_of_s:
-				if u > s and neighbors[u] == t:
-					neighbors[u] = s
-
 		# Construct the tree, putting as a LABEL of the edge the _flow_attr value
-		edges = [(i, neighbors[i]) for i in xrange(1, n)]
+		edges = [(a, b) for a,b,flow in self.cutTree.edges]
+		flows = [flow for a,b,flow in self.cutTree.edges]
 		
-		self.gomoryTree = Graph(n, edges, directed=False, edge_attrs={_flow_attr: flows[1:],_capacity_attr: flows[1:], 'label': flows[1:]})
+		self.gomoryTree = Graph(n, edges, directed=False, edge_attrs={_flow_attr: flows,_capacity_attr: list(flows), 'label': list(flows)})
 		
 		for attr in self.capacityGraph.attributes():
 			self.gomoryTree[attr] = self.capacityGraph[attr]
 		for attr in self.capacityGraph.vertex_attributes():
 				self.gomoryTree.vs[attr] = self.capacityGraph.vs[attr]
 		
+		# The tree has the same vertices than the Capacity Graph, but other edges
+		self.gomoryPaths = PathCache(self.gomoryTree, self.capacityPaths.targets)
+		self.treeIndex = TreeIndex(self.gomoryTree)
+		self.gomoryRouting = None
+		
 	#enddef
 	
 	def drawTopologie(self, filename=None):
@@ -569,6 +735,8 @@ class Model(object):
 		
 		DemandCounter = 0
 		errors = False
+		pairs = []
+		bws = []
 	
 		# For each Demand
 		for d in demands:
@@ -588,8 +756,12 @@ class Model(object):
 				# We need to know the POP node of the demanded instance
 				node_dst_name = pop.location.name
 				
-				graphConsumeBW(self.capacityGraph,node_src_name,node_dst_name,capacity = _capacity_attr,bw = Demanded_BW)
-				graphConsumeBW(self.gomoryTree,node_src_name,node_dst_name,capacity = _flow_attr,bw = Demanded_BW)
+				if vectorizedConsume and RoutingMatrix:
+					pairs.append( (node_src_name,node_dst_name) )
+					bws.append(Demanded_BW)
+				else:
+					graphConsumeBW(self.capacityGraph,node_src_name,node_dst_name,capacity = _capacity_attr,bw = Demanded_BW, paths = self.capacityPaths)
+					graphConsumeBW(self.gomoryTree,node_src_name,node_dst_name,capacity = _flow_attr,bw = Demanded_BW, paths = self.gomoryPaths)
 				
 			except:
 				logger.exception( Messages.Exception_Consuming_Demand_D_Graph % d.id )
@@ -597,11 +769,11 @@ class Model(object):
 				continue
 		#endfor
 		
+		if pairs:
+			self.consumeBW(pairs, bws)
+		
 		#Updating the Link Labels
-		for e in self.capacityGraph.es:
-			e['label'] = ( "%.2f" % e[_capacity_attr]) # +_capacityUnits
-		for e in self.gomoryTree.es:
-			e['label'] = ( "%.2f" % e[_flow_attr])
+		self._updateLabels()
 	
 		logger.info( Messages.Graph_Consume_D_Demands % DemandCounter)
 		return not errors
@@ -625,6 +797,8 @@ class Model(object):
 		
 		DemandCounter = 0
 		errors = False
+		pairs = []
+		bws = []
 	
 		# For each Demand
 		for d in fakeDemands:
@@ -639,8 +813,12 @@ class Model(object):
 				# We need to know the POP node of the demanded instance
 				node_dst_name = d.popLocationName
 				
-				graphConsumeBW(self.capacityGraph,node_src_name,node_dst_name,capacity = _capacity_attr,bw = d.bw)
-				graphConsumeBW(self.gomoryTree,node_src_name,node_dst_name,capacity = _flow_attr,bw = d.bw)
+				if vectorizedConsume and RoutingMatrix:
+					pairs.append( (node_src_name,node_dst_name) )
+					bws.append(d.bw)
+				else:
+					graphConsumeBW(self.capacityGraph,node_src_name,node_dst_name,capacity = _capacity_attr,bw = d.bw, paths = self.capacityPaths)
+					graphConsumeBW(self.gomoryTree,node_src_name,node_dst_name,capacity = _flow_attr,bw = d.bw, paths = self.gomoryPaths)
 				
 			except:
 				logger.exception( Messages.Exception_Consuming_Fake_Demand )
@@ -648,16 +826,57 @@ class Model(object):
 				continue
 		#endfor
 		
+		if pairs:
+			self.consumeBW(pairs, bws)
+		
 		#Updating the Link Labels
-		for e in self.capacityGraph.es:
-			e['label'] = ( "%.2f" % e[_capacity_attr]) # +_capacityUnits
-		for e in self.gomoryTree.es:
-			e['label'] = ( "%.2f" % e[_flow_attr])
+		self._updateLabels()
 	
 		logger.info( Messages.Graph_Consume_D_Demands % DemandCounter)
 		return not errors
 	#enddef
 	
+	def consumeBW(self, pairs, bws):
+		"""
+			The BW of each (source,destination) pair is substracted from the links in its shortest path, in the Capacity Graph and the Gomory-Hu Tree
+			
+			All the pairs are consumed at once: the load of each link is calculated with the RoutingMatrix of each Graph, and the capacities are written back in bulk.
+			The result is the same as calling graphConsumeBW() for each pair
+			
+			:param pairs: list of (source location name, destination location name)
+			:type pairs: list[]
+			:param bws: The BW of each pair
+			:type bws: float[]
+			
+			.. note:: Needs numpy and scipy
+		"""
+		if self.capacityRouting is None:
+			self.capacityRouting = RoutingMatrix(self.capacityGraph, self.capacityPaths)
+		if self.gomoryRouting is None:
+			self.gomoryRouting = RoutingMatrix(self.gomoryTree, self.gomoryPaths)
+		
+		for graph,capacity,routing in ( (self.capacityGraph, _capacity_attr, self.capacityRouting), (self.gomoryTree, _flow_attr, self.gomoryRouting) ):
+			if not graph.ecount():
+				continue
+			load, touched = routing.load(pairs, bws)
+			values = numpy.array(graph.es[capacity], dtype=float) - load
+			graph.es[capacity] = values.tolist()
+			negative = numpy.flatnonzero( touched & (values < 0) )
+			if len(negative):
+				graph.es[negative.tolist()]['color'] = NEGATIVE_CAPACITY_COLOR
+		#endfor
+	#enddef
+	
+	def _updateLabels(self):
+		"""
+			Sets the label of the links to their capacity, in the Capacity Graph and the Gomory-Hu Tree
+		"""
+		if self.capacityGraph.ecount():
+			self.capacityGraph.es['label'] = [ ( "%.2f" % c) for c in self.capacityGraph.es[_capacity_attr] ]  # +_capacityUnits
+		if self.gomoryTree.ecount():
+			self.gomoryTree.es['label'] = [ ( "%.2f" % f) for f in self.gomoryTree.es[_flow_attr] ]
+	#enddef
+	
 	def updateFakeInstances(self,fakeInstances):
 		"""
 			This takes a list of fakeInstances in order to adjust the Graph's drawing to reflect the proper amount of instances per POP
@@ -698,7 +917,7 @@ class Model(object):
 		#endif
 	#enddef
 
-	def optimizeHMAC(self, demands):
+	def optimizeHMAC(self, demands, snapshot=None):
 		"""
 			The results of the optimization are a list of recommended migrations
 			
@@ -715,8 +934,13 @@ class Model(object):
 			At the end of the optimization process, the Demands will have this `invalidInstance` field updated. 
 			If needed, update the DB to have this modification registered.
 			
+			The POPs, vCDNs and Instances are taken from the Snapshot, not from the DB. Only the `invalidInstance` field of the Demands is written
+			If a POP can host a vCDN is taken from the hosting matrix of the Snapshot ..seealso:: Snapshot.Snapshot.canHost()
+			
 			:param demands: List of Demand Objects taken from the DB
 			:type demands: Demand[]
+			:param snapshot: The Infrastructure values. If not given, it is loaded from Optimizer.DBConn
+			:type snapshot: Snapshot.Snapshot
 			
 			:returns:  A List of HmacResults to perform, a List of Demands Alterations
 			:rtype:  HmacResult[], AlteredDemand[]
@@ -729,15 +953,50 @@ class Model(object):
 		alteredDemandList = []
 		
 		invalidDemads = 0
+		
+		if snapshot is None:
+			snapshot = Snapshot.load(Optimizer.DBConn)
+		
+		# The migrations already found, by (dstPopId, instanceId)
+		migrations = dict()
+		
+		# The Gomory Tree values used by the path queries. The links are kept by their lower node in the treeIndex
+		index = self.treeIndex
+		depth = index.depth
+		position = dict( (name,i) for i,name in enumerate(self.gomoryTree.vs[_location_attr]) )
+		popIds = self.gomoryTree.vs['popId'] if 'popId' in self.gomoryTree.vs.attributes() else [None] * index.n
+		flows = index.edgeValues(self.gomoryTree.es[_flow_attr], _infinite)
+		
+		# Minimal capacity over the links of a path
+		capacities = index.table( index.edgeValues(self.gomoryTree.es[_capacity_attr], _infinite), min )
+		# Deepest saturated link, when its lower node has a POP
+		saturatedUp = index.table( [ depth[v] if flows[v] < 0 and popIds[v] else -1 for v in range(index.n) ], max )
+		# Highest saturated link, when its upper node has a POP
+		saturatedDown = index.table( [ depth[v] if flows[v] < 0 and popIds[index.parent[v]] else _infinite for v in range(index.n) ], min )
+		
+		# The BW of the Demands at their client nodes, grouped by vCDN and POP, to sum the ones that a migration would redirect
+		groups = dict()
+		for dx in demands:
+			clientGroup = snapshot.getClientGroup(dx.clientGroupId)
+			clientNode = position.get(clientGroup.locationName) if clientGroup else None
+			if clientNode is not None:
+				vertices, bws = groups.setdefault( (dx.vcdnId, dx.popId), ([], []) )
+				vertices.append(clientNode)
+				bws.append(dx.bw)
+		#endfor
+		redirections = dict( (key, SubtreeSums(index, vertices, bws)) for key,(vertices,bws) in groups.items() )
 				
 		# For each Demand
 				
 		for d in demands:
 			
-			instance = Optimizer.getInstance(d.pop,d.vcdn)
+			clientGroup = snapshot.getClientGroup(d.clientGroupId)
+			instance = snapshot.getInstance(d.popId, d.vcdnId)
 			if instance == None:
 				
-				logger.error(Messages.Invalid_Demand_Client_S_vCDN_S_POP_S %  (d.clientGroup.location.name, d.vcdn.name, d.pop.name) )
+				logger.error(Messages.Invalid_Demand_Client_S_vCDN_S_POP_S %  (getattr(clientGroup, 'locationName', d.clientGroupId), 
+																				getattr(snapshot.getvCDN(d.vcdnId), 'name', d.vcdnId), 
+																				getattr(snapshot.getPOP(d.popId), 'name', d.popId)) )
 				d.invalidInstance = True
 				invalidDemads = invalidDemads+1
 				continue   
@@ -750,61 +1009,59 @@ class Model(object):
 				continue   
 				# Get next Demand to work with, a Demand that does not take BW is not worth analyzing
 			
-			srcPop = instance.pop
-			demandedvCDN =  instance.vcdn
-			clientLocation = d.clientGroup.location
-			
-			logger.debug( Messages.ClientLocation_S_requests_S_from_S_TotalBW_F % (clientLocation.name, demandedvCDN.name,srcPop.name ,Demanded_BW))
-			
-			#First we get the location node of the POP of the client demanding.
-			node_client = self.gomoryTree.vs.find(name = clientLocation.name)
+			srcPop = snapshot.getPOP(instance.popId)
+			demandedvCDN =  snapshot.getvCDN(instance.vcdnId)
+			clientLocationName = clientGroup.locationName
 			
-			# We need to know the POP node of the demanded instance
-			node_pop = self.gomoryTree.vs.find(name = srcPop.location.name)
+			logger.debug( Messages.ClientLocation_S_requests_S_from_S_TotalBW_F % (clientLocationName, demandedvCDN.name,srcPop.name ,Demanded_BW))
 			
-						
-			#Initial SPT lenght = all nodes, so it is big as initial value and the minimal path lenght is found. The SPT is a set of nodes
-			SPT_len = self.gomoryTree.vcount()    
+			#The path from the client to the server is unique in the Gomory Tree. It is not walked, it is queried on the treeIndex
+			#The path goes up from the client node to the common ancestor `top`, then down to the POP node
+			node_client = position[clientLocationName]
+			node_pop = position[srcPop.locationName]
+			top = index.lca(node_client, node_pop)
 			
-			#We get the Shortest path from client to server. The SPT is using Node/Vertex because there is the need to differenciate which node faces the client and which faces the vCDN
-			SPT = self.gomoryTree.get_shortest_paths(node_client, to = node_pop )[0];
+			if top is None:
+				continue
+				# There is no path
 			
-			logger.debug( Messages.ShortestPath_S % str(SPT))
+			upSteps = depth[node_client] - depth[top]
+			downSteps = depth[node_pop] - depth[top]
 			
-			# SPT is a set of nodes like [8, 2, 0, 1]; 8 is the demand's client node and 1 the demand's vCDN node
-			#We take the links on the path to the server; one by one; starting from the client
+			if logger.isEnabledFor(logging.DEBUG):
+				logger.debug( Messages.ShortestPath_S % str(index.pathEdges(node_client, node_pop)))
 			
 			migrate=False
 			dstPopId = None
 			
-			if len(SPT) > 2:
+			if upSteps + downSteps > 1:
 			# It makes sense to migrate if the client is not just in front of the original POP. 
 			# The path client->POP must be bigger than 1 link (2 nodes)
 				
-				for k in range(0,len(SPT)-1):
-					
-					# We take the SPT link by link, in pairs, from the client to the vCDN.
-					# nodeSouth faces the Client, nodeNorth faces the vCDN
-					# The closest POP to the Client is kept in dstPop
-					# The migration is triggered if there is a saturated link
-					
-					nodeSouth = SPT[k]
-					nodeNorth = SPT[k+1]
-					
-					egde_id = self.gomoryTree.get_eid(nodeSouth, nodeNorth,directed=False, error=False)
-					
-					if (egde_id == -1):
-						break
-						#no link; so the SPT Path is invalid
-					
-					
-					
-					if (self.gomoryTree.vs['popId'][nodeSouth]) and self.gomoryTree.es[_flow_attr][egde_id] < 0:
-						dstPopId = self.gomoryTree.vs['popId'][nodeSouth]
-						migrate = True
-						break
+				# The first saturated link from the client whose node facing the client (nodeSouth) has a POP
+				# Going up, nodeSouth is the lower node of the link: the closest to the client is the deepest one
+				# Going down, nodeSouth is the upper node of the link: the closest to the client is the highest one
+				# A link is kept as its lower node; k is its position in the path
+				
+				link = None
+				linkDepth = index.fold(saturatedUp, max, node_client, upSteps, -1)
+				if linkDepth != -1:
+					link = index.ancestor(node_client, linkDepth)
+					nodeSouth = link
+					k = depth[node_client] - linkDepth
+					remainingBW = min( index.fold(capacities, min, link, linkDepth - depth[top], _infinite),
+										index.fold(capacities, min, node_pop, downSteps, _infinite) )
+				else:
+					linkDepth = index.fold(saturatedDown, min, node_pop, downSteps, _infinite)
+					if linkDepth != _infinite:
+						link = index.ancestor(node_pop, linkDepth)
+						nodeSouth = index.parent[link]
+						k = upSteps + linkDepth - depth[top] - 1
+						remainingBW = index.fold(capacities, min, node_pop, depth[node_pop] - linkDepth + 1, _infinite)
 				
-				#endFor
+				if link is not None:
+					dstPopId = popIds[nodeSouth]
+					migrate = True
 				
 				# The path from the Client to the vCDN has been checked. There would be a migration if there was a saturated link
 				
@@ -812,53 +1069,35 @@ class Model(object):
 
 					try:
 						
-						dstPop = Optimizer.DBConn.getPOPbyId(dstPopId)
+						dstPop = snapshot.getPOP(dstPopId)
 						
 						logger.debug( Messages.Migration_check_PopSrc_S_PopDts_S  %  ( srcPop.name, dstPop.name ))
 						
 						#Look for Minimal BW left on the migrated path from the srcPOP to the dstPOP
+						#This is the remaining path from the saturated link to the POP, because this is where the migration would run
 						
-						minBWCapacity = srcPop.totalNetBW
-						accumHops = 0
+						minBWCapacity = min(srcPop.totalNetBW, remainingBW)
+						accumHops = upSteps + downSteps - k
 						
-						for j in range(k,len(SPT)-1):
-							nodeSouth = SPT[j]
-							nodeNorth = SPT[j+1]
-							
-							#This time the Gomory Tree SPT is run on the remaining path, because this is where the migration would run
-							
-							egde_id = self.gomoryTree.get_eid(nodeSouth, nodeNorth,directed=False, error=False)
-							if (egde_id != -1):
-																
-								accumHops = accumHops+1
-								if minBWCapacity > self.gomoryTree.es[_capacity_attr][egde_id]:
-									minBWCapacity = self.gomoryTree.es[_capacity_attr][egde_id]
-						#end for
+						#The last link of the path, next to the srcPOP
+						if top == node_pop:
+							lastLink = index.ancestor(node_client, depth[node_pop] + 1)
+						else:
+							lastLink = node_pop
 						
 						logger.debug( Messages.Migration_path_D_Hops_F_BW %  ( accumHops, minBWCapacity ))
 						
-						if (Optimizer.getInstance(dstPop, demandedvCDN) == None):
+						if (snapshot.getInstance(dstPop.id, demandedvCDN.id) == None):
 								
 							#If there is no Instance of the vCDN in the Destination POP; this is a HmacResult
-							if dstPop.canHostVCDN(demandedvCDN) and ( (dstPop.totalNetBW  - dstPop.curNetBW) > Demanded_BW):
+							if snapshot.canHost(dstPop.id, demandedvCDN.id) and ( (dstPop.totalNetBW  - dstPop.curNetBW) > Demanded_BW):
 								
 								# If there are some other Demands that because of the Migration would take more BW that the one saved by the migration, then no migration
-								Redirected_BW = 0
-								for dx in demands[:]:
-									if dx.vcdnId == demandedvCDN.id and dx.popId == srcPop.id and dx.id != d.id:
-										
-										node_client = self.gomoryTree.vs.find(name = dx.clientGroup.location.name)
-										node_pop = self.gomoryTree.vs.find(name = dstPop.location.name)
-										
-										SPT = self.gomoryTree.get_shortest_paths(node_client, to = node_pop,  output="epath" )[0];
-										
-										for l in SPT:
-											if l == egde_id:
-												Redirected_BW = Redirected_BW + dx.bw
-												
-												break
-										#endfor
-								#endfor
+								# These are the Demands of the same vCDN and POP whose path to the dstPOP would take the last link of this path
+								Redirected_BW = redirections[(demandedvCDN.id, srcPop.id)].across(lastLink, position[dstPop.locationName])
+								if index.onPath(lastLink, node_client, position[dstPop.locationName]):
+									Redirected_BW = Redirected_BW - Demanded_BW
+									# This Demand itself is not counted
 								
 								if Redirected_BW < Demanded_BW:
 									
@@ -874,26 +1113,22 @@ class Model(object):
 									# The internal cost is bigger with a longer path and a bigger vCDN
 								
 									# Check if this Migration was already triggered by another demand
-									found = False
-									for mig in migrationList:
-										if mig.dstPopId == dstPop.id and mig.instanceId == instance.id:
-											found = True
-											break
-									
+									mig = migrations.get( (dstPop.id, instance.id) )
 									
 									# Add this Demand to the list of Demands optimized by this migration
-									if found:
+									if mig:
 										mig.demandsIds.append(d.id)
 									else:
 										hmacRes = HmacResult(dstPop.id , instance.id, delay = migDelay, cost = migCost, minBW = minBWCapacity)
 										hmacRes.demandsIds.append(d.id)
 										migrationList.append( hmacRes )
+										migrations[ (dstPop.id, instance.id) ] = hmacRes
 									
 									logger.info( Messages.Migrate_vCDN_S_srcPOP_S_dstPOP_S % (demandedvCDN.name , srcPop.name, dstPop.name) )
 								else:
 									logger.info( Messages.Migrate_vCDN_S_srcPOP_S_dstPOP_S_RedirectionBW % (demandedvCDN.name , srcPop.name, dstPop.name) )
 							else:
-								logger.debug( Messages.Migration_Condition_Hold_B_NetCapacity_D_Mbps %  ( dstPop.canHostVCDN(demandedvCDN), (dstPop.totalNetBW  - dstPop.curNetBW - Demanded_BW) ))
+								logger.debug( Messages.Migration_Condition_Hold_B_NetCapacity_D_Mbps %  ( snapshot.canHost(dstPop.id, demandedvCDN.id), (dstPop.totalNetBW  - dstPop.curNetBW - Demanded_BW) ))
 								logger.debug(dstPop.canHostVCDN_String(demandedvCDN))
 						else:
 								
@@ -905,7 +1140,7 @@ class Model(object):
 														AlteredDemand(d.id, dstPop.id ) 
 									)
 									
-									logger.info( Messages.Redirect_Demand_Client_S_vCDN_S_srcPOP_S_dstPOP_S % (d.clientGroup.name, demandedvCDN.name , srcPop.name, dstPop.name))
+									logger.info( Messages.Redirect_Demand_Client_S_vCDN_S_srcPOP_S_dstPOP_S % (clientGroup.name, demandedvCDN.name , srcPop.name, dstPop.name))
 								else:
 									logger.debug( Messages.Scale_Condition_NetCapacity_D_Mbps %  (  (dstPop.totalNetBW  - dstPop.curNetBW - Demanded_BW) ))
 						#Endif
@@ -1167,6 +1402,13 @@ class OMAC(object):
 	#All these arrays are used in OMAC CPLEX
 	
 	topologieGraph = Graph()
+	paths = None
+	distances = None
+	migrations = None
+	objective = None
+	bound = None
+	start = None
+	Hosting = None
 	
 	def __init__(self):
 		"""
@@ -1186,6 +1428,7 @@ class OMAC(object):
 		"""
 		self.POPs = 0
 		self.POP_id = []
+		self.POP_index = dict()
 		self.POP_name = []
 		self.POP_location = []
 		self.POP_netBW = []
@@ -1193,26 +1436,26 @@ class OMAC(object):
 		
 		for pop in listPOPs:
 			
+			self.POP_index[pop.id] = self.POPs
 			self.POP_id.append(pop.id)
 			self.POP_netBW.append(pop.maxNetBW)
 			self.POP_storage.append(pop.maxDisk)
 			self.POP_name.append(pop.name)
-			self.POP_location.append ( self.Location_id.index( pop.locationId  ) )
+			self.POP_location.append ( self.Location_index[pop.locationId] )
 			self.POPs = self.POPs + 1
 			
 			
 		#endfor
 		
-		self.hops = [ [0 for x in range(self.POPs) ] for y in range(self.POPs)]
+		names = [ self.Location_name[l] for l in self.POP_location ]
+		self.paths.setTargets(names)
 		
-		for popA in listPOPs:
-			for popB in listPOPs:
-				node_src = self.topologieGraph.vs.find(name = (popA.location.name))
-				node_dst = self.topologieGraph.vs.find(name = (popB.location.name))
-			
-				SPT = self.topologieGraph.get_shortest_paths(node_src,to = node_dst, output="epath" )[0];
-			
-				self.hops[self.POP_id.index(popA.id)][self.POP_id.index(popB.id)] = len(SPT)
+		if self.distances is None or [ name for name in names if name not in self.distances.index ]:
+			self.distances = Distances(self.topologieGraph, names)
+		
+		self.hops = [ [ self.distances.getHops(a, b) for b in names ] for a in names ]
+		self.hops = [ [ hops if hops != _infinite else 0 for hops in row ] for row in self.hops ]
+		# Without a path, the hops are 0
 		
 		
 	#enddef
@@ -1228,22 +1471,27 @@ class OMAC(object):
 		"""
 		self.vCDNs = 0
 		self.vCDN_id = []
+		self.vCDN_index = dict()
 		self.vCDN_name = []
 		self.vCDN_pop = []
 		self.vCDN_size = []
+		self.vCDN_instance = []
 		
 		##### OMAC assumes that a vCDN is located only in 1 server, so there is only 1 Instance per vCDN
 		##### But HMAC allows for multiple Instances of the same vCDN
 		
 		for v in listvCDNs:
+			self.vCDN_index[v.id] = self.vCDNs
 			self.vCDN_id.append(v.id)
 			self.vCDN_size.append(v.vDisk)
 			self.vCDN_name.append(v.name)
 			if v.instances:
 				firstInstance = v.instances[0]
-				self.vCDN_pop.append (  self.POP_id.index(firstInstance.popId)  )
+				self.vCDN_pop.append (  self.POP_index[firstInstance.popId]  )
+				self.vCDN_instance.append (firstInstance.id)
 			else:
 				self.vCDN_pop.append (0)
+				self.vCDN_instance.append (None)
 				
 			
 			self.vCDNs = self.vCDNs + 1
@@ -1258,13 +1506,15 @@ class OMAC(object):
 		"""
 		self.Clients = 0
 		self.Client_id = []
+		self.Client_index = dict()
 		self.Client_name = []
 		self.Client_location = []
 		
 		for c in clientGroups:
+			self.Client_index[c.id] = self.Clients
 			self.Client_id.append(c.id)
 			self.Client_name.append(c.name)
-			self.Client_location.append ( self.Location_id.index( c.locationId  ) )
+			self.Client_location.append ( self.Location_index[c.locationId] )
 			self.Clients = self.Clients + 1
 	#enddef
 	
@@ -1278,31 +1528,104 @@ class OMAC(object):
 			.. note:: The list of Demands are assumed to be valid, they are not checked in this function.
 		"""
 		
-		self.DemandsBW = [ [0 for x in range(self.vCDNs) ] for y in range(self.Clients)]
-		self.Y = [ [[0 for z in range(self.vCDNs) ] for x in range(self.Clients) ] for y in range(self.POPs)]
-		self.Z =  [ [ [[0 for z in range(self.Clients) ] for x in range(self.vCDNs) ] for y in range(self.Locations)]  for w in range (self.Locations)]
+		# Only the non-zero values are kept, keyed by their indexes:
+		# DemandsBW[(client,vcdn)], Y[(pop,client,vcdn)] and Z[(client,vcdn,locationA,locationB)]
+		self.DemandsBW = dict()
+		self.Y = dict()
+		self.Z = dict()
+		self.Demand_ids = dict()
+		
+		# The Location of each vertex of the Topologie graph, None if it is not a Location of the Model
+		vertexLocation = [ self.Location_nameIndex.get(name) for name in self.topologieGraph.vs['name'] ]
 		
 		for dem in listDemands:
 			try:
-				self.DemandsBW [ self.Client_id.index(dem.clientGroupId) ][ self.vCDN_id.index(dem.vcdnId) ] = dem.bw
-				
-				self.Y [ self.POP_id.index(dem.popId) ] [ self.Client_id.index(dem.clientGroupId) ][ self.vCDN_id.index(dem.vcdnId) ]= 1
-			except IndexError:
+				client = self.Client_index[dem.clientGroupId]
+				vcdn = self.vCDN_index[dem.vcdnId]
+				pop = self.POP_index[dem.popId]
+			except KeyError:
 				continue
 			
-			node_src = self.topologieGraph.vs.find(name = (dem.clientGroup.location.name))
-			node_dst = self.topologieGraph.vs.find(name = (dem.pop.location.name))
+			self.DemandsBW [ (client, vcdn) ] = dem.bw
+			self.Demand_ids.setdefault( (client, vcdn), [] ).append(dem.id)
+			self.Y [ (pop, client, vcdn) ] = 1
 			
-			SPT = self.topologieGraph.get_shortest_paths(node_src,to = node_dst)[0];
+			SPT = self.paths.path(self.Location_name[self.Client_location[client]], self.Location_name[self.POP_location[pop]])
 			
 			for k in range (0 , len(SPT) -1):
+				locationA = vertexLocation[SPT[k]]
+				locationB = vertexLocation[SPT[k+1]]
+				if locationA is not None and locationB is not None:
+					self.Z[ (client, vcdn, locationA, locationB) ] = 1
 		
-				LocationAName = self.topologieGraph.vs['name'][SPT[k]]
-				LocationBName = self.topologieGraph.vs['name'][SPT[k+1]]
-				try:
-					self.Z[self.Client_id.index(dem.clientGroupId)][self.vCDN_id.index(dem.vcdnId)][ self.Location_name.index(LocationAName) ] [self.Location_name.index(LocationBName)] = 1
-				except IndexError:
-					continue
+		# A new set of Demands invalidates the previous HMAC result
+		self.start = None
+	#enddef
+	
+	def setHosting(self, snapshot):
+		"""
+			Keeps the POPs that can host each vCDN: Hosting[s][f] is 1 if the POP `s` has the resources for the vCDN `f`, or it already has its Instance; 0 otherwise
+			
+			x[s][f] can only be 1 where Hosting[s][f] is 1. Without calling this function, all the POPs can host all the vCDNs
+			
+			:param snapshot: The Infrastructure values of this optimization, with its hosting matrix ..seealso:: Snapshot.Snapshot.canHost()
+			:type snapshot: Snapshot.Snapshot
+			
+			.. note:: Call it after setPOPs() and setvCDNs()
+		"""
+		self.Hosting = snapshot.hostingMask(self.POP_id, self.vCDN_id)
+		for f in range(self.vCDNs):
+			if self.vCDN_instance[f] is not None:
+				self.Hosting[ self.vCDN_pop[f] ][f] = 1
+	#enddef
+	
+	def getHosting(self, s, f):
+		"""
+			:returns: 1 if the POP `s` can host the vCDN `f`, 0 otherwise ..seealso:: setHosting()
+			:rtype: int
+		"""
+		return self.Hosting[s][f] if self.Hosting is not None else 1
+	#enddef
+	
+	def setStart(self, migrations, alteredDemands=None):
+		"""
+			Keeps the result of HMAC as starting point of OMAC: the POPs of the vCDNs (x) and the POP serving each Demand (y)
+			
+			Each Demand is served by its POP, or by the destination of the HmacResult or AlteredDemand that lists it. 
+			Each vCDN is placed in the POP of its Instance and in the POPs that serve its Demands
+			
+			:param migrations: List of HmacResults
+			:type migrations: HmacResult[]
+			:param alteredDemands: List of AlteredDemands
+			:type alteredDemands: AlteredDemand[]
+			
+			.. note:: Call it after setDemands(), with Demands of the same optimization
+		"""
+		pairOf = dict()
+		for pair,ids in self.Demand_ids.items():
+			for id in ids:
+				pairOf[id] = pair
+		
+		servers = dict()
+		for s,v,f in sorted(self.Y):
+			servers[(v,f)] = s
+		
+		for alt in (alteredDemands or []):
+			if alt.demandId in pairOf and alt.dstPopId in self.POP_index:
+				servers[ pairOf[alt.demandId] ] = self.POP_index[alt.dstPopId]
+		
+		for m in (migrations or []):
+			if m.dstPopId not in self.POP_index:
+				continue
+			for id in m.demandsIds:
+				if id in pairOf:
+					servers[ pairOf[id] ] = self.POP_index[m.dstPopId]
+		#endfor
+		
+		placements = set( (s,f) for (v,f),s in servers.items() )
+		placements.update( (self.vCDN_pop[f], f) for f in range(self.vCDNs) if self.vCDN_instance[f] is not None )
+		
+		self.start = (placements, servers)
 	#enddef
 	
 	def setTopologie(self, locationsList, linksList):
@@ -1322,23 +1645,32 @@ class OMAC(object):
 			self.topologieGraph.add_edge((l.locationA.name),(l.locationB.name))
 		#endfor
 		
+		self.paths = PathCache(self.topologieGraph)
+		
 		self.Locations = 0
 		self.Location_id = []
+		self.Location_index = dict()
 		self.Location_name = []
+		self.Location_nameIndex = dict()
 		
 		for l in locationsList:
+			self.Location_index[l.id] = self.Locations
+			self.Location_nameIndex[l.name] = self.Locations
 			self.Location_id.append(l.id)
 			self.Location_name.append(l.name)
 			self.Locations = self.Locations + 1
 			
-		self.Capacity = [ [0 for x in range(self.Locations) ] for y in range(self.Locations)]
+		# Only the existing links are kept, keyed by (locationA,locationB)
+		self.Capacity = dict()
 		
 		for l in linksList:
 			try:
-				self.Capacity [ self.Location_id.index(l.locationAId) ][ self.Location_id.index(l.locationBId) ] = l.capacity
-				self.Capacity [ self.Location_id.index(l.locationBId) ][ self.Location_id.index(l.locationAId) ] = l.capacity
-			except IndexError:
+				a = self.Location_index[l.locationAId]
+				b = self.Location_index[l.locationBId]
+			except KeyError:
 				continue
+			self.Capacity [ (a, b) ] = l.capacity
+			self.Capacity [ (b, a) ] = l.capacity
 	
 
 	#enddef
@@ -1353,32 +1685,138 @@ class OMAC(object):
 		
 		for c in migCosts:
 			try:
-				self.MigCosts [ self.POP_id.index(c.popAId) ][ self.POP_id.index(c.popBId)  ] = c.costMultiplier
-				self.MigCosts [ self.POP_id.index(c.popBId) ][ self.POP_id.index(c.popAId)  ] = c.costMultiplier
-			except IndexError:
+				a = self.POP_index[c.popAId]
+				b = self.POP_index[c.popBId]
+			except KeyError:
 				continue
+			self.MigCosts [a][b] = c.costMultiplier
+			self.MigCosts [b][a] = c.costMultiplier
 			
 	#enddef
 	
 	def optimize(self):
 		"""
-			Writes a .dat file for CPLEX engine to run next to the .mod file already prepared
+			Writes the files of the `omac_export_formats` option in the `omac_output_dir` folder ..seealso:: export()
+			
+			If the `omac_solver` option is not "cplex", the problem is also solved in-process and the migrations are kept in `self.migrations`. ..seealso:: solve()
 			
-			At the end of the execution, get the 2 CPLEX files from '../CPLEX/*'
+			With a HMAC result ..seealso:: setStart(), it is polished for `omac_polish_time` seconds, written in the .mst file and given to the in-process solver
 			
-			:returns: True is all went OK, False if it was unable to write the file.
+			With the `omac_decomposition` option, the whole problem is only built for the mps, lp and mst files, and the HMAC result is only used if it was built
+			
+			With the `omac_rounding` option, only the LP relaxation is solved and rounded; the cost of the migrations and the LP bound are kept in `self.objective` and `self.bound` ..seealso:: gap()
+			
+			:returns: True is all went OK. With "cplex", False if it was unable to write the files; otherwise False if the in-process solver found no solution.
 			 
 		"""
-		try:
+		problem = None
+		if (omacSolver != "cplex" and (omacRounding or not omacDecomposition)) or set(omacExportFormats) & set(["mps","lp","mst"]):
+			problem = OMACSolver.OMACProblem(self, omacFormulation)
+		
+		start = None
+		if problem is not None and self.start is not None:
+			start = self.getStart(problem, omacPolishTime)
+		
+		written = self.export(problem = problem, start = start)
+		
+		if omacSolver == "cplex":
+			return written
+		
+		self.migrations = self.solve(omacSolver, omacTimeLimit, omacMipGap, problem, start, omacDecomposition and not omacRounding, omacRounding)
+		
+		return self.migrations is not None
+	#enddef
+	
+	def getStart(self, problem, polishTime=0):
+		"""
+			:param problem: The MILP of this OMAC
+			:type problem: OMACSolver.OMACProblem
+			:param polishTime: Time of the local search that improves the HMAC result, in seconds. 0 for no search
+			:type polishTime: float
+			
+			:returns: the HMAC result given to setStart() as a solution of the problem; None without it
+			:rtype: OMACSolver.Assignment
+		"""
+		if self.start is None:
+			return None
+		
+		placements, servers = self.start
+		start = OMACSolver.Assignment(self, problem, placements, servers)
+		logger.info(Messages.OMAC_Start_F_cost_F_excess % (start.cost, start.excess))
+		
+		if polishTime:
+			moves = start.polish(polishTime)
+			logger.info(Messages.OMAC_Polished_D_moves_F_cost_F_excess % (moves, start.cost, start.excess))
+		
+		return start
+	#enddef
+	
+	def export(self, directory=None, formats=None, problem=None, start=None):
+		"""
+			Writes the OMAC problem to files named OMAC.<format>. Each file is written as it is generated, through a buffered file
+			
+			> dat: OPL data file, to run with the OMAC.mod file in CPLEX
+			> mps: free MPS file of the MILP ..seealso:: OMACSolver.writeMPS()
+			> lp: CPLEX LP file of the MILP ..seealso:: OMACSolver.writeLP()
+			> mst: CPLEX MIP start file of the HMAC result, for the LP and MPS files ..seealso:: OMACSolver.writeMST()
+			
+			:param directory: Folder of the files. Relative paths are from the vIOSLib folder. By default, the `omac_output_dir` option
+			:type directory: String
+			:param formats: Formats to write. By default, the `omac_export_formats` option
+			:type formats: String[]
+			:param problem: The MILP of this OMAC, if it was already built. Otherwise, it is built with the `omac_formulation` option
+			:type problem: OMACSolver.OMACProblem
+			:param start: The start of the .mst file. By default, the HMAC result given to setStart(), without polishing
+			:type start: OMACSolver.Assignment
+			
+			:returns: True is all went OK, False if it was unable to write a file.
+			 
+		"""
+		directory = os.path.join( os.path.dirname(os.path.abspath(__file__)), directory or omacOutputDir )
+		
+		written = True
+		for format in (formats or omacExportFormats):
+			if format != "dat" and problem is None:
+				problem = OMACSolver.OMACProblem(self, omacFormulation)
+			
+			if format == "mst" and start is None:
+				start = self.getStart(problem)
+				if start is None:
+					logger.warning(Messages.OMAC_No_Start)
+					continue
 			
-			directory = os.path.dirname(os.path.abspath(__file__))
-			path = os.path.join(directory, '../CPLEX/OMAC.dat')
-			f = open(path, 'w')
+			path = os.path.join(directory, _OMAC_FILENAME + "." + format)
+			try:
+				with open(path, 'w', _exportBuffer) as f:
+					if format == "dat":
+						self.writeDat(f)
+					elif format == "mps":
+						OMACSolver.writeMPS(problem, f)
+					elif format == "mst":
+						OMACSolver.writeMST(problem, start, f)
+					else:
+						OMACSolver.writeLP(problem, f)
+			except IOError:
+				logger.exception(Messages.Unable_Write_File_S % str(path))
+				written = False
+				continue
 			
-		except IOError:
-			logger.exception(Messages.Unable_Write_File_S % str(path))
-			return False
+			logger.debug(Messages.OMAC_File_S_S % (format, str(path)))
+		#endfor
 		
+		return written
+	#enddef
+	
+	def writeDat(self, f):
+		"""
+			Writes the .dat file for CPLEX engine to run next to the .mod file already prepared
+			
+			The matrices are written row by row, the sparse ones filling the missing values with 0
+			
+			:param f: An open file
+			:type f: file
+			 
+		"""
 		f.write("//OMAC CPLEX Data file\n\n")
 		
 		#Dimensions
@@ -1412,21 +1850,108 @@ class OMAC(object):
 		
 		
 		#Matrix values
-		f.write("d = " + matrix2string(self.DemandsBW) + ";\n")
+		f.write("d = ")
+		writeMatrix(f, sparseRows(self.DemandsBW, self.Clients, self.vCDNs))
+		f.write(";\n")
+		f.write("\n\n")
+		f.write("C = ")
+		writeMatrix(f, sparseRows(self.Capacity, self.Locations, self.Locations))
+		f.write(";\n")
 		f.write("\n\n")
-		f.write("C = " + matrix2string(self.Capacity) + ";\n")
+		f.write("hopcount = ")
+		writeMatrix(f, self.hops)
+		f.write(";\n")
 		f.write("\n\n")
-		f.write("hopcount = " + matrix2string(self.hops) + ";\n")
+		f.write("migrationCostK = ")
+		writeMatrix(f, self.MigCosts)
+		f.write(";\n")
 		f.write("\n\n")
-		f.write("migrationCostK = " + matrix2string(self.MigCosts) + ";\n")
+		f.write("canHost = ")
+		writeMatrix(f, self.Hosting if self.Hosting is not None else [ [1] * self.vCDNs for s in range(self.POPs) ])
+		f.write(";\n")
+	#enddef
+	
+	def solve(self, solver, timeLimit=None, mipGap=None, problem=None, start=None, decomposition=False, rounding=False):
+		"""
+			Solves the OMAC problem in-process with an open-source MILP solver ..seealso:: OMACSolver
+			
+			With `decomposition`, it is solved as one subproblem per vCDN, in `omac_processes` processes ..seealso:: OMACDecomposition
+			
+			With `rounding`, only its LP relaxation is solved, and rounded `omac_rounding_rounds` times ..seealso:: OMACRounding
+			
+			The cost of the migrations is kept in `self.objective`, and the best lower bound known of the optimum in `self.bound`
+			
+			A migration is a vCDN placed (x[s][f] = 1) in a POP that is not the one of its Instance. 
+			The Demands served from that POP are in its `demandsIds`
+			
+			:param solver: "highs" or "cbc"
+			:type solver: String
+			:param timeLimit: Maximum time for the solver, in seconds. None for no limit
+			:type timeLimit: float
+			:param mipGap: Relative MIP gap at which the solver stops. None for the solver's default
+			:type mipGap: float
+			:param problem: The MILP of this OMAC, if it was already built. Otherwise, it is built with the `omac_formulation` option
+			:type problem: OMACSolver.OMACProblem
+			:param start: A known solution, kept if the solver finds nothing better. ..seealso:: getStart()
+			:type start: OMACSolver.Assignment
+			:param decomposition: If True, solve a subproblem per vCDN. `problem` is then not used
+			:type decomposition: bool
+			:param rounding: If True, round the LP relaxation instead of solving the MILP. `mipGap` is then not used
+			:type rounding: bool
+			
+			:returns: the migrations, as HmacResults that are not added to the DB; None if no solution was found
+			:rtype: HmacResult[] or None
+		"""
+		self.objective = None
+		self.bound = None
+		
+		if decomposition:
+			solution = OMACDecomposition.solve(self, solver, timeLimit, mipGap, omacFormulation, omacProcesses, omacLagrangianIterations, start)
+		else:
+			if problem is None:
+				problem = OMACSolver.OMACProblem(self, omacFormulation)
+			if rounding:
+				solution = OMACRounding.solve(self, problem, solver, timeLimit, omacRoundingRounds, start)
+			else:
+				solution = OMACSolver.solve(problem, solver, timeLimit, mipGap, start)
 		
-		f.close()
+		if not solution.feasible:
+			logger.error(Messages.OMAC_No_Solution_S % solution.status)
+			return None
 		
-		logger.debug(Messages.OMAC_DAT_S % str(path))
+		servers = solution.servers()
 		
-		return True
+		migrations = []
+		for s,f in solution.placements():
+			if s == self.vCDN_pop[f] or self.vCDN_instance[f] is None:
+				continue
+			
+			migration = HmacResult(self.POP_id[s], self.vCDN_instance[f], cost = solution.cost(s, f))
+			for (v,g),server in servers.items():
+				if g == f and server == s:
+					migration.demandsIds.extend( self.Demand_ids.get( (v,g), [] ) )
+			migrations.append(migration)
+		#endfor
+		
+		logger.info(Messages.OMAC_Solved_S_objective_F_D_migrations % (solution.status, solution.objective, len(migrations)))
 		
+		self.objective = solution.objective
+		# The bound proven by the solver, if it gave one
+		self.bound = solution.bound if solution.bound is not None or solution.status != "optimal" else solution.objective
 		
+		return migrations
+	#enddef
+	
+	def gap(self):
+		"""
+			:returns: the relative gap between the cost of the last solution and its lower bound, as (objective - bound) / objective; None without both
+			:rtype: float or None
+		"""
+		if self.objective is None or self.bound is None:
+			return None
+		if abs(self.objective) <= OMACSolver._tolerance:
+			return 0.0
+		return max(self.objective - self.bound, 0) / abs(self.objective)
 	#enddef
 
 #endclass
@@ -1517,6 +2042,38 @@ def matrix2string(matrix):
 	return ret
 #enddef
 
+def writeMatrix(f, matrix):
+	"""
+		Writes a 2d matrix in the same form as matrix2string(), one row at a time
+		
+		:param f: An open file
+		:type f: file
+		:param matrix: a 2d matrix, or an iterator over its rows
+		:type matrix: int or float or String
+		
+	"""
+	f.write("[\n")
+	for r in matrix:
+		f.write(str(r).replace("L","") + " ,\n")
+	f.write("]")
+#enddef
+
+def sparseRows(values, rows, columns):
+	"""
+		Iterates over the rows of a sparse 2d matrix, filling the missing values with 0
+		
+		:param values: The non-zero values of a 2d matrix, keyed by (row, column)
+		:type values: dict
+		:param rows: Amount of rows of the matrix
+		:type rows: int
+		:param columns: Amount of columns of the matrix
+		:type columns: int
+		
+	"""
+	for r in range(rows):
+		yield [ values.get( (r,c), 0 ) for c in range(columns) ]
+#enddef
+
 def  str_array( listString):
 	"""
 		Becase the way tha Python prints an array is different from CPLEX,
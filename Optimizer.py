@@ -62,17 +62,20 @@ import time
 import logging
 
 import os
+from collections import namedtuple
 
 import thread
 # Use to have the OpenStack operations on separate Threads
 
-from  DataModels import Hypervisor,Flavor,Instance, Metric, Demand, Demand
+from  DataModels import Hypervisor,Flavor,Instance, Metric, Demand, AlteredDemand, HmacResult, NetworkLink
 import Messages
 import DBConnection 
 import OpenStackConnection as OpenStack
 from OpenStackConnection import ServerMetadata
 from OptimizationModels import Model, FakeDemand, FakeInstance, FakeRedirect, Random, NCUPM
 import SettingsFile
+import ModelCache
+import Snapshot
 
 
 logger = logging.getLogger(__name__)
@@ -116,6 +119,15 @@ OptimizationModel = None
 	:type HMAC class
 """
 
+OMACMigration = namedtuple("OMACMigration", "instanceId vcdnName srcPopName dstPopName cost demands")
+""" A migration of the OMAC solved in-process, with the names to show it next to the HMAC migrations. `demands` is the amount of Demands it serves """
+
+OMACResult = None
+""" 
+	The migrations of the last OMAC solved in-process by optimize(), None if it was not solved. They are not stored in the DB
+	:type OMACMigration[]
+"""
+
 def readSettingsFile():
 	"""
 		This function asks the INI file parser module, that must have read the INI file, to look for the options in the sections and variables that are of interest for this module.
@@ -159,7 +171,29 @@ def connect(url):
 	global DBConn	
 	logger.debug(Messages.ConnectDB_S % url)
 	DBConn = DBConnection.DBConnection(url)
-	return DBConn.connect()
+	if not DBConn.connect():
+		return False
+	
+	# An empty DB, such as SQLite, gets the schema and the data of the SQL files
+	if DBConnection.createSchemaOnConnect or DBConnection.isInMemory(url):
+		if not DBConn.createSchema():
+			logger.error(Messages.Exception_Creating_Schema)
+			return False
+		logger.info(Messages.Created_Schema)
+	for sqlFile in DBConnection.sqlFiles:
+		DBConn.start()
+		try:
+			failed = DBConn.loadSQL(sqlFile)
+		except IOError:
+			logger.error(Messages.Unable_Read_SQL_File_S % sqlFile)
+			return False
+		finally:
+			DBConn.end()
+		for statement,error in failed:
+			logger.warning(Messages.SQL_Statement_Failed_S_S % (statement.splitlines()[0], error))
+		logger.info(Messages.Loaded_SQL_File_S_failed_D % (sqlFile, len(failed)))
+	#endfor
+	return True
 #enddef
 
 def consumeDemands():
@@ -184,16 +218,17 @@ def consumeDemands():
 		try:
 			DBConn.start()
 			
-			demandsList = DBConn.getDemands()
+			demandsList = DBConn.getDemands("consume")
 			
 			logger.info(Messages.Consuming_Demands)
 			
 			if (demandsList):
+				# The pairs (vCDN,POP) with an Instance, from one query instead of one per Demand
+				instances = set( (i.vcdnId, i.popId) for i in (DBConn.getInstanceList() or []) )
 				for d in demandsList[:]:
 					
 					# Check Valid demands, invalids are removed
-					instance = getInstanceforDemand(d)
-					if  instance == None:
+					if  (d.vcdnId, d.popId) not in instances:
 						demandsList.remove(d)
 						logger.error(Messages.Invalid_Demand_Client_S_vCDN_S_POP_S % (d.clientGroup.name, d.vcdn.name, d.pop.name ))
 					
@@ -246,12 +281,7 @@ def createRandomInfrastructure():
 			linksList = erg.getLinkList()
 			
 			# Clear all the Network links, and take them from the ER Graph
-			for nl in DBConn.getNetworkLinks():
-				DBConn.drop(nl)
-			DBConn.applyChanges()
-			
-			for nl in linksList:
-				DBConn.add(nl)
+			DBConn.replaceAll(NetworkLink, linksList)
 			DBConn.applyChanges()
 
 			logger.info(Messages.Updated_NetworkLinks)
@@ -304,24 +334,20 @@ def createRandomDemands():
 		DBConn.start()
 		
 		# Get all instances of all Instances. Get all clientGroups
-		vCDNList = DBConn.getvCDNs()
+		vCDNList = DBConn.getvCDNs("instances")
 		ClientGroupList = DBConn.getClientGroups()
 		
 		if vCDNList  and ClientGroupList  :
 			
 			logger.debug(Messages.CreatingRandomDemands_D_probaF_amplitudeD % (len(vCDNList) *len(ClientGroupList),demandProbability,demandAmplitude))
 			
-			# Remove all Demands.
-			demands = DBConn.getDemands()
-			if demands:
-				for d in demands:
-					DBConn.drop(d)
-				DBConn.applyChanges()
-				
+			# Remove all Demands, with their AlteredDemands
+			DBConn.bulkDeleteWhere(AlteredDemand)
+			if DBConn.bulkDeleteWhere(Demand):
 				logger.info(Messages.Deleted_Demands)
 			
 			# Make random associations
-			accum = 0
+			demands = []
 			for v in vCDNList:
 				seed()
 				
@@ -340,15 +366,15 @@ def createRandomDemands():
 								
 								# (demandProbability - rnd) gives a number  in the interval [0,demandProbability]; demandProbability < 1
 								# (demandProbability - rnd) * 2 * demandAmplitude gives a number in the desired range
-								DBConn.add(d)
-								accum = accum+1
+								demands.append(d)
 								break
 							#endif
 						#endfor
 					#endif
 				#endfor
 			
-			# Update DB
+			# Update DB, the old and new Demands in the same transaction
+			accum = DBConn.bulkAdd(Demand, demands)
 			DBConn.applyChanges()
 				
 			logger.info(Messages.Created_D_Demands % accum )
@@ -413,8 +439,8 @@ def simulate( migrationList = [],redirectList = [], instantiationList = []):
 		buildModel()
 		
 		DBConn.start()
-		realInstances = DBConn.getInstanceList()
-		realDemands = DBConn.getDemands()
+		realInstances = DBConn.getInstanceList("simulate")
+		realDemands = DBConn.getDemands("simulate")
 		
 		fakeInstances = []
 		fakeDemands = []
@@ -937,43 +963,37 @@ def optimize():
 		
 		.. seealso:: OptimizationModel.optimizeHMAC()
 		
+		The migrations of OMAC, if it is solved in-process, are kept in OMACResult
+		
 	"""
 	global Model
 	global DBConn
+	global OMACResult
 	
 	logger.info(Messages.Optimizating)
+	OMACResult = None
 	
 	# This creates a new Model from the DB and passes the Demands to have a remaining capacity Graph
 	if consumeDemands():
 		
-		#Delete the previous HmacResults Entries
+		#Delete the previous HmacResults and AlteredDemands Entries
 		DBConn.start()
-		migList = DBConn.getHmacResults()
-		if (migList):
-			for m in migList:
-				DBConn.drop(m)
-			DBConn.applyChanges()
+		# The ON DELETE SET NULL of the Demands is not run by SQLite
+		DBConn.bulkUpdateWhere(Demand, {"hmacResultId": None}, Demand.hmacResultId != None)
+		if DBConn.bulkDeleteWhere(HmacResult):
 			logger.info(Messages.Deleted_Migrations)
-		DBConn.end()
-		#endif
-		
-		#Delete the previous AlteredDemands Entries
-		DBConn.start()
-		altDemandsList = DBConn.getAlteredDemands()
-		if (altDemandsList):
-			for alt in altDemandsList:
-				DBConn.drop(alt)
-			DBConn.applyChanges()
+		if DBConn.bulkDeleteWhere(AlteredDemand):
 			logger.info(Messages.Deleted_Redirections)
+		DBConn.applyChanges()
 		DBConn.end()
-		#endif
 				
 		try:
 			
 			DBConn.start()
 			demands = DBConn.getDemands()
-			vcdns =  DBConn.getvCDNs()
-			migCostKList =  DBConn.getMigrationCostMultiplierList()
+			
+			# HMAC runs on an in-memory copy of the POPs, vCDNs and Instances, instead of asking the DB for each Demand
+			snapshot = Snapshot.load(DBConn)
 			
 			migrationList = None
 			invalidDemands = None
@@ -982,9 +1002,11 @@ def optimize():
 				
 				
 				
-				migrationList, alteredDemands  = OptimizationModel.optimizeHMAC(demands)
+				migrationList, alteredDemands  = OptimizationModel.optimizeHMAC(demands, snapshot)
 				
 				logger.info(Messages.HMAC_optimized)
+				
+				demandsById = dict( (d.id, d) for d in demands )
 					
 				#If as a result, there are HmacResults to make, they are written to the DB
 				#This is done to Isolate the Modeling only from where and how is the result stored
@@ -1004,10 +1026,10 @@ def optimize():
 				
 				### Update the list of Demands that are affected by a Migration
 				### Update the Cost of migrations ###
-				 
+				
 				for m in migrationList:
 					
-					migCostMultiplier = DBConn.getMigrationCostMultiplier(m.instance.popId, m.dstPopId)
+					migCostMultiplier = snapshot.getMigrationCostMultiplier(snapshot.getInstanceById(m.instanceId).popId, m.dstPopId)
 					
 					if migCostMultiplier :
 						m.cost = m.cost * migCostMultiplier
@@ -1016,23 +1038,33 @@ def optimize():
 					
 					for d in m.demandsIds:
 					
-						demand = DBConn.getDemandById(d)
+						demand = demandsById.get(d)
 						if demand:
 							demand.hmacResultId = m.id
 					
 				DBConn.applyChanges()
 				
+				# The commits expired the loaded objects, they are read again in one query each instead of one query per object
+				demands = DBConn.getDemands()
+				vcdns =  DBConn.getvCDNs("instances")
+				migCostKList =  DBConn.getMigrationCostMultiplierList()
 								
 				# Add the missing information for the OMAC model
 				OptimizationModel.omac.setvCDNs(vcdns)
 				OptimizationModel.omac.setMigrationCost(migCostKList)
 				OptimizationModel.omac.setDemands(demands)
+				OptimizationModel.omac.setHosting(snapshot)
+				
+				# The HMAC result is the starting point of OMAC
+				OptimizationModel.omac.setStart(migrationList, alteredDemands)
 				
 				# Write the .DAT file for OMAC Optimization
 				if not OptimizationModel.omac.optimize():
 					logger.error(Messages.No_OMAC_Optimize)
 				else:
 					logger.info(Messages.OMAC_optimized)
+					if OptimizationModel.omac.migrations is not None:
+						OMACResult = _omacMigrations(OptimizationModel.omac.migrations, snapshot)
 					
 				
 				DBConn.applyChanges()
@@ -1057,6 +1089,27 @@ def optimize():
 #enddef
 
 
+def _omacMigrations(migrations, snapshot):
+	"""
+		:param migrations: The migrations of the OMAC solved in-process
+		:type migrations: HmacResult[]
+		:param snapshot: The Snapshot the OMAC was built from
+		:type snapshot: Snapshot.Snapshot
+		
+		:returns: the migrations with the names of their vCDN and POPs, sorted by vCDN and destination POP
+		:rtype: OMACMigration[]
+	"""
+	result = []
+	for m in migrations:
+		instance = snapshot.getInstanceById(m.instanceId)
+		vcdn = snapshot.getvCDN(instance.vcdnId) if instance else None
+		srcPop = snapshot.getPOP(instance.popId) if instance else None
+		dstPop = snapshot.getPOP(m.dstPopId)
+		result.append( OMACMigration(m.instanceId, vcdn.name if vcdn else "", srcPop.name if srcPop else "", dstPop.name if dstPop else "", m.cost, len(m.demandsIds)) )
+	return sorted(result, key = lambda m: (m.vcdnName, m.dstPopName))
+#enddef
+
+
 def buildModel():
 	""" 
 		Gathers information from the DB and calls creates an HMAC/OMAC Model
@@ -1064,6 +1117,8 @@ def buildModel():
 		
 		This resets/rebuils the global object Model
 		
+		If a Model was already built from the same DB values, a copy of it is taken from the ModelCache instead
+		
 		:returns:  True if Model was built; False if not.
 		
 	"""
@@ -1072,12 +1127,28 @@ def buildModel():
 	global OptimizationModel
 	
 	logger.info(Messages.Building_Model) 
+	
+	#The Gomory-Hu Tree of the previous Model is repaired instead of being recomputed
+	previousTree = None
+	if OptimizationModel:
+		previousTree = OptimizationModel.cutTree
+	
 	DBConn.start()
+	
+	#If the topologie did not change since a Model was built, that one is used
+	fingerprint = DBConn.getModelFingerprint()
+	cachedModel = ModelCache.get(fingerprint)
+	if cachedModel:
+		OptimizationModel = cachedModel
+		DBConn.end()
+		return True
+	
 	try:
 		
 		#Build nodes with locations and links
-		locations = DBConn.getLocations()
-		netLinks = DBConn.getNetworkLinks()
+		# The Model only reads them, so they can be the ones in cache
+		locations = DBConn.getLocations(readOnly = True)
+		netLinks = DBConn.getNetworkLinks("model", readOnly = True)
 		if (locations and netLinks ):
 			OptimizationModel = Model(locations,netLinks)
 		else:
@@ -1093,7 +1164,7 @@ def buildModel():
 
 	try:
 		#Place POPs in infrastructure
-		pops = DBConn.getPOPList()
+		pops = DBConn.getPOPList("model", readOnly = True)
 		if (pops):
 			OptimizationModel.setPOPs(pops)
 		else:
@@ -1106,7 +1177,7 @@ def buildModel():
 		return False
 	try:
 		#Place ClientGroups in infrastructure
-		clientGroups = DBConn.getClientGroups()
+		clientGroups = DBConn.getClientGroups("model", readOnly = True)
 		if (clientGroups):
 			OptimizationModel.setClientGroups(clientGroups)
 		else:
@@ -1118,7 +1189,8 @@ def buildModel():
 		logger.exception(Messages.Exception_Model_Clients)
 		return False
 	
-	OptimizationModel.buildGomoryTree()
+	OptimizationModel.buildGomoryTree(previousTree)
+	ModelCache.put(fingerprint, OptimizationModel)
 	DBConn.end()
 	
 	return True
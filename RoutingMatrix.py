@@ -0,0 +1,152 @@
+"""
+
+Routing Matrix of a Graph
+=========================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+Sparse matrix of Edges x (source,destination) pairs of a Graph, used to consume many Demands at once.
+
+The cell (e, k) is 1 if the Edge `e` is in the shortest path of the pair `k`. The paths are the same ones that
+`get_shortest_paths()` gives for each pair, so consuming the Demands with the matrix gives the same result as consuming them one by one.
+
+Given the BW of each pair, the load of every Edge is a single matrix-vector product.
+
+The columns are added the first time a pair is used, calculating the paths of all the new pairs of the same source in one call.
+If the Graph has a PathCache, the paths are taken from it (..seealso:: ShortestPaths.PathCache ).
+The matrix is valid while the Graph's edges are not changed, the Edge attributes can change.
+
+.. note:: Install numpy and scipy
+
+.. note:: This module does not interact with the DB, it only works over igraph Graphs
+
+:Example:
+
+	routing = RoutingMatrix(capacityGraph)
+	load, touched = routing.load([("Paris","Lyon"),("Paris","Nice")], [10.0, 2.5])
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import numpy
+from scipy import sparse
+
+
+_name_attr = "name"
+""" In the Graph; this vertex attribute contains the location name
+"""
+
+class RoutingMatrix(object):
+	"""
+		Sparse Edges x (source,destination) matrix of a Graph
+
+		:Example:
+
+			routing = RoutingMatrix(graph)
+			load, touched = routing.load(pairs, bws)
+			graph.es["capacity"] = (numpy.array(graph.es["capacity"]) - load).tolist()
+	"""
+
+	def __init__(self, graph, paths=None):
+		"""
+			:param graph: A Graph with a `name` vertex attribute. Its edges must not change while this matrix is used
+			:type graph: Graph
+			:param paths: The PathCache of the graph, if any
+			:type paths: PathCache
+		"""
+		self.graph = graph
+		self.paths = paths
+		self.index = dict( (name,i) for i,name in enumerate(graph.vs[_name_attr]) )
+		self.columns = dict()
+		self._rows = []
+		self._cols = []
+		self.matrix = sparse.csr_matrix( (graph.ecount(), 0) )
+	#enddef
+
+	def columnsOf(self, pairs):
+		"""
+			Gets the column of each pair, adding the new pairs to the matrix
+
+			:param pairs: list of (source name, destination name)
+			:type pairs: list[]
+
+			:returns: the column of each pair, or -1 if one of the names is not a vertex of the Graph
+			:rtype: numpy.ndarray
+		"""
+		keys = [ (self.index.get(src), self.index.get(dst)) for src,dst in pairs ]
+
+		missing = dict()
+		for key in keys:
+			if key not in self.columns and key[0] is not None and key[1] is not None:
+				missing.setdefault(key[0], set()).add(key[1])
+		if missing:
+			self._addPaths(missing)
+
+		return numpy.array( [ self.columns.get(key, -1) for key in keys ], dtype=numpy.int64 )
+	#enddef
+
+	def load(self, pairs, bws):
+		"""
+			Gets the BW that the pairs put on each Edge of the Graph
+
+			:param pairs: list of (source name, destination name)
+			:type pairs: list[]
+			:param bws: The BW of each pair
+			:type bws: float[]
+
+			:returns: the load of each Edge, and for each Edge True if it is in the path of any pair
+			:rtype: numpy.ndarray, numpy.ndarray
+		"""
+		columns = self.columnsOf(pairs)
+		known = columns >= 0
+		columns = columns[known]
+		size = len(self.columns)
+
+		bw = numpy.bincount(columns, weights=numpy.asarray(bws, dtype=float)[known], minlength=size)
+		used = numpy.bincount(columns, minlength=size)
+
+		return self.matrix.dot(bw), self.matrix.dot(used) > 0
+	#enddef
+
+	def _addPaths(self, missing):
+		"""
+			Adds a column for each new pair, with the shortest path calculated from each source to all its destinations at once
+
+			:param missing: The destination vertex indexes of each source vertex index
+			:type missing: dict
+		"""
+		for src,dsts in missing.iteritems():
+			dsts = list(dsts)
+			if self.paths is not None:
+				paths = self.paths.pathsFrom(src, dsts, output="epath")
+			else:
+				paths = self.graph.get_shortest_paths(src, to=dsts, output="epath")
+			for dst,path in zip(dsts,paths):
+				column = len(self.columns)
+				self.columns[(src,dst)] = column
+				self._rows.extend(path)
+				self._cols.extend( [column] * len(path) )
+		#endfor
+
+		self.matrix = sparse.csr_matrix( (numpy.ones(len(self._rows)), (self._rows, self._cols)),
+										shape=(self.graph.ecount(), len(self.columns)) )
+	#enddef
+
+#endclass
@@ -0,0 +1,132 @@
+"""
+
+Shortest Path Cache of a Graph
+==============================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+Keeps the shortest paths of a Graph, so that the same path is not searched again for every Demand.
+
+All the Demands of a ClientGroup start in the same Location, and they all go to the Locations of the POPs.
+So the first time a path from a source is needed, the paths from that source to all the targets (the POP Locations) are calculated in one `get_shortest_paths()` call: one shortest-path tree per source.
+The paths are the same ones that `get_shortest_paths()` gives for each pair, as the BFS does not depend on the targets asked.
+
+The paths depend only on the vertices and edges of the Graph, not on its attributes.
+The cache is valid while the topologie does not change, so it is kept with the Model and shared by its copies.
+
+.. note:: This module does not interact with the DB, it only works over igraph Graphs
+
+:Example:
+
+	paths = PathCache(capacityGraph)
+	paths.setTargets(["Paris","Lyon"])
+	for e in paths.path("Nice","Paris",output="epath"):
+		...
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+
+_name_attr = "name"
+""" In the Graph; this vertex attribute contains the location name
+"""
+
+class PathCache(object):
+	"""
+		Shortest paths of a Graph, calculated by source and kept while the Graph's vertices and edges do not change
+
+		Both kind of paths of `get_shortest_paths()` are kept: `vpath` (list of vertices) and `epath` (list of edges)
+	"""
+
+	def __init__(self, graph, targets=None):
+		"""
+			:param graph: A Graph with a `name` vertex attribute. Its vertices and edges must not change while this cache is used
+			:type graph: Graph
+			:param targets: Indexes of the vertices to calculate the paths to, from each source
+			:type targets: int[]
+		"""
+		self.graph = graph
+		self.index = dict( (name,i) for i,name in enumerate(graph.vs[_name_attr]) )
+		self.targets = list(targets or [])
+		self._trees = dict()
+	#enddef
+
+	def setTargets(self, names):
+		"""
+			Sets the vertices that are calculated together, each time the paths from a new source are needed. The paths already calculated are kept
+
+			:param names: Names of the target vertices, like the Locations of the POPs. Unknown names are ignored
+			:type names: String[]
+		"""
+		self.targets = sorted( set( self.index[name] for name in names if name in self.index ) )
+	#enddef
+
+	def path(self, src, dst, output="vpath"):
+		"""
+			:param src: Name of the source vertex
+			:type src: String
+			:param dst: Name of the destination vertex
+			:type dst: String
+			:param output: "vpath" or "epath", as in `get_shortest_paths()`
+			:type output: String
+
+			:returns: the shortest path from src to dst; empty if dst can not be reached
+			:rtype: int[]
+
+			:raises: KeyError if src or dst are not vertices of the Graph
+		"""
+		return self.pathsFrom(self.index[src], [self.index[dst]], output)[0]
+	#enddef
+
+	def pathsFrom(self, src, dsts, output="vpath"):
+		"""
+			Gets the paths from a source to many destinations. The missing ones are calculated in one call, together with the targets
+
+			:param src: Index of the source vertex
+			:type src: int
+			:param dsts: Indexes of the destination vertices
+			:type dsts: int[]
+			:param output: "vpath" or "epath", as in `get_shortest_paths()`
+			:type output: String
+
+			:returns: the shortest path to each destination
+			:rtype: list[]
+		"""
+		tree = self._trees.setdefault( (output,src), dict() )
+
+		missing = set( dst for dst in dsts if dst not in tree )
+		if missing:
+			missing.update( t for t in self.targets if t not in tree )
+			missing = sorted(missing)
+			for dst,path in zip(missing, self.graph.get_shortest_paths(src, to=missing, output=output)):
+				tree[dst] = path
+		#endif
+
+		return [ tree[dst] for dst in dsts ]
+	#enddef
+
+	def clear(self):
+		"""
+			Forgets all the paths, as needed if the Graph's vertices or edges were changed
+		"""
+		self._trees = dict()
+	#enddef
+
+#endclass
@@ -0,0 +1,338 @@
+"""
+
+In-memory snapshot of the Infrastructure
+========================================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+The values of the Infrastructure that HMAC needs, read from the DB at once at the start of an optimization.
+
+HMAC asks, for each Demand, for the Instance of a vCDN in a POP, for the POP a migration would go to, and if that POP can host the vCDN.
+Then the cost of each migration is multiplied by the Migration Cost Multiplier of its POPs.
+Asked to the DB, these are thousands of queries per optimization. The Snapshot reads the POPs, vCDNs, Instances, ClientGroups, Locations and Migration Cost Multipliers with one query each,
+and keeps them as read-only tuples in dictionaries.
+
+The Snapshot is not updated: it shows the Infrastructure as it was when it was loaded, and it does not hold DB objects, so it can be used after the DB session ends.
+
+If a POP can host a vCDN is calculated for all the pairs at once when the Snapshot is loaded, as a POP x vCDN matrix ..seealso:: canHost()
+The resources compared are the ones of the `hosting_resources` option. With numpy, the matrix is calculated with one comparison of the POP and vCDN vectors per resource.
+
+:Example:
+
+	DBConn.start()
+	snapshot = Snapshot.load(DBConn)
+	instance = snapshot.getInstance(popId, vcdnId)
+	if snapshot.canHost(popId, vcdnId): ...
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+from collections import namedtuple
+import logging
+
+import SettingsFile
+import Messages
+try:
+	import numpy
+except ImportError:
+	# The hosting matrix is calculated pair by pair
+	numpy = None
+
+logger = logging.getLogger(__name__)
+
+
+RESOURCES = { "disk": ("totalDisk", "curDisk", "vDisk"),
+				"ram": ("totalRAM", "curRAM", "vRAM"),
+				"cpu": ("totalCPU", "curCPU", "vCPU"),
+				"netbw": ("totalNetBW", "curNetBW", "vNetBW") }
+""" The resources that can be compared to know if a POP can host a vCDN: the POP total and current values, and the vCDN value
+"""
+
+hostingResources = ["disk"]
+""" The resources that a POP must have available, (total - current) > vCDN value, to host a vCDN ..seealso:: RESOURCES
+	In our test Infrastructure the OpenStacks are already at their limit for RAM, CPU and NetBW, so only the disk is checked by default
+"""
+
+
+def readSettingsFile():
+	"""
+		This function asks the INI file parser module, that must have read the INI file, to look for the options in the sections and variables that are of interest for this module.
+
+		If the options are not present in the INI file, the existing values are not modified
+
+		.. note:: Make sure that the SettingsFile module has been initialized and read a valid file
+
+		::Example::
+			SettingsFile.read(INI_file)
+			Snapshot.readSettingsFile()
+
+	"""
+	global hostingResources
+
+	if SettingsFile.getOptionString("DEFAULT","hosting_resources"):
+		hostingResources = []
+		for resource in SettingsFile.getOptionString("DEFAULT","hosting_resources").split(","):
+			resource = resource.strip().lower()
+			if resource in RESOURCES:
+				hostingResources.append(resource)
+			elif resource:
+				logger.warning(Messages.Unknown_Hosting_Resource_S % resource)
+#enddef
+
+
+class POPState(namedtuple("POPState", "id name locationName totalDisk curDisk totalRAM curRAM totalCPU curCPU totalNetBW curNetBW")):
+	"""
+		The values of a POP used by HMAC
+	"""
+	__slots__ = ()
+
+	def canHostVCDN(self, AvCDN):
+		"""
+			..seealso:: DataModels.POP.canHostVCDN()
+			
+			HMAC asks the hosting matrix of the Snapshot instead ..seealso:: Snapshot.canHost()
+		"""
+		try:
+			return (self.totalDisk - self.curDisk) > AvCDN.vDisk
+		except TypeError:
+			# The POP values come from OpenStack; if they are NULL full capacity is assumed
+			return True
+	#enddef
+
+	def canHostVCDN_String(self, AvCDN):
+		"""
+			..seealso:: DataModels.POP.canHostVCDN_String()
+		"""
+		try:
+			return "RAM: POP %d vCDN %d; Disk: POP %d vCDN %d; CPU: POP %d vCDN %d; NetBW: POP %d vCDN %d;" % (
+				(self.totalDisk - self.curDisk), AvCDN.vDisk,
+				(self.totalRAM - self.curRAM), AvCDN.vRAM,
+				(self.totalCPU - self.curCPU), AvCDN.vCPU,
+				(self.totalNetBW - self.curNetBW), AvCDN.vNetBW )
+		except TypeError:
+			return ""
+	#enddef
+
+#endclass
+
+vCDNState = namedtuple("vCDNState", "id name vDisk vRAM vCPU vNetBW")
+""" The values of a vCDN used by HMAC """
+
+InstanceState = namedtuple("InstanceState", "id popId vcdnId")
+""" The values of an Instance used by HMAC """
+
+ClientGroupState = namedtuple("ClientGroupState", "id name locationName")
+""" The values of a ClientGroup used by HMAC """
+
+
+class Snapshot(object):
+	"""
+		The POPs, vCDNs, Instances and ClientGroups of the Infrastructure, keyed by id
+
+		The Instances are also keyed by (popId, vcdnId), as HMAC looks for them by the POP and vCDN of the Demands
+
+		> hosting[p][v] = True if the POP in the position `p` of `popIds` can host the vCDN in the position `v` of `vcdnIds`
+	"""
+
+	def __init__(self, locations, pops, vcdns, instances, clientGroups, costMultipliers=None):
+		"""
+			:param locations: List of Locations
+			:type locations: Location[]
+			:param pops: List of POPs
+			:type pops: POP[]
+			:param vcdns: List of vCDNs
+			:type vcdns: vCDN[]
+			:param instances: List of Instances
+			:type instances: Instance[]
+			:param clientGroups: List of ClientGroups
+			:type clientGroups: ClientGroup[]
+			:param costMultipliers: List of Migration Cost Multipliers
+			:type costMultipliers: MigrationCostMultiplier[]
+		"""
+		locationNames = dict( (l.id, l.name) for l in locations )
+
+		self._pops = dict( (p.id, POPState(p.id, p.name, locationNames.get(p.locationId),
+											p.totalDisk, p.curDisk, p.totalRAM, p.curRAM, p.totalCPU, p.curCPU, p.totalNetBW, p.curNetBW))
+							for p in pops )
+		self._vcdns = dict( (v.id, vCDNState(v.id, v.name, v.vDisk, v.vRAM, v.vCPU, v.vNetBW)) for v in vcdns )
+		self._clientGroups = dict( (c.id, ClientGroupState(c.id, c.name, locationNames.get(c.locationId))) for c in clientGroups )
+
+		self._instances = dict()
+		self._instancesOf = dict()
+		for i in instances:
+			instance = InstanceState(i.id, i.popId, i.vcdnId)
+			self._instances[i.id] = instance
+			key = (i.popId, i.vcdnId)
+			# As DBConnection.getInstanceOf(), a pair with many Instances has none
+			self._instancesOf[key] = None if key in self._instancesOf else instance
+		#endfor
+		
+		self._costMultipliers = dict()
+		for c in (costMultipliers or []):
+			self._costMultipliers[ (c.popAId, c.popBId) ] = c.costMultiplier
+			self._costMultipliers[ (c.popBId, c.popAId) ] = c.costMultiplier
+		#endfor
+		
+		self.popIds = sorted(self._pops)
+		self.vcdnIds = sorted(self._vcdns)
+		self._popIndex = dict( (id,p) for p,id in enumerate(self.popIds) )
+		self._vcdnIndex = dict( (id,v) for v,id in enumerate(self.vcdnIds) )
+		self.hosting = self._hostingMatrix()
+
+		logger.info(Messages.Snapshot_D_POPs_D_vCDNs_D_Instances % (len(self._pops), len(self._vcdns), len(self._instances)))
+	#enddef
+
+	def _hostingMatrix(self):
+		"""
+			:returns: the hosting matrix, as a numpy array of booleans or, without numpy, as lists
+			:rtype: numpy.ndarray or bool[][]
+		"""
+		pops = [ self._pops[id] for id in self.popIds ]
+		vcdns = [ self._vcdns[id] for id in self.vcdnIds ]
+		
+		if numpy is None:
+			return [ [ all( self._fits(pop, vcdn, resource) for resource in hostingResources ) for vcdn in vcdns ] for pop in pops ]
+		
+		hosting = numpy.ones( (len(pops), len(vcdns)), dtype=bool )
+		for resource in hostingResources:
+			total, current, size = RESOURCES[resource]
+			# The values come from OpenStack; NULL values are NaN, and a comparison with NaN is taken as a fit
+			available = numpy.array( [ _value(getattr(pop, total)) - _value(getattr(pop, current)) for pop in pops ], dtype=float )
+			needed = numpy.array( [ _value(getattr(vcdn, size)) for vcdn in vcdns ], dtype=float )
+			with numpy.errstate(invalid="ignore"):
+				hosting &= ~( available[:,None] <= needed[None,:] )
+		#endfor
+		return hosting
+	#enddef
+	
+	def _fits(self, pop, vcdn, resource):
+		total, current, size = RESOURCES[resource]
+		try:
+			return (getattr(pop, total) - getattr(pop, current)) > getattr(vcdn, size)
+		except TypeError:
+			# The POP values come from OpenStack; if they are NULL full capacity is assumed
+			return True
+	#enddef
+	
+	def canHost(self, popId, vcdnId):
+		"""
+			..seealso:: DataModels.POP.canHostVCDN()
+			
+			:returns: True if the POP has available the `hosting_resources` that the vCDN needs; False if the POP or the vCDN is not found
+			:rtype: bool
+		"""
+		p = self._popIndex.get(popId)
+		v = self._vcdnIndex.get(vcdnId)
+		if p is None or v is None:
+			return False
+		return bool(self.hosting[p][v])
+	#enddef
+	
+	def hostingMask(self, popIds, vcdnIds):
+		"""
+			:param popIds: Ids of the POPs, in the order of the rows
+			:type popIds: int[]
+			:param vcdnIds: Ids of the vCDNs, in the order of the columns
+			:type vcdnIds: int[]
+			
+			:returns: 1 where the POP can host the vCDN, 0 otherwise ..seealso:: canHost()
+			:rtype: int[][]
+		"""
+		return [ [ 1 if self.canHost(popId, vcdnId) else 0 for vcdnId in vcdnIds ] for popId in popIds ]
+	#enddef
+	
+	def getPOP(self, id):
+		"""
+			:returns: the POP with this id, or None if not found
+			:rtype: POPState or None
+		"""
+		return self._pops.get(id)
+	#enddef
+
+	def getvCDN(self, id):
+		"""
+			:returns: the vCDN with this id, or None if not found
+			:rtype: vCDNState or None
+		"""
+		return self._vcdns.get(id)
+	#enddef
+
+	def getClientGroup(self, id):
+		"""
+			:returns: the ClientGroup with this id, or None if not found
+			:rtype: ClientGroupState or None
+		"""
+		return self._clientGroups.get(id)
+	#enddef
+
+	def getInstanceById(self, id):
+		"""
+			:returns: the Instance with this id, or None if not found
+			:rtype: InstanceState or None
+		"""
+		return self._instances.get(id)
+	#enddef
+
+	def getMigrationCostMultiplier(self, srcPOPId, dstPOPId):
+		"""
+			..seealso:: DBConnection.getMigrationCostMultiplier()
+
+			:returns: the Migration Cost Multiplier of the pair of POPs, or 1.0 if not found
+			:rtype: float
+		"""
+		return self._costMultipliers.get( (srcPOPId, dstPOPId), 1.0 )
+	#enddef
+
+	def getInstance(self, popId, vcdnId):
+		"""
+			..seealso:: DBConnection.getInstanceOf()
+
+			:returns: the Instance of the vCDN in the POP, or None if not found
+			:rtype: InstanceState or None
+		"""
+		return self._instancesOf.get( (popId, vcdnId) )
+	#enddef
+
+#endclass
+
+
+def _value(value):
+	# NULL values are NaN in the hosting matrix
+	return float("nan") if value is None else value
+#enddef
+
+
+def load(DBConn):
+	"""
+		Reads the Snapshot from the DB, with one query per table. The topologie tables are read from the cache of DBConnection if they did not change
+
+		:param DBConn: A DB connection, with a started transaction
+		:type DBConn: DBConnection
+
+		:returns: The Snapshot
+		:rtype: Snapshot
+	"""
+	return Snapshot( DBConn.getLocations(readOnly = True) or [],
+					DBConn.getPOPList(readOnly = True) or [],
+					DBConn.getvCDNs() or [],
+					DBConn.getInstanceList() or [],
+					DBConn.getClientGroups(readOnly = True) or [],
+					DBConn.getMigrationCostMultiplierList() or [] )
+#enddef
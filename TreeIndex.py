@@ -0,0 +1,330 @@
+"""
+
+Path queries on a Tree
+======================
+
+> TSP, 2016
+> Version 1.4
+> Date: Sept 2016
+
+Index of a tree (or forest) Graph, like the Model's Gomory-Hu Tree, to answer questions about the unique path between 2 vertices without walking it.
+
+Each tree is rooted, and each vertex keeps its parent, its depth and its ancestors at 1, 2, 4, 8... levels up (binary lifting).
+A tree edge is identified by its lower vertex, the one farther from the root. So a value of the edges, like the `flow`, is kept per vertex.
+
+With the ancestors, the lowest common ancestor of 2 vertices is found in O(log n), and so is the path between them.
+A `table()` of edge values combined over the same 1, 2, 4, 8... levels gives the minimum (or any other associative combination) over a path in O(log n).
+The DFS entry and exit times tell in O(1) if an edge is in a path.
+With weights placed on the vertices, the SubtreeSums of the entry times give in O(log n) the weight on each side of an edge.
+
+The index depends only on the edges of the tree. The tables must be made again when the edge values change.
+
+.. note:: This module does not interact with the DB, it only works over igraph Graphs
+
+:Example:
+
+	index = TreeIndex(gomoryTree)
+	flows = index.table(index.edgeValues(gomoryTree.es["flow"]), min)
+	bottleneck = index.pathFold(flows, min, clientNode, popNode)
+
+"""
+
+
+"""
+..licence::
+
+	vIOS (vCDN Infrastructure Optimization Simulator)
+
+	Copyright (c) 2016 Telecom SudParis - RST Department
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+from bisect import bisect_left
+
+
+class TreeIndex(object):
+	"""
+		Binary lifting index of a tree or forest Graph
+
+		For each vertex `v`:
+		> parent[v] = parent vertex; the root is its own parent
+		> parentEdge[v] = id of the edge to the parent; -1 for a root
+		> depth[v] = amount of edges to the root
+		> root[v] = root of its tree
+		> tin[v], tout[v] = DFS entry and exit times; `u` is in the subtree of `v` if tin[v] <= tin[u] < tout[v]
+		> up[j][v] = ancestor 2^j levels up (or the root)
+	"""
+
+	def __init__(self, tree):
+		"""
+			:param tree: A Graph without cycles; it can have many components
+			:type tree: Graph
+
+			:raises: ValueError if the Graph has cycles
+		"""
+		n = tree.vcount()
+		self.n = n
+		self.parent = range(n)
+		self.parentEdge = [-1] * n
+		self.depth = [0] * n
+		self.root = [-1] * n
+		self.tin = [0] * n
+		self.tout = [0] * n
+
+		incidences = tree.get_inclist()
+		endpoints = tree.get_edgelist()
+
+		clock = 0
+		for r in range(n):
+			if self.root[r] != -1:
+				continue
+			self.root[r] = r
+			self.tin[r] = clock
+			clock = clock + 1
+			stack = [ (r, iter(incidences[r])) ]
+			while stack:
+				v, edges = stack[-1]
+				for e in edges:
+					a, b = endpoints[e]
+					u = b if a == v else a
+					if e == self.parentEdge[v]:
+						continue
+					if self.root[u] != -1:
+						raise ValueError("The Graph is not a forest")
+					self.root[u] = r
+					self.parent[u] = v
+					self.parentEdge[u] = e
+					self.depth[u] = self.depth[v] + 1
+					self.tin[u] = clock
+					clock = clock + 1
+					stack.append( (u, iter(incidences[u])) )
+					break
+				else:
+					self.tout[v] = clock
+					stack.pop()
+			#endwhile
+		#endfor
+
+		self.up = [ self.parent ]
+		levels = max(self.depth or [0]).bit_length()
+		for j in range(1, levels):
+			previous = self.up[-1]
+			self.up.append( [ previous[previous[v]] for v in range(n) ] )
+	#enddef
+
+	def edgeValues(self, values, default=None):
+		"""
+			:param values: A value for each edge of the tree, like `tree.es["flow"]`
+			:type values: list[]
+			:param default: The value kept for the roots, which have no edge
+
+			:returns: the value of the edge to the parent of each vertex
+			:rtype: list[]
+		"""
+		return [ values[e] if e != -1 else default for e in self.parentEdge ]
+	#enddef
+
+	def table(self, values, combine):
+		"""
+			Combines the edge values over 1, 2, 4, 8... levels up from each vertex
+
+			:param values: The value of the edge to the parent of each vertex. ..seealso:: edgeValues()
+			:type values: list[]
+			:param combine: An associative function of 2 values, like min or max
+			:type combine: function
+
+			:returns: table[j][v] = combination of the values of the 2^j edges above `v`
+			:rtype: list[]
+		"""
+		table = [ list(values) ]
+		for j in range(1, len(self.up)):
+			previous = table[-1]
+			ancestor = self.up[j-1]
+			table.append( [ combine(previous[v], previous[ancestor[v]]) for v in range(self.n) ] )
+		return table
+	#enddef
+
+	def fold(self, table, combine, v, steps, initial=None):
+		"""
+			Combines the values of the `steps` edges above `v`, with a table() made with the same `combine`
+
+			:returns: the combination, or `initial` if steps is 0
+		"""
+		result = initial
+		j = 0
+		while steps:
+			if steps & 1:
+				result = table[j][v] if result is None else combine(result, table[j][v])
+				v = self.up[j][v]
+			steps = steps >> 1
+			j = j + 1
+		return result
+	#enddef
+
+	def ancestor(self, v, depth):
+		"""
+			:returns: the ancestor of `v` that has this depth
+			:rtype: int
+		"""
+		steps = self.depth[v] - depth
+		j = 0
+		while steps:
+			if steps & 1:
+				v = self.up[j][v]
+			steps = steps >> 1
+			j = j + 1
+		return v
+	#enddef
+
+	def lca(self, a, b):
+		"""
+			:returns: the lowest common ancestor of `a` and `b`, or None if they are in different trees
+			:rtype: int or None
+		"""
+		if self.root[a] != self.root[b]:
+			return None
+		if self.depth[a] < self.depth[b]:
+			a, b = b, a
+		a = self.ancestor(a, self.depth[b])
+		if a == b:
+			return a
+		for j in range(len(self.up)-1, -1, -1):
+			if self.up[j][a] != self.up[j][b]:
+				a = self.up[j][a]
+				b = self.up[j][b]
+		return self.parent[a]
+	#enddef
+
+	def distance(self, a, b):
+		"""
+			:returns: the amount of edges in the path from `a` to `b`, or None if they are in different trees
+			:rtype: int or None
+		"""
+		c = self.lca(a, b)
+		if c is None:
+			return None
+		return self.depth[a] + self.depth[b] - 2*self.depth[c]
+	#enddef
+
+	def isAncestor(self, v, u):
+		"""
+			:returns: True if `v` is `u` or one of its ancestors
+			:rtype: bool
+		"""
+		return self.tin[v] <= self.tin[u] < self.tout[v]
+	#enddef
+
+	def onPath(self, v, a, b):
+		"""
+			:param v: The lower vertex of the edge
+			:type v: int
+
+			:returns: True if the edge from `v` to its parent is in the path from `a` to `b`
+			:rtype: bool
+		"""
+		if self.parentEdge[v] == -1 or self.root[a] != self.root[b]:
+			return False
+		return self.isAncestor(v, a) != self.isAncestor(v, b)
+	#enddef
+
+	def pathFold(self, table, combine, a, b, initial=None):
+		"""
+			Combines the values of all the edges in the path from `a` to `b`, with a table() made with the same `combine`
+
+			:returns: the combination, or `initial` if the path has no edges or there is no path
+		"""
+		c = self.lca(a, b)
+		if c is None:
+			return initial
+		result = self.fold(table, combine, a, self.depth[a] - self.depth[c], initial)
+		return self.fold(table, combine, b, self.depth[b] - self.depth[c], result)
+	#enddef
+
+	def pathEdges(self, a, b):
+		"""
+			:returns: the ids of the edges in the path from `a` to `b`, in order; empty if there is no path
+			:rtype: int[]
+		"""
+		c = self.lca(a, b)
+		if c is None:
+			return []
+		down = []
+		while b != c:
+			down.append(self.parentEdge[b])
+			b = self.parent[b]
+		up = []
+		while a != c:
+			up.append(self.parentEdge[a])
+			a = self.parent[a]
+		return up + down[::-1]
+	#enddef
+
+#endclass
+
+
+class SubtreeSums(object):
+	"""
+		Weights placed on the vertices of a TreeIndex, like the BW of the Demands at the client nodes, to sum the ones that are on one side of a tree edge
+
+		A subtree is a range of DFS entry times, so with the weights sorted by entry time and their prefix sums, the weight of any subtree is found with 2 binary searches
+
+		:Example:
+
+			sums = SubtreeSums(index, [clientNode1, clientNode2], [10.0, 2.5])
+			crossing = sums.across(edgeLowerNode, popNode)
+	"""
+
+	def __init__(self, index, vertices, weights):
+		"""
+			:param index: The index of the tree
+			:type index: TreeIndex
+			:param vertices: The vertex where each weight is placed; many weights can be in the same vertex
+			:type vertices: int[]
+			:param weights: The weights
+			:type weights: float[]
+		"""
+		self.index = index
+		placed = sorted( (index.tin[v], w) for v,w in zip(vertices, weights) )
+		self.times = [ t for t,w in placed ]
+		self.prefix = [0]
+		for t,w in placed:
+			self.prefix.append(self.prefix[-1] + w)
+	#enddef
+
+	def subtree(self, v):
+		"""
+			:returns: the sum of the weights placed in the subtree of `v`
+			:rtype: float
+		"""
+		first = bisect_left(self.times, self.index.tin[v])
+		last = bisect_left(self.times, self.index.tout[v])
+		return self.prefix[last] - self.prefix[first]
+	#enddef
+
+	def across(self, v, b):
+		"""
+			Sums the weights placed at the vertices `a` whose path to `b` has the edge from `v` to its parent
+
+			:param v: The lower vertex of the edge
+			:type v: int
+			:param b: The common end of the paths
+			:type b: int
+
+			:returns: the sum of the weights on the other side of the edge than `b`
+			:rtype: float
+		"""
+		index = self.index
+		if index.parentEdge[v] == -1 or index.root[v] != index.root[b]:
+			return 0
+		if index.isAncestor(v, b):
+			return self.subtree(index.root[b]) - self.subtree(v)
+		return self.subtree(v)
+	#enddef
+
+#endclass
@@ -224,7 +224,8 @@ def build():
 					
 			#endif
 			DBConn.start()							
-			popList = DBConn.getPOPList()
+			# The listings only read the values, they can be the ones in the cache of DBConnection
+			popList = DBConn.getPOPList("model", readOnly = True)
 				
 			if (popList):
 				return render_template('pops.html', popList = popList)
@@ -235,7 +236,7 @@ def build():
 		@app.route('/vCDNs')
 		def vcdnsTable():
 			DBConn.start()
-			vcdnList = DBConn.getvCDNs()
+			vcdnList = DBConn.getvCDNs("instances")
 			
 			if (vcdnList):
 				return render_template('vcdns.html', vcdnList = vcdnList)
@@ -306,10 +307,10 @@ def build():
 
 			DBConn.start()
 			
-			clientsList = DBConn.getClientGroups()
-			locationsList = DBConn.getLocations()
-			netlinksList = DBConn.getNetworkLinks()
-			migcostsList = DBConn.getMigrationCostMultiplierList()
+			clientsList = DBConn.getClientGroups("model", readOnly = True)
+			locationsList = DBConn.getLocations(readOnly = True)
+			netlinksList = DBConn.getNetworkLinks("model", readOnly = True)
+			migcostsList = DBConn.getMigrationCostMultiplierList("pops")
 			
 			return render_template('topologie.html', 
 										clientsList = clientsList, 
@@ -408,6 +409,14 @@ def build():
 							Optimizer.OptimizationModel.drawCapacity( filename= app.static_folder + "/" + Topologie_Graph_Demanded_filename )
 							Optimizer.OptimizationModel.drawGomory( filename= app.static_folder + "/" + Topologie_Gomuri_Demanded_filename ) 
 							flash(Messages.Optimized)
+							
+							# The in-process OMAC result, next to the HMAC migrations of the table
+							omac = Optimizer.OptimizationModel.omac
+							if omac.migrations is not None:
+								if omac.gap() is not None:
+									flash(Messages.OMAC_Result_D_F_F_F % (len(omac.migrations), omac.objective, omac.bound, 100 * omac.gap()))
+								else:
+									flash(Messages.OMAC_Result_D_F % (len(omac.migrations), omac.objective))
 						else:
 							flash(Messages.ERROR_optimizing,Flash_msg_error)
 							
@@ -434,10 +443,13 @@ def build():
 			if not redirectsList:
 				redirectsList = []
 			
+			# The OMAC migrations are shown in a second table, next to the HMAC ones ..seealso:: templates/omacMigrations.html
 			return render_template('migrations.html', 
 									migrationsList = migrationsList ,
 									redirectsList = redirectsList,
-									invalidDemandList = invalidDemandList)
+									invalidDemandList = invalidDemandList,
+									omacMigrationsList = Optimizer.OMACResult,
+									omac = Optimizer.OptimizationModel.omac if Optimizer.OMACResult is not None else None)
 		#enddef
 		
 		@app.route('/Simulation', methods = ['POST','GET'])
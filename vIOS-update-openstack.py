@@ -54,6 +54,7 @@ import getopt
 import vIOSLib
 import vIOSLib.SettingsFile as SettingsParser
 import vIOSLib.Optimizer as Optimizer
+import vIOSLib.DBConnection as DBConnection
 import vIOSLib.Messages as LibMessages
 
 import Messages
@@ -98,6 +99,7 @@ def main(argv):
 				#<?> Some modules will need options taken from the config-file.
 				vIOSLib.readSettingsFile()
 				Optimizer.readSettingsFile()
+				DBConnection.readSettingsFile()
 				
 			except :
 				print(Messages.ERROR_Reading_File )
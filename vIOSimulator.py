@@ -72,6 +72,9 @@ import vIOSLib.WebAdmin as WebAdmin
 import vIOSLib.Messages as LibMessages
 import vIOSLib.OptimizationModels as OptimizationModels
 import vIOSLib.OpenStackConnection as OpenStackConnection
+import vIOSLib.ModelCache as ModelCache
+import vIOSLib.Snapshot as Snapshot
+import vIOSLib.DBConnection as DBConnection
 
 import Messages
 
@@ -120,6 +123,9 @@ def main(argv):
 				Optimizer.readSettingsFile()
 				WebAdmin.readSettingsFile()
 				OpenStackConnection.readSettingsFile()
+				ModelCache.readSettingsFile()
+				Snapshot.readSettingsFile()
+				DBConnection.readSettingsFile()
 				
 			except :
 				print(Messages.ERROR_Reading_File )